@@ -0,0 +1,380 @@
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+from blobs import FORMAT, resolve_blob
+from metrics import metrics
+
+BATCH_SIZE = 1000
+WRITE_BUFFER = 1024 * 1024
+_SPACE = re.compile(r"\s*")
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def is_jsonl(filename):
+    """
+    Проверяет, что имя файла относится к архиву JSON Lines (.jsonl или .jsonl.gz).
+
+    Аргументы:
+    filename (str): Имя файла.
+
+    Возвращает:
+    bool: True для архива JSON Lines.
+    """
+    return os.fspath(filename).lower().endswith((".jsonl", ".jsonl.gz"))
+
+
+class ProgressReporter:
+    """
+    Сообщает о ходе длительной операции из фонового потока.
+
+    Конвейер только увеличивает счётчик done, а функция обратного вызова
+    вызывается раз в interval секунд в отдельном потоке и ещё раз по
+    завершении, поэтому вывод прогресса не замедляет чтение и запись.
+    Без функции обратного вызова поток не запускается.
+
+    Атрибуты:
+    done (int): Количество обработанных заметок.
+    total (int): Ожидаемое количество заметок или None, если неизвестно.
+    """
+    def __init__(self, callback=None, total=None, interval=0.5):
+        self.callback = callback
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.callback is not None:
+            self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            if exc_info[0] is None:
+                self.callback(self.done, self.total)
+        return False
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.callback(self.done, self.total)
+
+
+def iter_note_records(manager, include_history=True):
+    """
+    Перебирает заметки менеджера в виде словарей для архива.
+
+    Под блокировкой запоминаются только ссылки на заметки; содержимое каждой
+    заметки сериализуется по очереди, так что в памяти одновременно находится
+    одна заметка, а остальные потоки не ждут окончания всего экспорта.
+
+    Аргументы:
+    manager (NoteManager): Менеджер заметок.
+    include_history (bool, optional): Добавить историю версий в поле "history".
+
+    Возвращает:
+    generator: Словари {"title", "content", "category"[, "history"]}.
+    """
+    with manager.lock:
+        notes = [note for category_notes in manager.notes.values() for note in category_notes]
+    for note in notes:
+        with manager.lock:
+            if manager.get_note(note.id) is not note:  # Удалена во время экспорта
+                continue
+            record = note.to_dict()
+            history = manager.history.get(note.id) if include_history else None
+            if history:
+                record["history"] = history.to_dict()
+        yield record
+
+
+def iter_notes_file(filename, include_empty=False):
+    """
+    Последовательно разбирает файл notes.json, читая его частями.
+
+    Первые заметки доступны сразу, без чтения и разбора всего файла;
+    все форматы (по категориям, с общими блоками содержимого и старый
+    список) разбираются потоково. Ссылки на общие блоки заменяются их
+    содержимым.
+
+    Аргументы:
+    filename (str): Имя файла.
+    include_empty (bool, optional): Выдавать (категория, None) для пустых категорий.
+
+    Возвращает:
+    generator: Пары (категория, словарь заметки) в порядке файла.
+    """
+    try:
+        file = open(filename, 'r')
+    except FileNotFoundError:
+        return
+    with file:
+        stream = _JSONStream(file)
+        if stream.startswith("["):  # Старый формат, просто список заметок
+            stream.expect("[")
+            while not stream.startswith("]"):
+                note = stream.decode()
+                category = note.get("category", "Uncategorized")
+                yield category, dict(note, category=category)
+                if stream.startswith(","):
+                    stream.expect(",")
+            return
+        stream.expect("{")
+        blobs = {}
+        while not stream.startswith("}"):
+            key = stream.decode()
+            stream.expect(":")
+            if stream.startswith("["):
+                yield from _iter_category(stream, key, blobs, include_empty)
+            elif key == "notes":  # Формат с общими блоками: "blobs" записаны раньше заметок
+                stream.expect("{")
+                while not stream.startswith("}"):
+                    category = stream.decode()
+                    stream.expect(":")
+                    yield from _iter_category(stream, category, blobs, include_empty)
+                    if stream.startswith(","):
+                        stream.expect(",")
+                stream.expect("}")
+            else:
+                value = stream.decode()
+                if key == "blobs":
+                    blobs = value
+                elif key == "format" and value > FORMAT:
+                    raise ValueError(f"Unsupported notes file format {value}")
+            if stream.startswith(","):
+                stream.expect(",")
+
+
+def _iter_category(stream, category, blobs, include_empty):
+    stream.expect("[")
+    if include_empty and stream.startswith("]"):
+        yield category, None
+    while not stream.startswith("]"):
+        yield category, resolve_blob(stream.decode(), blobs)
+        if stream.startswith(","):
+            stream.expect(",")
+    stream.expect("]")
+
+
+class _JSONStream:
+    # Буфер над файлом для поэлементного разбора JSON через JSONDecoder.raw_decode
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, file):
+        self.file = file
+        self.text = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.file.read(self.CHUNK_SIZE)
+        self.eof = not chunk
+        self.text = self.text[self.position:] + chunk
+        self.position = 0
+        return chunk
+
+    def _skip_space(self):
+        while True:
+            self.position = _SPACE.match(self.text, self.position).end()
+            if self.position < len(self.text) or not self._fill():
+                return
+
+    def startswith(self, char):
+        self._skip_space()
+        return self.text.startswith(char, self.position)
+
+    def expect(self, char):
+        if not self.startswith(char):
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.text, self.position)
+        self.position += 1
+
+    def decode(self):
+        self._skip_space()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.text, self.position)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            if end == len(self.text) and not self.eof and self._fill():
+                # Значение могло оборваться на границе буфера (например, число)
+                continue
+            self.position = end
+            return value
+
+
+@metrics.timed("write_jsonl")
+def write_jsonl(records, filename, compress=None, progress=None, total=None):
+    """
+    Атомарно записывает словари в файл JSON Lines, по одному на строку.
+
+    Записи берутся из итератора по одной и сбрасываются на диск буфером
+    WRITE_BUFFER, поэтому расход памяти не зависит от размера архива.
+    Как и write_snapshot(), данные пишутся во временный файл и затем
+    заменяют целевой.
+
+    Аргументы:
+    records (iterable): Словари заметок.
+    filename (str): Имя файла.
+    compress (bool, optional): Сжать gzip; по умолчанию — если имя оканчивается на .gz.
+    progress (callable, optional): Вызывается из фонового потока как progress(done, total).
+    total (int, optional): Ожидаемое количество записей для progress.
+
+    Возвращает:
+    int: Количество записанных заметок.
+    """
+    filename = os.fspath(filename)
+    if compress is None:
+        compress = filename.lower().endswith(".gz")
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as raw, ProgressReporter(progress, total) as reporter:
+            file = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) if compress else raw
+            lines = []
+            size = 0
+            for record in records:
+                line = json.dumps(record, ensure_ascii=False) + "\n"
+                lines.append(line)
+                size += len(line)
+                reporter.done += 1
+                if size >= WRITE_BUFFER:
+                    file.write("".join(lines).encode("utf-8"))
+                    lines, size = [], 0
+            file.write("".join(lines).encode("utf-8"))
+            if compress:
+                file.close()  # Дописывает окончание gzip, не закрывая raw
+            metrics.observe("write_jsonl.bytes", raw.tell())
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_name, filename)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return reporter.done
+
+
+def read_jsonl(filename, progress=None):
+    """
+    Последовательно читает файл JSON Lines (сжатый gzip или нет).
+
+    Сжатие определяется по содержимому файла, а не по имени.
+
+    Аргументы:
+    filename (str): Имя файла.
+    progress (callable, optional): Вызывается из фонового потока как progress(done, None).
+
+    Возвращает:
+    generator: Словари заметок в порядке файла.
+    """
+    with open(filename, 'rb') as raw, ProgressReporter(progress) as reporter:
+        compressed = raw.read(2) == _GZIP_MAGIC
+        raw.seek(0)
+        file = gzip.GzipFile(fileobj=raw, mode='rb') if compressed else raw
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                raise ValueError(f"{filename}:{number}: invalid JSON line: {error}") from None
+            if not isinstance(record, dict) or not isinstance(record.get("title"), str) \
+                    or not isinstance(record.get("content"), str):
+                raise ValueError(f"{filename}:{number}: title and content are required")
+            reporter.done += 1
+            yield record
+        metrics.observe("read_jsonl.bytes", raw.tell())
+
+
+def export_jsonl(manager, filename, include_history=True, progress=None):
+    """
+    Экспортирует заметки менеджера в файл JSON Lines.
+
+    Аргументы:
+    manager (NoteManager): Менеджер заметок.
+    filename (str): Имя файла; окончание .gz включает сжатие.
+    include_history (bool, optional): Сохранить историю версий.
+    progress (callable, optional): Вызывается из фонового потока как progress(done, total).
+
+    Возвращает:
+    int: Количество экспортированных заметок.
+    """
+    with manager.lock:
+        total = sum(len(notes) for notes in manager.notes.values())
+    count = write_jsonl(iter_note_records(manager, include_history), filename, progress=progress, total=total)
+    logging.info("%s notes exported to %s", count, filename)
+    return count
+
+
+def import_jsonl(manager, filename, replace=False, category=None, progress=None):
+    """
+    Добавляет заметки из файла JSON Lines пакетами по BATCH_SIZE.
+
+    Каждый пакет добавляется через NoteManager.add_notes(), так что в памяти,
+    кроме самих заметок, находится не больше одного пакета.
+
+    Аргументы:
+    manager (NoteManager): Менеджер заметок.
+    filename (str): Имя файла.
+    replace (bool, optional): Заменить существующие заметки, как load_from_file().
+    category (str, optional): Категория для всех заметок вместо сохранённой в файле.
+    progress (callable, optional): Вызывается из фонового потока как progress(done, None).
+
+    Возвращает:
+    int: Количество импортированных заметок.
+    """
+    if replace:
+        with manager.lock:
+            manager.replace_notes({})
+            if manager.storage is not None:
+                # Иначе хранилище сохранит старые заметки, и новые идентификаторы столкнутся с ними
+                manager.storage.reset(manager)
+    count = 0
+    batch = []
+    for record in read_jsonl(filename, progress):
+        if category is not None:
+            record["category"] = category
+        batch.append(record)
+        if len(batch) == BATCH_SIZE:
+            count += _import_batch(manager, batch)
+            batch = []
+    count += _import_batch(manager, batch)
+    logging.info("%s notes imported from %s", count, filename)
+    return count
+
+
+def _import_batch(manager, records):
+    if not records:
+        return 0
+    # История передаётся вместе с заметками, чтобы хранилище записало её в той же записи add_many
+    notes = manager.add_notes((record["title"], record["content"], record.get("category"), record.get("created"),
+                               record.get("modified"), record.get("tags", ()), record.get("history"))
+                              for record in records)
+    return len(notes)
+
+
+def convert_notes_file(source, target, progress=None):
+    """
+    Преобразует файл notes.json (любого формата) в JSON Lines без загрузки целиком.
+
+    Аргументы:
+    source (str): Исходный файл notes.json.
+    target (str): Файл .jsonl или .jsonl.gz.
+    progress (callable, optional): Вызывается из фонового потока как progress(done, None).
+
+    Возвращает:
+    int: Количество записанных заметок.
+    """
+    records = (dict(note, category=category) for category, note in iter_notes_file(source))
+    count = write_jsonl(records, target, progress=progress)
+    logging.info("%s notes converted from %s to %s", count, source, target)
+    return count
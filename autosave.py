@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+
+from data import write_snapshot
+
+
+class AutosaveScheduler:
+    """
+    Планировщик отложенного автосохранения заметок.
+
+    Изменения накапливаются и записываются не чаще одного раза за интервал
+    простоя либо сразу после превышения бюджета байт. Снимок заметок
+    делается в главном потоке, а запись на диск выполняется в рабочем потоке.
+
+    Атрибуты:
+    manager (NoteManager): Менеджер заметок.
+    filename (str): Файл для сохранения.
+    interval_ms (int): Интервал простоя перед записью, в миллисекундах.
+    byte_budget (int): Объём изменений, после которого запись выполняется сразу.
+    writes (int): Количество выполненных записей.
+    writes_skipped (int): Количество изменений, объединённых с другими без отдельной записи.
+    write_time (float): Суммарное время записи, в секундах.
+    sync (NoteFileSync): Синхронизация с файлом, общим для нескольких экземпляров, или None.
+    conflict (bool): Последняя запись отложена, потому что файл изменили извне.
+    """
+    def __init__(self, manager, filename, root, interval_ms=1000, byte_budget=64 * 1024, before_save=None,
+                 sync=None):
+        """
+        Аргументы:
+        manager (NoteManager): Менеджер заметок.
+        filename (str): Файл для сохранения.
+        root (tk.Tk): Объект с методами after/after_cancel для планирования в главном потоке.
+        interval_ms (int, optional): Интервал простоя перед записью.
+        byte_budget (int, optional): Бюджет накопленных изменений в байтах.
+        before_save (callable, optional): Вызывается в главном потоке перед снимком
+            (например, чтобы перенести в заметку правки из редактора).
+        sync (NoteFileSync, optional): Записывать через NoteFileSync.save() — с блокировкой
+            файла и без перезаписи чужих изменений.
+        """
+        self.manager = manager
+        self.filename = filename
+        self.root = root
+        self.interval_ms = interval_ms
+        self.byte_budget = byte_budget
+        self.before_save = before_save
+        self.sync = sync
+        self.conflict = False
+        self.writes = 0
+        self.writes_skipped = 0
+        self.write_time = 0.0
+        self.last_error = None
+        self._pending_bytes = 0
+        self._dirty = False
+        self._timer = None
+        self._queued = None
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._worker.start()
+
+    def notify(self, nbytes=1):
+        """
+        Сообщает планировщику об изменении заметок.
+
+        Аргументы:
+        nbytes (int, optional): Примерный объём изменения в байтах.
+        """
+        if self._dirty:
+            self.writes_skipped += 1
+        self._dirty = True
+        self._pending_bytes += nbytes
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        if self._pending_bytes >= self.byte_budget:
+            self._fire()
+        else:
+            self._timer = self.root.after(self.interval_ms, self._fire)
+
+    def flush(self, force=False):
+        """
+        Синхронно записывает накопленные изменения.
+
+        Аргументы:
+        force (bool, optional): Записать файл, даже если изменений нет.
+
+        Возвращает:
+        bool: False, если запись не удалась или отложена из-за внешних изменений файла.
+        """
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        self._wait_idle()
+        if self._dirty or force:
+            snapshot = self._take_snapshot()
+            return self._write(snapshot)
+        return True
+
+    def close(self):
+        """
+        Останавливает рабочий поток, дождавшись текущей записи.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def stats(self):
+        """
+        Возвращает счётчики автосохранения.
+
+        Возвращает:
+        dict: Количество записей, пропущенных записей и время записи.
+        """
+        return {"writes": self.writes, "writes_skipped": self.writes_skipped, "write_time": self.write_time}
+
+    def _take_snapshot(self):
+        if self.before_save is not None:
+            self.before_save()
+        self._dirty = False
+        self._pending_bytes = 0
+        return self.manager.snapshot(include_ids=self.sync is not None, include_history=True)
+
+    def _fire(self):
+        self._timer = None
+        snapshot = self._take_snapshot()
+        with self._condition:
+            if self._queued is not None:
+                self.writes_skipped += 1
+            self._queued = snapshot
+            self._condition.notify_all()
+
+    def _wait_idle(self):
+        with self._condition:
+            while self._queued is not None or self._busy:
+                self._condition.wait()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._queued is None and not self._closed:
+                    self._condition.wait()
+                if self._queued is None:
+                    return
+                snapshot, self._queued = self._queued, None
+                self._busy = True
+            try:
+                self._write(snapshot)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _write(self, snapshot):
+        started = time.perf_counter()
+        try:
+            if self.sync is not None:
+                if not self.sync.save(snapshot):
+                    # Файл изменили извне: запись повторится после слияния (см. NoteFileSync)
+                    self.conflict = True
+                    self._dirty = True
+                    return False
+            else:
+                write_snapshot(snapshot, self.filename, deduplicate=True)
+        except OSError as error:
+            self.last_error = error
+            logging.error("Autosave to %s failed: %s", self.filename, error)
+            return False
+        self.conflict = False
+        self.write_time += time.perf_counter() - started
+        self.writes += 1
+        logging.info("Notes autosaved to %s", self.filename)
+        return True
@@ -0,0 +1,302 @@
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from data import NoteManager
+from parallel_search import ParallelSearch
+
+SCENARIOS = ("add_note", "add_notes", "search_notes", "quick_open", "regex_scan", "update_note", "save_to_file", "cli_search", "load_from_file", "delete_note")
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+DEFAULT_BASELINE = "benchmarks_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+# Минимальная пропускная способность сценариев, операций в секунду (без tracemalloc)
+THROUGHPUT_TARGETS = {"add_notes": 20000}
+
+
+def generate_corpus(count, seed=0, mean_size=200, size_sigma=1.0, categories=20, skew=1.1, vocabulary=5000):
+    """
+    Генерирует детерминированный синтетический набор заметок.
+
+    Размер содержимого распределён логнормально, частоты слов и размеры
+    категорий — по закону Ципфа.
+
+    Аргументы:
+    count (int): Количество заметок.
+    seed (int, optional): Начальное значение генератора случайных чисел.
+    mean_size (int, optional): Средний размер содержимого в символах.
+    size_sigma (float, optional): Разброс размера (параметр логнормального распределения).
+    categories (int, optional): Количество категорий.
+    skew (float, optional): Показатель Ципфа для категорий и слов; 0 — равномерно.
+    vocabulary (int, optional): Размер словаря.
+
+    Возвращает:
+    generator: Кортежи (title, content, category).
+    """
+    rng = random.Random(seed)
+    words = _make_vocabulary(rng, vocabulary)
+    word_weights = _zipf_cumulative(len(words), skew)
+    category_names = [f"Category {number}" for number in range(categories)]
+    category_weights = _zipf_cumulative(categories, skew)
+    mu = math.log(mean_size) - size_sigma ** 2 / 2
+    for number in range(count):
+        size = max(1, int(rng.lognormvariate(mu, size_sigma)))
+        content = " ".join(rng.choices(words, cum_weights=word_weights, k=max(1, size // 7)))[:size]
+        category = rng.choices(category_names, cum_weights=category_weights)[0]
+        yield f"Note {number}", content, category
+
+
+def _make_vocabulary(rng, size):
+    syllables = [consonant + vowel for consonant in "bdfgklmnprstvz" for vowel in "aeiou"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+def _zipf_cumulative(size, skew):
+    total = 0.0
+    cumulative = []
+    for rank in range(1, size + 1):
+        total += 1.0 / rank ** skew
+        cumulative.append(total)
+    return cumulative
+
+
+def _measure(function, memory):
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        function()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return elapsed, peak
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, seed=0, operations=1000, memory=False, corpus_options=None):
+    """
+    Выполняет сценарии для каждого размера хранилища.
+
+    Аргументы:
+    sizes (iterable, optional): Количества заметок.
+    seed (int, optional): Начальное значение генератора.
+    operations (int, optional): Количество операций в сценариях update/delete/search.
+    memory (bool, optional): Измерять пиковую память через tracemalloc (замедляет работу).
+    corpus_options (dict, optional): Дополнительные параметры generate_corpus.
+
+    Возвращает:
+    dict: "<сценарий>@<размер>" -> {"seconds", "per_op", "peak_bytes"}.
+    """
+    corpus_options = corpus_options or {}
+    results = {}
+    previous_level = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    try:
+        for size in sizes:
+            corpus = list(generate_corpus(size, seed=seed, **corpus_options))
+            rng = random.Random(seed)
+            manager = NoteManager()
+            queries = _make_queries(rng, corpus)
+            title_queries = _make_title_queries(rng, corpus)
+            ops = min(size, operations)
+            engine = ParallelSearch(manager)
+            with tempfile.TemporaryDirectory() as directory, engine:
+                filename = os.path.join(directory, "notes.json")
+
+                def add_notes():
+                    for title, content, category in corpus:
+                        manager.add_note(title, content, category)
+
+                def add_notes_batch():
+                    # Пакетная загрузка (импорт, восстановление) в отдельный менеджер
+                    NoteManager().add_notes(corpus)
+
+                def search():
+                    for query in queries:
+                        manager.search_notes(query)
+
+                def quick_open():
+                    for query in title_queries:
+                        manager.quick_open(query)
+
+                def regex_scan():
+                    # Полный просмотр в пуле процессов; первый запрос включает пересылку порций
+                    for query in queries[:5]:
+                        engine.find(re.escape(query.split()[0]) + r"\w*\b", regex=True)
+
+                def update():
+                    for title, content, category in rng.sample(corpus, ops):
+                        count = len(manager.notes[category])
+                        manager.update_note(category, rng.randrange(count), title, content[::-1])
+
+                def cli_search():
+                    # Время до первого результата в новом процессе, включая запуск интерпретатора
+                    subprocess.run([sys.executable, "-m", "cli", "--file", filename, "search", queries[0], "--limit", "1"],
+                                   cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL, check=False)
+
+                def load():
+                    NoteManager().load_from_file(filename)
+
+                def delete():
+                    for _ in range(ops):
+                        category = rng.choice(list(manager.notes))
+                        count = len(manager.notes[category])
+                        if count:
+                            manager.delete_note(category, rng.randrange(count))
+
+                scenarios = {
+                    "add_note": (add_notes, size),
+                    "add_notes": (add_notes_batch, size),
+                    "search_notes": (search, len(queries)),
+                    "quick_open": (quick_open, len(title_queries)),
+                    "regex_scan": (regex_scan, len(queries[:5])),
+                    "update_note": (update, ops),
+                    "save_to_file": (lambda: manager.save_to_file(filename), 1),
+                    "cli_search": (cli_search, 1),
+                    "load_from_file": (load, 1),
+                    "delete_note": (delete, ops),
+                }
+                for name in SCENARIOS:
+                    function, count = scenarios[name]
+                    elapsed, peak = _measure(function, memory)
+                    results[f"{name}@{size}"] = {"seconds": elapsed, "per_op": elapsed / max(1, count), "peak_bytes": peak}
+    finally:
+        logging.disable(previous_level)
+    return results
+
+
+def _make_queries(rng, corpus, count=20):
+    words = [word for _, content, _ in rng.sample(corpus, min(len(corpus), count)) for word in content.split()[:2]]
+    queries = words[:count // 2]
+    queries += [word[1:4] for word in words[count // 2:count] if len(word) > 3]
+    queries += [" ".join(pair) for pair in zip(words[::2], words[1::2])][:count // 4]
+    return queries or ["a"]
+
+
+def _make_title_queries(rng, corpus, count=20):
+    # Начала заголовков, заголовки с переставленными соседними буквами и части без начала
+    titles = [title.lower() for title, _, _ in rng.sample(corpus, min(len(corpus), count))]
+    queries = [title[:rng.randint(2, len(title))] for title in titles[:count // 3]]
+    for title in titles[count // 3:2 * count // 3]:
+        position = rng.randrange(len(title) - 1)
+        queries.append(title[:position] + title[position + 1] + title[position] + title[position + 2:])
+    queries += [title[len(title) // 2:] for title in titles[2 * count // 3:]]
+    return queries or ["a"]
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнивает результаты с сохранёнными и возвращает список регрессий.
+
+    Аргументы:
+    results (dict): Результаты run_benchmarks().
+    baseline (dict): Сохранённые результаты.
+    threshold (float, optional): Допустимое относительное ухудшение (0.25 — на 25%).
+
+    Возвращает:
+    list: Описания регрессий; пустой список, если регрессий нет.
+    """
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        for metric in ("seconds", "peak_bytes"):
+            if result.get(metric) is None or expected.get(metric) is None:
+                continue
+            if result[metric] > expected[metric] * (1 + threshold):
+                regressions.append(f"{key} {metric}: {result[metric]:.6g} > {expected[metric]:.6g} (+{threshold:.0%})")
+    return regressions
+
+
+def check_throughput(results, targets=THROUGHPUT_TARGETS):
+    """
+    Проверяет, что сценарии выполняются не медленнее заданной пропускной способности.
+
+    Аргументы:
+    results (dict): Результаты run_benchmarks() без замера памяти.
+    targets (dict, optional): Сценарий -> минимум операций в секунду.
+
+    Возвращает:
+    list: Описания сценариев ниже цели; пустой список, если все цели достигнуты.
+    """
+    failures = []
+    for key, result in results.items():
+        target = targets.get(key.partition("@")[0])
+        if target is not None and result["per_op"] * target > 1:
+            failures.append(f"{key}: {1 / result['per_op']:.0f} ops/s < {target} ops/s")
+    return failures
+
+
+def format_results(results):
+    """
+    Форматирует результаты в виде таблицы.
+
+    Аргументы:
+    results (dict): Результаты run_benchmarks().
+
+    Возвращает:
+    str: Текст таблицы.
+    """
+    lines = [f"{'scenario':<28}{'total, s':>12}{'per op, us':>14}{'peak, MiB':>12}"]
+    for key, result in results.items():
+        peak = "" if result["peak_bytes"] is None else f"{result['peak_bytes'] / 2 ** 20:.1f}"
+        lines.append(f"{key:<28}{result['seconds']:>12.4f}{result['per_op'] * 1e6:>14.1f}{peak:>12}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for NoteManager and search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="store sizes in notes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--operations", type=int, default=1000, help="operations per update/delete scenario")
+    parser.add_argument("--mean-size", type=int, default=200, help="mean note content size in characters")
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for category and word frequencies")
+    parser.add_argument("--memory", action="store_true", help="measure peak memory with tracemalloc")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="store results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    corpus_options = {"mean_size": args.mean_size, "categories": args.categories, "skew": args.skew}
+    results = run_benchmarks(args.sizes, args.seed, args.operations, args.memory, corpus_options)
+    print(format_results(results))
+    slow = [] if args.memory else check_throughput(results)
+    for failure in slow:
+        print(f"BELOW TARGET {failure}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump({"memory": args.memory, "results": results}, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 1 if slow else 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 1 if slow else 0
+    with open(args.baseline, 'r') as file:
+        baseline = json.load(file)
+    if baseline["memory"] != args.memory:
+        # Время под tracemalloc несравнимо со временем без него
+        print("Baseline was recorded with a different --memory setting; comparing memory only.")
+        results = {key: dict(result, seconds=None) for key, result in results.items()}
+    regressions = compare_to_baseline(results, baseline["results"], args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions or slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import hashlib
+import sys
+
+FORMAT = 2
+BLOB_MIN_SIZE = 64
+
+
+def content_digest(content):
+    """
+    Возвращает хеш содержимого заметки, по которому на него ссылаются в файле.
+
+    Аргументы:
+    content (str): Содержимое.
+
+    Возвращает:
+    str: Хеш BLAKE2 (16 байт) в шестнадцатеричном виде.
+    """
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class BlobStore:
+    """
+    Общие строки содержимого заметок с подсчётом ссылок.
+
+    Одинаковое содержимое хранится в памяти одной строкой: acquire()
+    возвращает уже известную строку с тем же текстом, и заметки ссылаются
+    на неё. Строки неизменяемы, поэтому изменение заметки — это копирование
+    при записи: заметка получает новую строку, а release() уменьшает счётчик
+    прежней. Строка, на которую больше никто не ссылается, удаляется сразу.
+    Для уникального содержимого (обычный случай) счётчик не хранится.
+
+    Атрибуты:
+    logical_size (int): Объём содержимого всех ссылок в байтах, как если бы каждая заметка хранила копию.
+    stored_size (int): Объём различных строк в байтах.
+    """
+    def __init__(self):
+        self._blobs = {}
+        self._shared = {}
+        self.logical_size = 0
+        self.stored_size = 0
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def acquire(self, content):
+        """
+        Добавляет ссылку на содержимое.
+
+        Аргументы:
+        content (str): Содержимое.
+
+        Возвращает:
+        str: Общая строка с тем же текстом, которую нужно хранить в заметке.
+        """
+        size = sys.getsizeof(content)
+        self.logical_size += size
+        blob = self._blobs.get(content)
+        if blob is None:
+            self._blobs[content] = content
+            self.stored_size += size
+            return content
+        self._shared[blob] = self._shared.get(blob, 1) + 1
+        return blob
+
+    def release(self, content):
+        """
+        Убирает ссылку на содержимое; строка без ссылок удаляется.
+
+        Аргументы:
+        content (str): Содержимое, полученное из acquire().
+        """
+        size = sys.getsizeof(content)
+        self.logical_size -= size
+        count = self._shared.get(content)
+        if count is None:
+            del self._blobs[content]
+            self.stored_size -= size
+        elif count == 2:
+            del self._shared[content]
+        else:
+            self._shared[content] = count - 1
+
+    def refcount(self, content):
+        """
+        Возвращает количество заметок, ссылающихся на содержимое.
+        """
+        if content not in self._blobs:
+            return 0
+        return self._shared.get(content, 1)
+
+    def clear(self):
+        self._blobs.clear()
+        self._shared.clear()
+        self.logical_size = self.stored_size = 0
+
+    def stats(self):
+        """
+        Возвращает отчёт о дедупликации.
+
+        Возвращает:
+        dict: "blobs" (различных строк), "shared" (строк с несколькими ссылками),
+        "references", "logical_bytes", "stored_bytes", "saved_bytes" и "ratio"
+        (logical_bytes / stored_bytes).
+        """
+        return {"blobs": len(self._blobs), "shared": len(self._shared),
+                "references": len(self._blobs) + sum(self._shared.values()) - len(self._shared),
+                "logical_bytes": self.logical_size, "stored_bytes": self.stored_size,
+                "saved_bytes": self.logical_size - self.stored_size,
+                "ratio": self.logical_size / self.stored_size if self.stored_size else 1.0}
+
+
+def is_packed(notes_data):
+    """
+    Проверяет, что данные notes.json записаны с общими блоками содержимого (см. pack_snapshot()).
+    """
+    return isinstance(notes_data, dict) and isinstance(notes_data.get("format"), int)
+
+
+def pack_snapshot(snapshot, min_size=BLOB_MIN_SIZE):
+    """
+    Выносит повторяющееся содержимое заметок снимка в общие блоки.
+
+    Содержимое, которое встречается у нескольких заметок и не короче
+    min_size символов, записывается один раз в "blobs" под своим хешем, а
+    заметки вместо "content" получают ссылку "blob". Если повторов нет,
+    снимок возвращается без изменений, в прежнем формате notes.json.
+
+    Аргументы:
+    snapshot (dict): Категория -> список словарей заметок.
+    min_size (int, optional): Более короткое содержимое не выносится: ссылка не меньше его самого.
+
+    Возвращает:
+    dict: {"format": FORMAT, "blobs": {хеш: содержимое}, "notes": {категория: [...]}} или snapshot.
+    """
+    counts = {}
+    for notes in snapshot.values():
+        for note in notes:
+            content = note["content"]
+            if len(content) >= min_size:
+                counts[content] = counts.get(content, 0) + 1
+    digests = {content: content_digest(content) for content, count in counts.items() if count > 1}
+    if not digests:
+        return snapshot
+    packed = {}
+    for category, notes in snapshot.items():
+        packed[category] = []
+        for note in notes:
+            digest = digests.get(note["content"])
+            if digest is not None:
+                note = {("blob" if key == "content" else key): (digest if key == "content" else value)
+                        for key, value in note.items()}
+            packed[category].append(note)
+    blobs = {digest: content for content, digest in digests.items()}
+    return {"format": FORMAT, "blobs": blobs, "notes": packed}
+
+
+def resolve_blob(note, blobs):
+    """
+    Подставляет в словарь заметки содержимое общего блока вместо ссылки "blob".
+
+    Аргументы:
+    note (dict): Словарь заметки.
+    blobs (dict): Хеш -> содержимое.
+
+    Возвращает:
+    dict: Словарь заметки с полем "content" (тот же словарь, если ссылки нет).
+
+    Исключения:
+    ValueError: Если блока с таким хешем нет.
+    """
+    if "blob" not in note:
+        return note
+    note = dict(note)
+    digest = note.pop("blob")
+    try:
+        note["content"] = blobs[digest]
+    except KeyError:
+        raise ValueError(f"Missing content blob {digest}") from None
+    return note
+
+
+def unpack_snapshot(notes_data):
+    """
+    Приводит данные notes.json с общими блоками к формату по категориям.
+
+    Заметки с одинаковым содержимым получают одну и ту же строку.
+    Данные старых форматов возвращаются без изменений.
+
+    Аргументы:
+    notes_data (dict | list): Данные файла notes.json.
+
+    Возвращает:
+    dict | list: Заметки по категориям (или список заметок старого формата).
+
+    Исключения:
+    ValueError: Если формат новее поддерживаемого или блок не найден.
+    """
+    if not is_packed(notes_data):
+        return notes_data
+    if notes_data["format"] > FORMAT:
+        raise ValueError(f"Unsupported notes file format {notes_data['format']}")
+    blobs = notes_data.get("blobs", {})
+    return {category: [resolve_blob(note, blobs) for note in notes]
+            for category, notes in notes_data.get("notes", {}).items()}
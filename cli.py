@@ -0,0 +1,297 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+
+from archive import convert_notes_file, export_jsonl, import_jsonl, is_jsonl, iter_notes_file
+from blobs import BlobStore, unpack_snapshot
+from data import NoteManager, write_snapshot
+from filesync import NoteFileSync
+from index import split_query
+from parallel_search import ParallelSearch
+from tags import is_filter
+
+DEFAULT_FILE = "notes.json"
+
+
+def read_notes_file(filename):
+    """
+    Читает файл notes.json без построения индекса.
+
+    Общие блоки содержимого подставляются в заметки, поэтому результат
+    всегда в формате по категориям, где у каждой заметки есть "content".
+
+    Аргументы:
+    filename (str): Имя файла.
+
+    Возвращает:
+    dict: Категория -> список словарей заметок; пустой словарь, если файла нет.
+    """
+    try:
+        with open(filename, 'r') as file:
+            notes_data = unpack_snapshot(json.load(file))
+    except FileNotFoundError:
+        return {}
+    if isinstance(notes_data, list):  # Старый формат, просто список заметок
+        notes_by_category = {}
+        for note in notes_data:
+            category = note.get("category", "Uncategorized")
+            notes_by_category.setdefault(category, []).append(dict(note, category=category))
+        return notes_by_category
+    return notes_data
+
+
+def open_manager(args):
+    """
+    Открывает хранилище, выбранное аргументами командной строки.
+
+    Файл JSON читается и записывается через NoteFileSync (под FileLock и с
+    идентификаторами заметок), как в окнах приложения: открытое окно
+    вливает изменения скрипта, а не перечитывает файл, теряя свои
+    несохранённые заметки. Синхронизация сохраняется в args.file_sync.
+
+    Аргументы:
+    args (argparse.Namespace): Аргументы с полями file, journal и sqlite.
+
+    Возвращает:
+    NoteManager: Менеджер заметок с загруженными заметками.
+    """
+    manager = NoteManager()
+    if args.sqlite or args.journal:
+        # sqlite3 и журнал нужны не всем командам, поэтому импортируются по требованию
+        from storage import JournalStorage, SQLiteStorage
+        manager.attach_storage(SQLiteStorage(args.sqlite) if args.sqlite else JournalStorage(args.journal))
+    else:
+        args.file_sync = NoteFileSync(manager, args.file)
+        args.file_sync.load()
+    return manager
+
+
+def save_manager(manager, args):
+    """
+    Записывает заметки в файл JSON, предварительно влив изменения других процессов.
+
+    Аргументы:
+    manager (NoteManager): Менеджер заметок, открытый open_manager().
+    args (argparse.Namespace): Аргументы командной строки.
+
+    Исключения:
+    RuntimeError: Если файл не удалось записать, потому что его постоянно меняют.
+    """
+    if not args.file_sync.save_manager():
+        raise RuntimeError(f"{args.file} keeps changing; notes were not saved")
+
+
+def close_manager(manager, args, changed=False):
+    """
+    Сохраняет изменения (для файла JSON) и закрывает хранилище.
+
+    Аргументы:
+    manager (NoteManager): Менеджер заметок.
+    args (argparse.Namespace): Аргументы командной строки.
+    changed (bool, optional): Были ли изменения, которые нужно записать в файл JSON.
+    """
+    if changed and manager.storage is None:
+        save_manager(manager, args)
+    manager.close()
+
+
+def _uses_file(args):
+    return not (args.sqlite or args.journal)
+
+
+def command_add(args, out):
+    content = sys.stdin.read() if args.content == "-" else args.content
+    manager = open_manager(args)
+    note = manager.add_note(args.title, content, args.category, args.tag)
+    close_manager(manager, args, changed=True)
+    print(note.id, file=out)
+    return 0
+
+
+def command_search(args, out):
+    found = 0
+    if args.regex or args.case_sensitive:
+        # Индекс не помогает: все заметки просматриваются параллельно, результаты выводятся по мере готовности
+        manager = open_manager(args)
+        try:
+            with ParallelSearch(manager, workers=args.workers) as engine:
+                for notes in engine.search(args.query, args.regex, args.case_sensitive):
+                    for note in notes[:None if args.limit is None else args.limit - found]:
+                        print(f"{note.category}\t{note.title}", file=out, flush=True)
+                    found += len(notes)
+                    if args.limit is not None and found >= args.limit:
+                        break
+        except re.error as error:
+            print(f"Invalid regular expression: {error}", file=sys.stderr)
+            return 2
+        finally:
+            manager.close()
+    elif _uses_file(args) and not is_filter(args.query):
+        # Для файла JSON индекс не строится: один проход по заметкам с выводом по мере нахождения
+        terms = split_query(args.query)
+        if terms:
+            for category, note in iter_notes_file(args.file):
+                content = note["content"].lower()
+                if all(term in content for term in terms):
+                    print(f"{category}\t{note['title']}", file=out, flush=True)
+                    found += 1
+                    if found == args.limit:
+                        return 0
+    else:
+        manager = open_manager(args)
+        for note in manager.search_notes(args.query)[:args.limit]:
+            print(f"{note.category}\t{note.title}", file=out)
+            found += 1
+        manager.close()
+    return 0 if found else 1
+
+
+def _progress(args):
+    # Ход длинных операций выводится в stderr, чтобы не смешиваться с выводом команды
+    if not args.progress:
+        return None
+
+    def report(done, total):
+        print(f"\r{done}" + (f"/{total}" if total is not None else "") + " notes", end="", file=sys.stderr, flush=True)
+    return report
+
+
+def command_export(args, out):
+    progress = _progress(args)
+    if is_jsonl(args.output) and _uses_file(args):
+        # notes.json любого формата преобразуется потоково, без загрузки в память
+        convert_notes_file(args.file, args.output, progress=progress)
+    elif _uses_file(args):
+        write_snapshot(read_notes_file(args.file), args.output)
+    else:
+        manager = open_manager(args)
+        if is_jsonl(args.output):
+            export_jsonl(manager, args.output, progress=progress)
+        else:
+            manager.save_to_file(args.output, deduplicate=False)
+        manager.close()
+    if progress is not None:
+        print(file=sys.stderr)
+    print(f"Exported to {args.output}", file=out)
+    return 0
+
+
+def command_import(args, out):
+    progress = _progress(args)
+    manager = open_manager(args)
+    if os.path.isdir(args.source):
+        from importer import import_directory
+        count = len(import_directory(manager, args.source, category=args.category))
+    elif is_jsonl(args.source):
+        count = import_jsonl(manager, args.source, category=args.category, progress=progress)
+    else:
+        count = len(manager.add_notes((note["title"], note["content"], args.category or category,
+                                       note.get("created"), note.get("modified"), note.get("tags", ()))
+                                      for category, items in read_notes_file(args.source).items() for note in items))
+    close_manager(manager, args, changed=bool(count))
+    if progress is not None:
+        print(file=sys.stderr)
+    print(f"Imported {count} notes", file=out)
+    return 0
+
+
+def command_stats(args, out):
+    dedup = None
+    if _uses_file(args):
+        notes_by_category = read_notes_file(args.file)
+        counts = {category: len(notes) for category, notes in notes_by_category.items()}
+        if args.dedup:
+            blobs = BlobStore()
+            for notes in notes_by_category.values():
+                for note in notes:
+                    blobs.acquire(note["content"])
+            dedup = blobs.stats()
+    else:
+        manager = open_manager(args)
+        counts = {category: len(notes) for category, notes in manager.notes.items()}
+        if args.dedup:
+            dedup = manager.dedup_stats()
+        manager.close()
+    stats = {"notes": sum(counts.values()), "categories": len(counts), "by_category": counts}
+    if dedup is not None:
+        stats["dedup"] = dedup
+    if args.json:
+        json.dump(stats, out, ensure_ascii=False, indent=2)
+        out.write("\n")
+    else:
+        print(f"Notes: {stats['notes']}", file=out)
+        print(f"Categories: {stats['categories']}", file=out)
+        for category, count in counts.items():
+            print(f"  {category}: {count}", file=out)
+        if dedup is not None:
+            print(f"Dedup: {dedup['blobs']} blobs for {dedup['references']} notes, ratio {dedup['ratio']:.2f}, "
+                  f"{dedup['saved_bytes']} bytes saved", file=out)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Command-line access to notes without the GUI.")
+    store = parser.add_mutually_exclusive_group()
+    store.add_argument("--file", default=DEFAULT_FILE, help=f"notes JSON file (default {DEFAULT_FILE})")
+    store.add_argument("--journal", help="journal storage path (without .snap/.journal)")
+    store.add_argument("--sqlite", help="SQLite database file")
+    parser.add_argument("--verbose", action="store_true", help="print log messages")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a note")
+    add.add_argument("title")
+    add.add_argument("content", nargs="?", default="-", help="note text; '-' reads it from stdin")
+    add.add_argument("--category")
+    add.add_argument("--tag", action="append", default=[], help="tag the note (repeatable)")
+    add.set_defaults(handler=command_add)
+
+    search = commands.add_parser("search", help="print 'category<TAB>title' of matching notes")
+    search.add_argument("query", help="words to find, or a filter such as '#a AND category:Work AND NOT #b'")
+    search.add_argument("--limit", type=int, default=None, help="stop after this many results")
+    search.add_argument("--regex", action="store_true", help="treat the query as a regular expression")
+    search.add_argument("--case-sensitive", action="store_true", help="match letter case exactly")
+    search.add_argument("--workers", type=int, default=None,
+                        help="processes for --regex/--case-sensitive scans (default: number of cores)")
+    search.set_defaults(handler=command_search)
+
+    export = commands.add_parser("export", help="write all notes to a JSON or JSON Lines (.jsonl, .jsonl.gz) file")
+    export.add_argument("output")
+    export.add_argument("--progress", action="store_true", help="print progress to stderr")
+    export.set_defaults(handler=command_export)
+
+    import_ = commands.add_parser("import", help="add notes from a JSON or JSON Lines file or a directory of .txt/.md files")
+    import_.add_argument("source")
+    import_.add_argument("--category", help="category for the imported notes")
+    import_.add_argument("--progress", action="store_true", help="print progress to stderr")
+    import_.set_defaults(handler=command_import)
+
+    stats = commands.add_parser("stats", help="print note counts")
+    stats.add_argument("--json", action="store_true", help="print as JSON")
+    stats.add_argument("--dedup", action="store_true", help="report shared note content: dedup ratio and bytes saved")
+    stats.set_defaults(handler=command_stats)
+    return parser
+
+
+def main(argv=None, out=None):
+    """
+    Точка входа командной строки: python -m cli <команда>.
+
+    Модуль не импортирует tkinter и не создаёт окно.
+
+    Аргументы:
+    argv (list, optional): Аргументы; по умолчанию sys.argv[1:].
+    out (file, optional): Поток вывода; по умолчанию sys.stdout.
+
+    Возвращает:
+    int: Код возврата.
+    """
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    return args.handler(args, out or sys.stdout)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,432 @@
+import functools
+import heapq
 import json
 import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from itertools import islice
 
-logging.basicConfig(level=logging.INFO)
+from blobs import BlobStore, pack_snapshot, unpack_snapshot
+from history import NoteHistory
+from index import TitleIndex, TokenIndex, fuzzy_scorer, normalize_title
+from metrics import metrics
+from sorted_index import SortedIndex
+from tags import TagIndex, is_filter, iter_bits, normalize_tags, parse_filter
 
 class Note:
     """
     Класс, представляющий заметку.
 
+    Заметка хранится компактно: без __dict__ (__slots__), с общей строкой
+    категории (sys.intern). Содержимое «холодной» заметки может храниться
+    сжатым (zlib) и распаковывается только при чтении.
+
     Атрибуты:
     title (str): Заголовок заметки.
     content (str): Содержимое заметки.
     category (str): Категория заметки.
+    id (int): Идентификатор заметки, назначается менеджером.
+    created (float): Время создания (секунды с начала эпохи).
+    modified (float): Время последнего изменения заголовка, содержимого или тегов.
+    tags (tuple): Отсортированные теги заметки (в нижнем регистре).
+    loader (callable): Функция загрузки содержимого по идентификатору, если содержимое
+        хранится вне памяти (например, в SQLite). По умолчанию None.
     """
-    def __init__(self, title, content, category=None):
+    __slots__ = ("title", "_content", "_category", "id", "created", "modified", "tags", "loader")
+
+    def __init__(self, title, content, category=None, id=None, created=None, modified=None, tags=()):
         self.title = title
-        self.content = content
+        self._content = content
         self.category = category if category else "Uncategorized"
+        self.id = id
+        self.created = time.time() if created is None else created
+        self.modified = self.created if modified is None else modified
+        self.tags = normalize_tags(tags) if tags else ()
+        self.loader = None
+
+    @property
+    def category(self):
+        return self._category
+
+    @category.setter
+    def category(self, value):
+        self._category = sys.intern(value)
+
+    @property
+    def content(self):
+        if self._content is None and self.loader is not None:
+            return self.loader(self.id)
+        if isinstance(self._content, bytes):
+            return zlib.decompress(self._content).decode("utf-8")
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
+    @property
+    def stored_content(self):
+        """
+        Содержимое в том виде, в каком оно хранится: строка, сжатые байты или None.
+
+        Любое изменение содержимого заменяет этот объект другим, поэтому по
+        нему можно заметить правку без распаковки и загрузки содержимого.
+        """
+        return self._content
+
+    @property
+    def compressed(self):
+        return isinstance(self._content, bytes)
+
+    def compress(self, min_size=0):
+        """
+        Сжимает содержимое заметки, если это уменьшает его размер.
+
+        Аргументы:
+        min_size (int, optional): Минимальный размер содержимого в символах для сжатия.
+
+        Возвращает:
+        bool: True, если содержимое теперь хранится сжатым.
+        """
+        if isinstance(self._content, str) and len(self._content) >= min_size:
+            packed = zlib.compress(self._content.encode("utf-8"))
+            if len(packed) < sys.getsizeof(self._content):
+                self._content = packed
+        return self.compressed
+
+    def memory_size(self):
+        """
+        Возвращает примерный объём памяти заметки в байтах (без общей строки категории).
+
+        Возвращает:
+        int: Объём памяти.
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.title)
+        if self._content is not None:
+            size += sys.getsizeof(self._content)
+        return size
+
+    def to_dict(self, include_id=False):
+        """
+        Возвращает заметку в виде словаря для сохранения в JSON.
+
+        Аргументы:
+        include_id (bool, optional): Добавить идентификатор заметки.
+
+        Возвращает:
+        dict: Поля заметки.
+        """
+        data = {"title": self.title, "content": self.content, "category": self.category,
+                "created": self.created, "modified": self.modified}
+        if self.tags:
+            data["tags"] = list(self.tags)
+        if include_id:
+            data["id"] = self.id
+        return data
 
     def __repr__(self):
-        return f"Note({self.title}, {len(self.content)} chars, {self.category})"
+        if self._content is None:
+            return f"Note({self.title}, lazy, {self.category})"
+        if self.compressed:
+            return f"Note({self.title}, compressed, {self.category})"
+        return f"Note({self.title}, {len(self._content)} chars, {self.category})"
+
+@metrics.timed("write_snapshot")
+def write_snapshot(snapshot, filename, deduplicate=False):
+    """
+    Атомарно записывает снимок заметок в файл JSON.
+
+    Данные пишутся во временный файл рядом с целевым и затем заменяют его,
+    поэтому при сбое на диске остаётся либо старая, либо новая версия.
+
+    Аргументы:
+    snapshot (dict): Снимок, полученный из NoteManager.snapshot().
+    filename (str): Имя файла для сохранения.
+    deduplicate (bool, optional): Записать повторяющееся содержимое один раз (см. blobs.pack_snapshot()).
+    """
+    filename = os.fspath(filename)
+    if deduplicate:
+        snapshot = pack_snapshot(snapshot)
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(snapshot, file)
+            metrics.observe("write_snapshot.bytes", file.tell())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_name, filename)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+class CategoryNotes:
+    """
+    Упорядоченные заметки одной категории с доступом по идентификатору.
+
+    Добавление, удаление и поиск заметки по идентификатору выполняются за O(1);
+    порядок совпадает с порядком добавления в категорию.
+    """
+    def __init__(self, notes=()):
+        self._notes = {note.id: note for note in notes}
+
+    def __len__(self):
+        return len(self._notes)
+
+    def __iter__(self):
+        return iter(self._notes.values())
+
+    def __contains__(self, note):
+        return self._notes.get(note.id) is note
+
+    def __getitem__(self, position):
+        """
+        Возвращает заметку по позиции (за время, пропорциональное позиции).
+        """
+        if position < 0:
+            position += len(self._notes)
+        if not 0 <= position < len(self._notes):
+            raise IndexError("note position out of range")
+        return next(islice(self._notes.values(), position, None))
+
+    def __repr__(self):
+        return f"CategoryNotes({list(self._notes.values())})"
+
+    def ids(self, offset=0, limit=None):
+        """
+        Возвращает идентификаторы заметок по порядку.
+
+        Аргументы:
+        offset (int, optional): Сколько заметок пропустить.
+        limit (int, optional): Максимальное количество идентификаторов.
+
+        Возвращает:
+        list: Идентификаторы заметок.
+        """
+        stop = None if limit is None else offset + limit
+        return list(islice(self._notes, offset, stop))
+
+    def add(self, note):
+        self._notes[note.id] = note
+
+    def memory_size(self):
+        return sys.getsizeof(self._notes)
+
+    def remove(self, note_id):
+        return self._notes.pop(note_id, None)
+
+    def get(self, note_id):
+        return self._notes.get(note_id)
+
+    def index(self, note):
+        """
+        Возвращает позицию заметки в категории.
+        """
+        for position, note_id in enumerate(self._notes):
+            if note_id == note.id:
+                return position
+        raise ValueError(f"{note!r} is not in category")
+
+# Ключи вторичных индексов NoteManager.query(); идентификатор делает ключ уникальным
+ORDER_KEYS = {
+    "title": lambda note: (note.title.lower(), note.id),
+    "modified": lambda note: (note.modified, note.id),
+}
+QUERY_BATCH = 256
+
+def _synchronized(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class NoteManager:
     """
     Класс для управления заметками.
 
+    Каждая заметка имеет постоянный идентификатор. Основной словарь хранит
+    заметки по идентификатору, а для каждой категории ведётся упорядоченный
+    вторичный индекс CategoryNotes. Методы с адресацией (категория, индекс)
+    оставлены как обёртки над методами с идентификатором. Для сортировки по
+    ORDER_KEYS (заголовок, время изменения) ведутся отсортированные индексы
+    SortedIndex — общий и для каждой категории (см. query()). Теги и
+    категории заметок дополнительно хранятся битовыми картами TagIndex для
+    логических фильтров (см. filter_notes()). Одинаковое содержимое заметок
+    хранится одной общей строкой BlobStore (см. dedup_stats()).
+
     Атрибуты:
-    notes (dict): Словарь с заметками, организованными по категориям.
+    notes (dict): Словарь категория -> CategoryNotes.
+    index (TokenIndex): Инвертированный индекс по содержимому заметок.
+    tags (TagIndex): Битовые карты тегов и категорий.
+    titles (TitleIndex): Триграммный индекс заголовков для быстрого перехода (см. quick_open()).
+    blobs (BlobStore): Общие строки содержимого заметок с подсчётом ссылок.
+    storage (Storage): Подключённое хранилище (см. storage.py) или None.
+    lock (threading.RLock): Блокировка для чтения из фоновых потоков (например, живого поиска).
+    HOT_NOTES (int): Сколько последних прочитанных или изменённых заметок не сжимается.
+    HISTORY_LIMIT (int): Сколько прошлых версий хранится для каждой заметки.
+    history (dict): Идентификатор заметки -> NoteHistory с прошлыми версиями.
+    version (int): Счётчик изменений; увеличивается при каждом изменении заметок.
     """
+    HOT_NOTES = 1024
+    HISTORY_LIMIT = 100
+    QUICK_OPEN_CANDIDATES = 100
+    QUICK_OPEN_GOOD = 2.0
+
     def __init__(self):
+        self.lock = threading.RLock()
+        self.version = 0
         self.notes = {}
+        self.index = TokenIndex()
+        self.tags = TagIndex()
+        self.titles = TitleIndex()
+        self.blobs = BlobStore()
+        self.storage = None
+        self._by_id = {}
+        self._order = {}
+        self._next_id = 1
+        self._next_order = 0
+        self._recent = OrderedDict()
+        self.history = {}
+        self._orders = {field: {None: SortedIndex()} for field in ORDER_KEYS}
+
+    def _touch(self, note_id):
+        self._recent[note_id] = None
+        self._recent.move_to_end(note_id)
+        if len(self._recent) > self.HOT_NOTES:
+            self._recent.popitem(last=False)
+
+    def _register(self, note):
+        if note.id is None:
+            note.id = self._next_id
+        self._next_id = max(self._next_id, note.id + 1)
+        self._by_id[note.id] = note
+        self.index.add(note)
+        self.titles.add(note)
+
+    def _share(self, note):
+        # Содержимое в памяти (не сжатое и не загружаемое по требованию) берётся из общих строк
+        if isinstance(note._content, str):
+            note._content = self.blobs.acquire(note._content)
+
+    def _unshare(self, note):
+        if isinstance(note._content, str):
+            self.blobs.release(note._content)
+
+    def _place(self, note, category):
+        note.category = category
+        if category not in self.notes:
+            self.notes[category] = CategoryNotes()
+        self.notes[category].add(note)
+        self._next_order += 1
+        self._order[note.id] = self._next_order
+
+    def _index_order(self, note):
+        for field, key in ORDER_KEYS.items():
+            indexes = self._orders[field]
+            indexes[None].add(key(note))
+            if note.category not in indexes:
+                indexes[note.category] = SortedIndex()
+            indexes[note.category].add(key(note))
+
+    def _index_orders(self, notes):
+        # Ключи пакета добавляются в каждый отсортированный индекс одним вызовом
+        for field, key in ORDER_KEYS.items():
+            indexes = self._orders[field]
+            grouped = {}
+            for note in notes:
+                grouped.setdefault(note.category, []).append(key(note))
+            indexes[None].update(key for keys in grouped.values() for key in keys)
+            for category, keys in grouped.items():
+                if category not in indexes:
+                    indexes[category] = SortedIndex()
+                indexes[category].update(keys)
+
+    def _unindex_order(self, note):
+        for field, key in ORDER_KEYS.items():
+            indexes = self._orders[field]
+            indexes[None].discard(key(note))
+            indexes[note.category].discard(key(note))
+
+    def _record(self, op, **fields):
+        self.version += 1
+        if self.storage is not None:
+            self.storage.record(op, fields)
+
+    def attach_storage(self, storage):
+        """
+        Подключает хранилище: загружает из него заметки и начинает записывать изменения.
+
+        Если хранилище предоставляет собственный поисковый индекс, он заменяет TokenIndex.
+
+        Аргументы:
+        storage (Storage): Хранилище заметок.
+        """
+        if storage.index is not None:
+            self.index = storage.index
+        storage.load(self)
+        self.storage = storage
 
-    def add_note(self, title, content, category=None):
+    def close(self):
+        """
+        Закрывает подключённое хранилище.
+        """
+        if self.storage is not None:
+            self.storage.close()
+            self.storage = None
+
+    def apply_record(self, record):
+        """
+        Применяет запись журнала изменений, не записывая её повторно.
+
+        Аргументы:
+        record (dict): Запись журнала с полем "op".
+        """
+        storage, self.storage = self.storage, None
+        try:
+            op = record["op"]
+            if op == "add":
+                note = Note(record["title"], record["content"], record["category"], id=record["id"],
+                            created=record.get("created"), modified=record.get("modified"), tags=record.get("tags", ()))
+                self._share(note)
+                self._register(note)
+                self._place(note, note.category)
+                self._index_order(note)
+                self.tags.add(note)
+            elif op == "add_many":
+                self._add_batch([Note(fields["title"], fields["content"], fields["category"], id=fields["id"],
+                                      created=fields.get("created"), modified=fields.get("modified"),
+                                      tags=fields.get("tags", ()))
+                                 for fields in record["notes"]])
+                for fields in record["notes"]:
+                    if fields.get("history"):
+                        self.history[fields["id"]] = NoteHistory.from_dict(fields["history"])
+            elif op == "update":
+                self.update_note_by_id(record["id"], record["title"], record["content"], record.get("time"))
+            elif op == "patch":
+                self.patch_note_by_id(record["id"], record["start"], record["end"], record["text"], record.get("time"))
+            elif op == "delete":
+                self.delete_note_by_id(record["id"])
+            elif op == "move":
+                self.move_note_by_id(record["id"], record["category"])
+            elif op == "tags":
+                self.set_tags(record["id"], record["tags"], record.get("time"))
+            elif op == "rename_category":
+                self.rename_category(record["old"], record["new"])
+            elif op == "delete_category":
+                self.delete_category(record["category"])
+            else:
+                raise ValueError(f"Unknown journal operation: {op}")
+        finally:
+            self.storage = storage
+
+    @metrics.timed("add_note")
+    @_synchronized
+    def add_note(self, title, content, category=None, tags=()):
         """
         Добавляет новую заметку.
 
@@ -38,17 +434,270 @@ class NoteManager:
         title (str): Заголовок заметки.
         content (str): Содержимое заметки.
         category (str, optional): Категория заметки. По умолчанию None.
+        tags (iterable, optional): Теги заметки.
 
         Возвращает:
         Note: Созданная заметка.
         """
-        note = Note(title, content, category)
-        if category not in self.notes:
-            self.notes[category] = []
-        self.notes[category].append(note)
-        logging.info(f"Note added: {note}")
+        note = Note(title, content, category, tags=tags)
+        self._share(note)
+        self._register(note)
+        self._place(note, note.category)
+        self._index_order(note)
+        self.tags.add(note)
+        self._record("add", **note.to_dict(include_id=True))
+        logging.info("Note added: %s", note)
+        return note
+
+    @metrics.timed("add_notes")
+    @_synchronized
+    def add_notes(self, notes):
+        """
+        Добавляет заметки одним пакетом.
+
+        Индекс обновляется одним вызовом, хранилище получает одну запись
+        add_many (вместе с историей версий), а в журнал приложения пишется одна итоговая строка.
+
+        Аргументы:
+        notes (iterable): Кортежи (title, content, category) или
+            (title, content, category, created, modified[, tags[, history]]) с сохранённым
+            временем, тегами и историей версий (NoteHistory.to_dict()).
+
+        Возвращает:
+        list: Созданные заметки.
+        """
+        added, histories = [], []
+        for title, content, category, *extra in notes:
+            added.append(Note(title, content, category, None, *extra[:3]))
+            histories.append(extra[3] if len(extra) > 3 else None)
+        if not added:
+            return added
+        self._add_batch(added)
+        records = []
+        for note, history in zip(added, histories):
+            fields = note.to_dict(include_id=True)
+            if history:
+                self.history[note.id] = NoteHistory.from_dict(history)
+                fields["history"] = history
+            records.append(fields)
+        self._record("add_many", notes=records)
+        logging.info("%s notes added", len(added))
+        return added
+
+    def _add_batch(self, notes):
+        for note in notes:
+            if note.id is None:
+                note.id = self._next_id
+            self._next_id = max(self._next_id, note.id + 1)
+            self._by_id[note.id] = note
+            self._share(note)
+            self._place(note, note.category)
+            self.tags.add(note)
+        self._index_orders(notes)
+        self.index.add_many(notes)
+        self.titles.add_many(notes)
+
+    def get_note(self, note_id):
+        """
+        Возвращает заметку по идентификатору.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+
+        Возвращает:
+        Note: Заметка или None.
+        """
+        return self._by_id.get(note_id)
+
+    def note_id_at(self, category, index):
+        """
+        Возвращает идентификатор заметки по индексу в категории.
+
+        Аргументы:
+        category (str): Категория заметки.
+        index (int): Индекс заметки.
+
+        Возвращает:
+        int: Идентификатор заметки или None, если индекс вне диапазона.
+        """
+        notes = self.notes.get(category)
+        if notes is not None and 0 <= index < len(notes):
+            return notes[index].id
+        return None
+
+    @metrics.timed("delete_note_by_id")
+    @_synchronized
+    def delete_note_by_id(self, note_id):
+        """
+        Удаляет заметку по идентификатору.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+
+        Возвращает:
+        Note: Удалённая заметка или None.
+        """
+        note = self._by_id.pop(note_id, None)
+        if note is None:
+            return None
+        self.notes[note.category].remove(note_id)
+        self._unindex_order(note)
+        self.tags.remove(note)
+        del self._order[note_id]
+        self._recent.pop(note_id, None)
+        self.history.pop(note_id, None)
+        self.index.remove(note)
+        self.titles.remove(note)
+        self._unshare(note)
+        self._record("delete", id=note_id)
+        logging.info("Note deleted: %s", note)
+        return note
+
+    @metrics.timed("update_note_by_id")
+    @_synchronized
+    def update_note_by_id(self, note_id, title, content, timestamp=None):
+        """
+        Обновляет заголовок и содержимое заметки по идентификатору.
+
+        Прежняя версия сохраняется в истории заметки (см. revisions()).
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+        title (str): Новый заголовок заметки.
+        content (str): Новое содержимое заметки.
+        timestamp (float, optional): Время изменения; по умолчанию текущее.
+
+        Возвращает:
+        Note: Обновлённая заметка или None.
+        """
+        note = self._by_id.get(note_id)
+        if note is None:
+            return None
+        timestamp = time.time() if timestamp is None else timestamp
+        self._set_content(note, title, note.content, content, timestamp)
+        self._record("update", id=note_id, title=title, content=content, time=timestamp)
+        logging.info("Note updated: %s", note)
+        return note
+
+    @metrics.timed("patch_note_by_id")
+    @_synchronized
+    def patch_note_by_id(self, note_id, start, end, text, timestamp=None):
+        """
+        Заменяет участок содержимого заметки.
+
+        В журнал изменений записывается только изменённый участок, поэтому
+        правка большой заметки не переписывает её целиком.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+        start (int): Начало заменяемого участка (в символах).
+        end (int): Конец заменяемого участка (не включая).
+        text (str): Новый текст участка.
+        timestamp (float, optional): Время изменения; по умолчанию текущее.
+
+        Возвращает:
+        Note: Обновлённая заметка или None.
+        """
+        note = self._by_id.get(note_id)
+        if note is None:
+            return None
+        timestamp = time.time() if timestamp is None else timestamp
+        old_content = note.content
+        if not 0 <= start <= end <= len(old_content):
+            raise ValueError(f"Patch range {start}:{end} is outside note {note_id}")
+        self._set_content(note, note.title, old_content, old_content[:start] + text + old_content[end:], timestamp)
+        self._record("patch", id=note_id, start=start, end=end, text=text, time=timestamp)
+        logging.info("Note patched: %s", note)
+        return note
+
+    def _set_content(self, note, title, old_content, content, timestamp):
+        if title != note.title or content != old_content:
+            history = self.history.get(note.id)
+            if history is None:
+                history = self.history[note.id] = NoteHistory()
+            history.record(note.title, old_content, content, timestamp)
+            if len(history) > self.HISTORY_LIMIT:
+                history.prune(keep=self.HISTORY_LIMIT)
+        self._unindex_order(note)
+        if title != note.title:
+            self.titles.update(note.id, note.title, title)
+        note.title = title
+        # Копирование при записи: общая строка остаётся у других заметок
+        self._unshare(note)
+        note.content = content
+        self._share(note)
+        note.modified = timestamp
+        self._index_order(note)
+        self._touch(note.id)
+        self.index.update(note)
+
+    @metrics.timed("move_note_by_id")
+    @_synchronized
+    def move_note_by_id(self, note_id, new_category):
+        """
+        Переносит заметку в другую категорию (в конец списка).
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+        new_category (str): Новая категория.
+
+        Возвращает:
+        Note: Перенесённая заметка или None.
+        """
+        note = self._by_id.get(note_id)
+        if note is None:
+            return None
+        self.notes[note.category].remove(note_id)
+        self._unindex_order(note)
+        self.tags.remove(note)
+        self._place(note, new_category)
+        self._index_order(note)
+        self.tags.add(note)
+        self._record("move", id=note_id, category=new_category)
+        logging.info("Note moved: %s", note)
+        return note
+
+    @metrics.timed("set_tags")
+    @_synchronized
+    def set_tags(self, note_id, tags, timestamp=None):
+        """
+        Заменяет теги заметки.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+        tags (iterable): Новые теги; регистр и повторы не учитываются.
+        timestamp (float, optional): Время изменения; по умолчанию текущее.
+
+        Возвращает:
+        Note: Заметка или None.
+        """
+        note = self._by_id.get(note_id)
+        if note is None:
+            return None
+        tags = normalize_tags(tags)
+        if tags == note.tags:
+            return note
+        timestamp = time.time() if timestamp is None else timestamp
+        self.tags.remove(note)
+        self._unindex_order(note)
+        note.tags = tags
+        note.modified = timestamp
+        self._index_order(note)
+        self.tags.add(note)
+        self._record("tags", id=note_id, tags=list(tags), time=timestamp)
+        logging.info("Note tags set: %s %s", note, tags)
         return note
 
+    @_synchronized
+    def tag_counts(self):
+        """
+        Возвращает теги и количество заметок с каждым из них.
+
+        Возвращает:
+        dict: Тег -> количество заметок, по алфавиту.
+        """
+        return self.tags.counts()
+
     def delete_note(self, category, index):
         """
         Удаляет заметку по индексу в указанной категории.
@@ -57,9 +706,9 @@ class NoteManager:
         category (str): Категория заметки.
         index (int): Индекс заметки для удаления.
         """
-        if category in self.notes and 0 <= index < len(self.notes[category]):
-            deleted_note = self.notes[category].pop(index)
-            logging.info(f"Note deleted: {deleted_note}")
+        note_id = self.note_id_at(category, index)
+        if note_id is not None:
+            self.delete_note_by_id(note_id)
 
     def update_note(self, category, index, title, content):
         """
@@ -71,11 +720,9 @@ class NoteManager:
         title (str): Новый заголовок заметки.
         content (str): Новое содержимое заметки.
         """
-        if category in self.notes and 0 <= index < len(self.notes[category]):
-            note = self.notes[category][index]
-            note.title = title
-            note.content = content
-            logging.info(f"Note updated: {note}")
+        note_id = self.note_id_at(category, index)
+        if note_id is not None:
+            self.update_note_by_id(note_id, title, content)
 
     def get_notes(self, category):
         """
@@ -87,7 +734,83 @@ class NoteManager:
         Возвращает:
         list: Список заметок в категории.
         """
-        return self.notes.get(category, [])
+        return list(self.notes.get(category, ()))
+
+    @_synchronized
+    def note_page(self, category, offset, limit):
+        """
+        Возвращает страницу заметок категории по порядку.
+
+        Аргументы:
+        category (str): Категория заметок.
+        offset (int): Сколько заметок пропустить.
+        limit (int): Максимальное количество заметок.
+
+        Возвращает:
+        list: Заметки страницы.
+        """
+        notes = self.notes.get(category)
+        if notes is None:
+            return []
+        return [self._by_id[note_id] for note_id in notes.ids(offset, limit)]
+
+    @metrics.timed("query")
+    @_synchronized
+    def query(self, category=None, order_by=None, reverse=False, offset=0, limit=None):
+        """
+        Возвращает заметки с фильтром по категории, сортировкой и постраничным выводом.
+
+        Для order_by из ORDER_KEYS используется отсортированный индекс, и
+        страница читается за O(log n + k). Заметки выдаются лениво пакетами
+        по QUERY_BATCH; каждый следующий пакет продолжает с последнего
+        выданного ключа, поэтому изменения между пакетами не приводят к
+        повторам и пропускам. Без order_by заметки идут в порядке категорий
+        (как в get_notes()), а смещение стоит O(offset).
+
+        Аргументы:
+        category (str, optional): Категория; по умолчанию все заметки.
+        order_by (str, optional): "title" или "modified".
+        reverse (bool, optional): Обратный порядок (например, сначала недавно изменённые).
+        offset (int, optional): Сколько заметок пропустить.
+        limit (int, optional): Максимальное количество заметок.
+
+        Возвращает:
+        iterator: Заметки.
+        """
+        if order_by is not None and order_by not in ORDER_KEYS:
+            raise ValueError(f"Unknown order: {order_by}")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise ValueError("offset and limit must not be negative")
+        if order_by is None:
+            if category is None:
+                notes = (note for category_notes in self.notes.values() for note in category_notes)
+            else:
+                notes = self.notes.get(category, ())
+            stop = None if limit is None else offset + limit
+            return iter(list(islice(notes, offset, stop)))
+        return self._query_sorted(category, order_by, reverse, offset, limit)
+
+    def _query_sorted(self, category, order_by, reverse, offset, limit):
+        last = None
+        while limit is None or limit > 0:
+            size = QUERY_BATCH if limit is None else min(QUERY_BATCH, limit)
+            with self.lock:
+                index = self._orders[order_by].get(category)
+                if index is None:
+                    return
+                if reverse:
+                    stop = len(index) - offset if last is None else index.bisect_left(last)
+                    keys = list(index.islice(stop - size, stop, reverse=True))
+                else:
+                    start = offset if last is None else index.bisect_right(last)
+                    keys = list(index.islice(start, start + size))
+                notes = [self._by_id[key[-1]] for key in keys]
+            yield from notes
+            if len(keys) < size:
+                return
+            last = keys[-1]
+            if limit is not None:
+                limit -= len(keys)
 
     def get_note_content(self, category, index):
         """
@@ -100,21 +823,368 @@ class NoteManager:
         Возвращает:
         str: Содержимое заметки.
         """
-        if category in self.notes and 0 <= index < len(self.notes[category]):
-            return self.notes[category][index].content
+        note_id = self.note_id_at(category, index)
+        if note_id is not None:
+            return self.note_content(note_id)
         return ""
 
-    def save_to_file(self, filename):
+    @metrics.timed("note_content")
+    def note_content(self, note_id):
+        """
+        Возвращает содержимое заметки по идентификатору и отмечает её как используемую.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+
+        Возвращает:
+        str: Содержимое заметки или пустая строка.
+        """
+        note = self._by_id.get(note_id)
+        if note is None:
+            return ""
+        self._touch(note_id)
+        return note.content
+
+    @_synchronized
+    def revisions(self, note_id):
+        """
+        Возвращает список версий заметки.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+
+        Возвращает:
+        list: Словари {"revision", "time", "title"} от старых к новым; последняя — текущая версия.
+        Пустой список, если заметки нет.
+        """
+        note = self._by_id.get(note_id)
+        if note is None:
+            return []
+        history = self.history.get(note_id)
+        if history is None:
+            return [{"revision": 0, "time": None, "title": note.title}]
+        return history.revisions(note.title)
+
+    @_synchronized
+    def note_revision(self, note_id, revision):
+        """
+        Возвращает версию заметки.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+        revision (int): Номер версии из revisions().
+
+        Возвращает:
+        tuple: (title, content) или None, если заметки или версии нет.
+        """
+        note = self._by_id.get(note_id)
+        if note is None:
+            return None
+        history = self.history.get(note_id) or NoteHistory()
+        try:
+            return history.get(revision, note.title, note.content)
+        except IndexError:
+            return None
+
+    @metrics.timed("restore_revision")
+    @_synchronized
+    def restore_revision(self, note_id, revision):
+        """
+        Восстанавливает версию заметки; текущая версия остаётся в истории.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+        revision (int): Номер версии из revisions().
+
+        Возвращает:
+        Note: Обновлённая заметка или None, если заметки или версии нет.
+        """
+        version = self.note_revision(note_id, revision)
+        if version is None:
+            return None
+        return self.update_note_by_id(note_id, *version)
+
+    @metrics.timed("prune_history")
+    @_synchronized
+    def prune_history(self, keep=None, max_age=None):
+        """
+        Удаляет старые версии заметок по политике хранения.
+
+        Аргументы:
+        keep (int, optional): Сколько прошлых версий оставить у каждой заметки.
+        max_age (float, optional): Удалить версии, заменённые более max_age секунд назад.
+
+        Возвращает:
+        int: Количество удалённых версий.
+        """
+        removed = 0
+        now = time.time()
+        for note_id, history in list(self.history.items()):
+            removed += history.prune(keep, max_age, now)
+            if not history:
+                del self.history[note_id]
+        logging.info("%s old revisions removed", removed)
+        return removed
+
+    @metrics.timed("compress_cold")
+    @_synchronized
+    def compress_cold(self, min_size=512):
+        """
+        Сжимает содержимое заметок, которые давно не читались и не менялись.
+
+        Содержимое, общее для нескольких заметок, не сжимается: каждая заметка
+        получила бы свою сжатую копию.
+
+        Аргументы:
+        min_size (int, optional): Минимальный размер содержимого в символах для сжатия.
+
+        Возвращает:
+        int: Количество сжатых заметок.
+        """
+        compressed = 0
+        for note_id, note in self._by_id.items():
+            if note_id in self._recent or note.compressed or self.blobs.refcount(note._content) > 1:
+                continue  # Общая строка и так хранится один раз
+            content = note._content
+            if note.compress(min_size):
+                self.blobs.release(content)
+                compressed += 1
+        logging.info("%s cold notes compressed", compressed)
+        return compressed
+
+    @_synchronized
+    def memory_usage(self):
+        """
+        Возвращает примерный объём памяти заметок по категориям.
+
+        Учитываются объекты заметок, их заголовки и содержимое, индекс
+        категории и доля заметок в поисковом индексе (TokenIndex.memory_size()).
+        Общее содержимое учитывается у каждой заметки (экономию показывает dedup_stats()).
+
+        Возвращает:
+        dict: Категория -> объём в байтах.
+        """
+        return {category: sys.getsizeof(category) + notes.memory_size()
+                + sum(note.memory_size() + self.index.memory_size(note.id) for note in notes)
+                for category, notes in self.notes.items()}
+
+    @_synchronized
+    def dedup_stats(self):
+        """
+        Возвращает отчёт о дедупликации содержимого заметок в памяти.
+
+        Учитывается только содержимое, хранящееся в памяти несжатым.
+
+        Возвращает:
+        dict: Отчёт BlobStore.stats(): количество строк и ссылок, "logical_bytes",
+        "stored_bytes", "saved_bytes" и "ratio".
+        """
+        return self.blobs.stats()
+
+    def move_note(self, category, index, new_category):
+        """
+        Переносит заметку в другую категорию (в конец списка).
+
+        Аргументы:
+        category (str): Текущая категория заметки.
+        index (int): Индекс заметки в текущей категории.
+        new_category (str): Новая категория.
+
+        Возвращает:
+        Note: Перенесённая заметка или None.
+        """
+        note_id = self.note_id_at(category, index)
+        if note_id is not None:
+            return self.move_note_by_id(note_id, new_category)
+        return None
+
+    @metrics.timed("rename_category")
+    @_synchronized
+    def rename_category(self, old_category, new_category):
+        """
+        Переименовывает категорию.
+
+        Аргументы:
+        old_category (str): Текущее название категории.
+        new_category (str): Новое название категории.
+        """
+        if old_category in self.notes and new_category not in self.notes:
+            notes = self.notes.pop(old_category)
+            for note in notes:
+                note.category = new_category
+            self.notes[new_category] = notes
+            for indexes in self._orders.values():
+                if old_category in indexes:
+                    indexes[new_category] = indexes.pop(old_category)
+            self.tags.rename_category(old_category, new_category)
+            self._record("rename_category", old=old_category, new=new_category)
+            logging.info("Category '%s' renamed to '%s'", old_category, new_category)
+
+    @metrics.timed("delete_category")
+    @_synchronized
+    def delete_category(self, category):
+        """
+        Удаляет категорию вместе с её заметками.
+
+        Аргументы:
+        category (str): Категория для удаления.
+        """
+        for indexes in self._orders.values():
+            indexes.pop(category, None)
+        for note in self.notes.pop(category, ()):
+            for field, key in ORDER_KEYS.items():
+                self._orders[field][None].discard(key(note))
+            self.tags.remove(note)
+            del self._by_id[note.id]
+            del self._order[note.id]
+            self._recent.pop(note.id, None)
+            self.history.pop(note.id, None)
+            self.index.remove(note)
+            self.titles.remove(note)
+            self._unshare(note)
+        self.tags.drop_category(category)
+        self._record("delete_category", category=category)
+        logging.info("Category '%s' deleted", category)
+
+    @metrics.timed("search_notes")
+    @_synchronized
+    def search_notes(self, query):
+        """
+        Ищет заметки по содержимому с помощью индекса.
+
+        Несколько слов через пробел объединяются условием И. Запрос с
+        тегами или категориями ("#тег", "category:...") выполняется как
+        фильтр filter_notes(). Результаты упорядочены так же, как заметки в
+        категориях.
+
+        Аргументы:
+        query (str): Строка поиска.
+
+        Возвращает:
+        list: Список найденных заметок.
+        """
+        if is_filter(query):
+            try:
+                return self.filter_notes(query)
+            except ValueError as error:  # Фильтр ещё не дописан
+                logging.debug("Invalid filter %r: %s", query, error)
+                return []
+        return self._in_order(self.index.search(query))
+
+    @metrics.timed("quick_open")
+    @_synchronized
+    def quick_open(self, query, limit=20):
+        """
+        Находит заметки по заголовку с нечётким совпадением для быстрого перехода.
+
+        Кандидаты берутся из индекса сортировки по заголовку (заголовки,
+        начинающиеся с запроса) и из триграммного индекса заголовков
+        (TitleIndex), затем ранжируются fuzzy_scorer(). Если совпадений с
+        оценкой от QUICK_OPEN_GOOD (буквы запроса по порядку) меньше limit,
+        добавляются кандидаты для запроса с переставленными буквами. Число
+        оцениваемых кандидатов ограничено QUICK_OPEN_CANDIDATES, поэтому
+        время ответа почти не зависит от количества заметок. Допускаются
+        опечатки, переставленные буквы и слова и пропущенные буквы.
+
+        Аргументы:
+        query (str): Часть заголовка.
+        limit (int, optional): Максимальное количество результатов.
+
+        Возвращает:
+        list: Заметки, начиная с наиболее похожих.
+        """
+        query = normalize_title(query)
+        if not query:
+            return []
+        score = fuzzy_scorer(query)
+        scored = {}
+
+        def rank(note_ids):
+            for note_id in note_ids:
+                if note_id not in scored:
+                    scored[note_id] = score(self._by_id[note_id].title)
+
+        titles = self._orders["title"][None]
+        start = titles.bisect_left((query,))
+        rank(note_id for title, note_id in titles.islice(start, start + limit) if title.startswith(query))
+        rank(self.titles.candidates(query, self.QUICK_OPEN_CANDIDATES))
+        # Перестановки букв перебираются, только если совпадений без опечаток мало
+        if sum(value >= self.QUICK_OPEN_GOOD for value in scored.values()) < limit:
+            rank(self.titles.candidates(query, self.QUICK_OPEN_CANDIDATES, transpositions=True))
+        best = heapq.nlargest(limit, ((value, note_id) for note_id, value in scored.items() if value > 0))
+        return [self._by_id[note_id] for _, note_id in best]
+
+    @metrics.timed("filter_notes")
+    @_synchronized
+    def filter_notes(self, query):
+        """
+        Отбирает заметки логическим фильтром по тегам, категориям и словам содержимого.
+
+        Например, "#a AND category:Work AND NOT #c" или "(#a OR #b) молоко"
+        (синтаксис — см. tags.parse_filter()). Условия вычисляются побитовыми
+        операциями над картами TagIndex; слова содержимого ищутся по индексу.
+
+        Аргументы:
+        query (str): Фильтр.
+
+        Возвращает:
+        list: Подходящие заметки в том же порядке, что и в search_notes().
+
+        Исключения:
+        ValueError: Если фильтр записан с ошибкой.
+        """
+        bits = self.tags.evaluate(parse_filter(query), self.index.search)
+        return self._in_order(iter_bits(bits))
+
+    def _in_order(self, ids):
+        rank = {category: position for position, category in enumerate(self.notes)}
+        found = [self._by_id[note_id] for note_id in ids]
+        found.sort(key=lambda note: (rank[note.category], self._order[note.id]))
+        return found
+
+    @metrics.timed("save_to_file")
+    def save_to_file(self, filename, deduplicate=True):
         """
         Сохраняет заметки в файл.
 
         Аргументы:
         filename (str): Имя файла для сохранения.
+        deduplicate (bool, optional): Записать повторяющееся содержимое один раз; False —
+            прежний формат notes.json, где у каждой заметки своя копия (для экспорта).
+        """
+        write_snapshot(self.snapshot(include_history=True), filename, deduplicate)
+        logging.info("Notes saved to %s", filename)
+
+    @metrics.timed("snapshot")
+    @_synchronized
+    def snapshot(self, include_ids=False, include_history=False):
+        """
+        Возвращает согласованный снимок заметок для сохранения.
+
+        Снимок содержит только неизменяемые строки, поэтому его можно
+        сериализовать в другом потоке, пока заметки продолжают меняться.
+
+        Аргументы:
+        include_ids (bool, optional): Сохранить идентификаторы заметок.
+        include_history (bool, optional): Сохранить историю версий в поле "history" заметок.
+
+        Возвращает:
+        dict: Заметки, организованные по категориям, в формате notes.json.
         """
-        with open(filename, 'w') as file:
-            json.dump({category: [note.__dict__ for note in notes] for category, notes in self.notes.items()}, file)
-            logging.info(f"Notes saved to {filename}")
+        if not include_history:
+            return {category: [note.to_dict(include_ids) for note in notes] for category, notes in self.notes.items()}
+        snapshot = {}
+        for category, notes in self.notes.items():
+            snapshot[category] = []
+            for note in notes:
+                data = note.to_dict(include_ids)
+                history = self.history.get(note.id)
+                if history:
+                    data["history"] = history.to_dict()
+                snapshot[category].append(data)
+        return snapshot
 
+    @metrics.timed("load_from_file")
     def load_from_file(self, filename):
         """
         Загружает заметки из файла.
@@ -125,22 +1195,206 @@ class NoteManager:
         try:
             with open(filename, 'r') as file:
                 notes_data = json.load(file)
-                if isinstance(notes_data, list):  # Старый формат, просто список заметок
-                    self.notes = {}
-                    for note in notes_data:
-                        category = note.get("category", "Uncategorized")
-                        if category not in self.notes:
-                            self.notes[category] = []
-                        self.notes[category].append(Note(
-                            title=note["title"],
-                            content=note["content"],
-                            category=category
-                        ))
-                else:  # Новый формат, организованный по категориям
-                    self.notes = {category: [Note(**note) for note in notes] for category, notes in notes_data.items()}
-                logging.info(f"Notes loaded from {filename}")
+                metrics.observe("load_from_file.bytes", file.tell())
         except FileNotFoundError:
-            logging.info(f"File {filename} not found. Starting with an empty note list.")
+            logging.info("File %s not found. Starting with an empty note list.", filename)
+            return
+        self.load_data(notes_data)
+        if self.storage is not None:
+            self.storage.reset(self)
+        logging.info("Notes loaded from %s", filename)
+
+    def load_data(self, notes_data):
+        """
+        Заменяет заметки данными в формате notes.json.
+
+        Аргументы:
+        notes_data (dict | list): Заметки по категориям, они же с общими блоками содержимого
+            (см. blobs.pack_snapshot()) или список заметок (старый формат).
+        """
+        notes_data = unpack_snapshot(notes_data)
+        histories = []
+        if isinstance(notes_data, list):  # Старый формат, просто список заметок
+            notes_by_category = {}
+            for note in notes_data:
+                category = note.get("category", "Uncategorized")
+                if category not in notes_by_category:
+                    notes_by_category[category] = []
+                notes_by_category[category].append(Note(
+                    title=note["title"],
+                    content=note["content"],
+                    category=category
+                ))
+        else:  # Новый формат, организованный по категориям
+            notes_by_category = {}
+            for category, notes in notes_data.items():
+                notes_by_category[category] = []
+                for note in notes:
+                    history = note.get("history")
+                    if history is not None:
+                        note = {key: value for key, value in note.items() if key != "history"}
+                    notes_by_category[category].append(Note(**note))
+                    if history is not None:
+                        histories.append((notes_by_category[category][-1], history))
+        self.replace_notes(notes_by_category)
+        for note, history in histories:
+            self.history[note.id] = NoteHistory.from_dict(history)
+
+    @metrics.timed("load_batch")
+    @_synchronized
+    def load_batch(self, category, notes_data):
+        """
+        Добавляет порцию заметок категории, прочитанных из файла, не записывая их в хранилище.
+
+        Используется при постепенной загрузке, когда интерфейс уже работает и
+        между порциями заметки могут создаваться. Если идентификатор из файла
+        уже занят такой заметкой, она получает новый идентификатор.
+
+        Аргументы:
+        category (str): Категория.
+        notes_data (list): Словари заметок в формате notes.json (с необязательными "id" и "history").
+
+        Возвращает:
+        tuple: (добавленные заметки, словарь старый -> новый идентификатор перенумерованных заметок).
+        """
+        renumbered = {}
+        notes, histories = [], []
+        if category not in self.notes:
+            self.notes[category] = CategoryNotes()
+        # Новые идентификаторы не должны совпасть с идентификаторами этой же порции
+        self._next_id = max(self._next_id, 1 + max((fields.get("id") or 0 for fields in notes_data), default=0))
+        for fields in notes_data:
+            fields = dict(fields, category=category)
+            history = fields.pop("history", None)
+            note = Note(**fields)
+            local = self._by_id.get(note.id)
+            if local is not None:
+                self._renumber(local)
+                renumbered[note.id] = local.id
+            notes.append(note)
+            if history is not None:
+                histories.append((note, history))
+        self._add_batch(notes)
+        for note, history in histories:
+            self.history[note.id] = NoteHistory.from_dict(history)
+        self.version += 1
+        return notes, renumbered
+
+    @metrics.timed("merge_notes")
+    @_synchronized
+    def merge_notes(self, changes, file_notes, base):
+        """
+        Вливает изменения файла заметок, сделанные другим экземпляром приложения.
+
+        Применяются только переданные заметки; остальные не перестраиваются.
+        Если заметку изменили и здесь, и в файле после последней синхронизации,
+        остаётся версия с более поздним временем изменения. Заметки, удалённые
+        здесь, не восстанавливаются, а удалённые в файле удаляются, если здесь
+        их не меняли. Несохранённая новая заметка, чей идентификатор занят
+        новой заметкой из файла, получает другой идентификатор.
+
+        Аргументы:
+        changes (list): Пары (категория, словарь заметки с "id") — заметки файла, отличающиеся от base.
+        file_notes (dict): Идентификатор -> (modified, category) для всех заметок файла.
+        base (dict): Идентификатор -> (modified, category) при последней синхронизации с файлом.
+
+        Возвращает:
+        dict: Списки идентификаторов "added", "updated", "deleted" и словарь "renumbered" (старый -> новый).
+        """
+        summary = {"added": [], "updated": [], "deleted": [], "renumbered": {}}
+        self._next_id = max(self._next_id, 1 + max(file_notes, default=0))
+        for category, fields in changes:
+            note_id = fields["id"]
+            note = self._by_id.get(note_id)
+            if note is not None and note_id not in base and note.created != fields.get("created"):
+                self._renumber(note)
+                summary["renumbered"][note_id] = note.id
+                note = None
+            if note is None:
+                if note_id in base:  # Удалена здесь после синхронизации
+                    continue
+                note = Note(fields["title"], fields["content"], category, note_id,
+                            fields.get("created"), fields.get("modified"), fields.get("tags", ()))
+                self._add_batch([note])
+                self._record("add", **note.to_dict(include_id=True))
+                summary["added"].append(note_id)
+            else:
+                if (note.modified, note.category) != base.get(note_id) and note.modified >= fields["modified"]:
+                    continue  # Изменена и здесь, причём позже
+                if note.title != fields["title"] or note.modified != fields["modified"]:
+                    self.update_note_by_id(note_id, fields["title"], fields["content"], fields["modified"])
+                if note.tags != normalize_tags(fields.get("tags", ())):
+                    self.set_tags(note_id, fields.get("tags", ()), fields["modified"])
+                if note.category != category:
+                    self.move_note_by_id(note_id, category)
+                summary["updated"].append(note_id)
+            if fields.get("history"):
+                self.history[note_id] = NoteHistory.from_dict(fields["history"])
+        for note_id, state in base.items():
+            note = self._by_id.get(note_id)
+            if note_id not in file_notes and note is not None and (note.modified, note.category) == state:
+                self.delete_note_by_id(note_id)
+                summary["deleted"].append(note_id)
+        return summary
+
+    def _renumber(self, note):
+        self.notes[note.category].remove(note.id)
+        self._unindex_order(note)
+        self.tags.remove(note)
+        self.index.remove(note)
+        self.titles.remove(note)
+        del self._by_id[note.id]
+        del self._order[note.id]
+        self._recent.pop(note.id, None)
+        history = self.history.pop(note.id, None)
+        note.id = None
+        self._register(note)
+        self._place(note, note.category)
+        self._index_order(note)
+        self.tags.add(note)
+        if history is not None:
+            self.history[note.id] = history
+
+    @metrics.timed("replace_notes")
+    @_synchronized
+    def replace_notes(self, notes_by_category):
+        """
+        Заменяет все заметки готовыми объектами Note и перестраивает индекс.
+
+        Аргументы:
+        notes_by_category (dict): Категория -> список заметок.
+        """
+        self.version += 1
+        self.notes = {}
+        self.index.clear()
+        self.titles.clear()
+        self.blobs.clear()
+        self.tags = TagIndex()
+        self._by_id.clear()
+        self._order.clear()
+        self._recent.clear()
+        self.history = {}
+        self._next_id = 1 + max((note.id for notes in notes_by_category.values() for note in notes if note.id is not None), default=0)
+        for category, notes in notes_by_category.items():
+            self.notes[category] = CategoryNotes()
+            for note in notes:
+                if note.id is None:
+                    note.id = self._next_id
+                self._next_id = max(self._next_id, note.id + 1)
+                self._by_id[note.id] = note
+                self._share(note)
+                self._place(note, category)
+                self.tags.add(note)
+        # Поисковый индекс и индекс заголовков заполняются пакетом: заметки идут по категориям,
+        # а не по возрастанию идентификаторов, и вставка по одной сдвигала бы массивы вхождений
+        self.index.add_many(self._by_id.values())
+        self.titles.add_many(self._by_id.values())
+        # Индексы сортировки строятся одной сортировкой, а не вставкой по одному ключу
+        self._orders = {}
+        for field, key in ORDER_KEYS.items():
+            self._orders[field] = {category: SortedIndex(key(note) for note in notes)
+                                   for category, notes in self.notes.items()}
+            self._orders[field][None] = SortedIndex(key(note) for note in self._by_id.values())
 
     def __repr__(self):
-        return f"NoteManager({len(self.notes)} categories, {sum(len(notes) for notes in self.notes.values())} notes)"
+        return f"NoteManager({len(self.notes)} categories, {len(self._by_id)} notes)"
@@ -0,0 +1,226 @@
+import re
+import tkinter as tk
+from idlelib.redirector import WidgetRedirector
+
+# Символы вне BMP (эмодзи и т. п.) Tk 8.6 считает за две позиции, а Python — за одну
+_WIDE_CHARS = re.compile("[\U00010000-\U0010FFFF]")
+
+
+class DirtyRange:
+    """
+    Изменённый участок текста относительно последнего сохранения.
+
+    Все правки объединяются в один участок [start, end) текущего текста:
+    всё, что левее start, совпадает с началом сохранённого текста, а всё,
+    что правее end, — с его концом.
+
+    Атрибуты:
+    length (int): Длина текущего текста.
+    saved_length (int): Длина сохранённого текста.
+    start (int): Начало изменённого участка или None, если изменений нет.
+    end (int): Конец изменённого участка в текущем тексте.
+    """
+    def __init__(self, length=0):
+        self.reset(length)
+
+    def reset(self, length):
+        """
+        Отмечает текст длиной length как сохранённый.
+
+        Аргументы:
+        length (int): Длина текста.
+        """
+        self.length = length
+        self.saved_length = length
+        self.start = None
+        self.end = None
+
+    def __bool__(self):
+        return self.start is not None
+
+    def insert(self, position, count):
+        """
+        Учитывает вставку count символов в позицию position.
+        """
+        if not count:
+            return
+        if self.start is None:
+            self.start, self.end = position, position + count
+        else:
+            self.start = min(self.start, position)
+            self.end = max(self.end, position) + count
+        self.length += count
+
+    def delete(self, start, end):
+        """
+        Учитывает удаление символов [start, end).
+        """
+        if start >= end:
+            return
+        if self.start is None:
+            self.start, self.end = start, start
+        else:
+            self.start = min(self.start, start)
+            self.end = max(self.end, end) - (end - start)
+        self.length -= end - start
+
+    def saved_span(self):
+        """
+        Возвращает участок сохранённого текста, который заменяется участком [start, end).
+
+        Возвращает:
+        tuple: (start, end) в координатах сохранённого текста.
+        """
+        return self.start, self.saved_length - (self.length - self.end)
+
+
+class NoteEditor:
+    """
+    Редактор содержимого заметки поверх tk.Text.
+
+    Большой текст вставляется частями через after(), поэтому окно не
+    замирает при открытии заметки. Правки перехватываются на уровне команд
+    виджета (insert, delete, replace) и сводятся в изменённый участок, так
+    что при сохранении из виджета читается только он. Если в тексте есть
+    символы вне BMP, позиции Tk не совпадают с позициями в строке Python,
+    и при сохранении текст передаётся целиком.
+
+    Атрибуты:
+    text (tk.Text): Виджет текста.
+    dirty (DirtyRange): Изменённый участок.
+    loading (bool): Текст ещё вставляется частями; редактирование отключено.
+    wide (bool): В тексте встречались символы вне BMP; изменённый участок не используется.
+    edited (int): Примерный объём правок в байтах с последнего take_edited().
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, text):
+        self.text = text
+        self.dirty = DirtyRange()
+        self.loading = False
+        self.wide = False
+        self.edited = 0
+        self._saved_length = 0
+        self._generation = 0
+        redirector = WidgetRedirector(text)
+        self._insert = redirector.register("insert", self._on_insert)
+        self._delete = redirector.register("delete", self._on_delete)
+        self._replace = redirector.register("replace", self._on_replace)
+
+    def load(self, content, on_done=None):
+        """
+        Показывает текст, вставляя его частями по CHUNK_SIZE символов.
+
+        Аргументы:
+        content (str): Текст.
+        on_done (callable, optional): Вызывается после вставки последней части.
+        """
+        self._generation += 1
+        generation = self._generation
+        self.text.configure(state=tk.NORMAL)
+        self._delete("1.0", tk.END)
+        self.dirty.reset(len(content))
+        self.wide = _WIDE_CHARS.search(content) is not None
+        self._saved_length = len(content)
+        self.edited = 0
+        self.loading = True
+
+        def insert_chunk(offset):
+            if generation != self._generation:
+                return
+            self.text.configure(state=tk.NORMAL)
+            self._insert("end-1c", content[offset:offset + self.CHUNK_SIZE])
+            if offset + self.CHUNK_SIZE < len(content):
+                self.text.configure(state=tk.DISABLED)
+                self.text.after(1, insert_chunk, offset + self.CHUNK_SIZE)
+            else:
+                self.loading = False
+                if on_done is not None:
+                    on_done()
+
+        insert_chunk(0)
+
+    def clear(self):
+        """
+        Очищает редактор и отменяет незавершённую загрузку.
+        """
+        self.load("")
+
+    def take_changes(self):
+        """
+        Возвращает изменённый участок и отмечает текст как сохранённый.
+
+        Возвращает:
+        tuple: (start, end, text) — участок [start, end) сохранённого текста
+        заменяется на text; None, если изменений нет.
+        """
+        if self.loading or not self.dirty:
+            return None
+        if self.wide:
+            start, end = 0, self._saved_length
+            text = self.text.get("1.0", "end-1c")
+            self.dirty.reset(len(text))
+        else:
+            start, end = self.dirty.saved_span()
+            text = self.text.get(f"1.0 + {self.dirty.start} chars", f"1.0 + {self.dirty.end} chars")
+            self.dirty.reset(self.dirty.length)
+        self._saved_length = self.dirty.length
+        return start, end, text
+
+    def take_edited(self):
+        """
+        Возвращает объём правок с прошлого вызова и обнуляет счётчик.
+
+        Возвращает:
+        int: Вставленные байты (UTF-8) плюс удалённые символы.
+        """
+        edited, self.edited = self.edited, 0
+        return edited
+
+    def _offset(self, index):
+        # Позиция в символах; индексы за концом текста указывают на его конец, как в самом Tk
+        if self.text.compare(index, ">", "end-1c"):
+            index = "end-1c"
+        count = self.text.count("1.0", index, "chars")
+        return count[0] if count else 0
+
+    def _check_wide(self, chunks):
+        if not self.wide and any(_WIDE_CHARS.search(chars) for chars in chunks):
+            self.wide = True
+
+    def _editable(self):
+        # В выключенном виджете Tk молча игнорирует правки
+        return str(self.text.cget("state")) != tk.DISABLED
+
+    def _on_insert(self, index, *args):
+        if not self._editable():
+            return self._insert(index, *args)
+        position = self._offset(index)
+        result = self._insert(index, *args)
+        self._check_wide(args[::2])
+        self.edited += sum(len(chars.encode("utf-8")) for chars in args[::2])
+        self.dirty.insert(position, sum(len(chars) for chars in args[::2]))
+        return result
+
+    def _on_delete(self, index1, index2=None):
+        if not self._editable():
+            return None
+        start = self._offset(index1)
+        end = self._offset(index2) if index2 is not None else min(start + 1, self.dirty.length)
+        result = self._delete(index1, index2) if index2 is not None else self._delete(index1)
+        if start < end:
+            self.dirty.delete(start, end)
+            self.edited += end - start
+        return result
+
+    def _on_replace(self, index1, index2, *args):
+        if not self._editable():
+            return None
+        start, end = self._offset(index1), self._offset(index2)
+        result = self._replace(index1, index2, *args)
+        self._check_wide(args[::2])
+        self.edited += end - start + sum(len(chars.encode("utf-8")) for chars in args[::2])
+        if start < end:
+            self.dirty.delete(start, end)
+        self.dirty.insert(start, sum(len(chars) for chars in args[::2]))
+        return result
@@ -0,0 +1,376 @@
+import contextlib
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from archive import iter_notes_file
+from data import write_snapshot
+from metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+HASH_CHUNK = 1024 * 1024
+SAVE_ATTEMPTS = 3
+
+FileState = namedtuple("FileState", "mtime_ns size digest")
+
+
+class FileLock:
+    """
+    Рекомендательная блокировка файла заметок между процессами.
+
+    Блокируется отдельный файл <имя>.lock (flock в POSIX, msvcrt.locking в
+    Windows), поэтому сам файл заметок можно атомарно заменять. Блокировку
+    соблюдают только экземпляры приложения и скрипты, использующие этот класс.
+
+    Атрибуты:
+    path (str): Путь к файлу блокировки.
+    timeout (float): Сколько секунд ждать блокировку перед TimeoutError.
+    """
+    def __init__(self, filename, timeout=10.0):
+        self.path = os.fspath(filename) + ".lock"
+        self.timeout = timeout
+
+    @contextlib.contextmanager
+    def hold(self, shared=False):
+        """
+        Удерживает блокировку на время блока with.
+
+        Аргументы:
+        shared (bool, optional): Разделяемая блокировка для чтения; по умолчанию исключительная.
+        """
+        file = open(self.path, "a+b")
+        try:
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    _try_lock(file, shared)
+                    break
+                except OSError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"{self.path} is locked by another process")
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                _unlock(file)
+        finally:
+            file.close()
+
+
+if fcntl is not None:
+    def _try_lock(file, shared):
+        fcntl.flock(file.fileno(), (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+
+    def _unlock(file):
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+else:
+    # msvcrt не различает разделяемые блокировки: чтение тоже блокирует файл целиком
+    def _try_lock(file, shared):
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock(file):
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_state(filename, digest=True):
+    """
+    Возвращает время изменения, размер и (по желанию) хеш содержимого файла.
+
+    Аргументы:
+    filename (str): Имя файла.
+    digest (bool, optional): Вычислить хеш BLAKE2 содержимого.
+
+    Возвращает:
+    FileState: Состояние файла или None, если файла нет.
+    """
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    value = None
+    if digest:
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(filename, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+                hasher.update(chunk)
+        value = hasher.hexdigest()
+    return FileState(stat.st_mtime_ns, stat.st_size, value)
+
+
+def _same_stat(state, known):
+    if state is None or known is None:
+        return state is known
+    return (state.mtime_ns, state.size) == (known.mtime_ns, known.size)
+
+
+@metrics.timed("read_changes")
+def read_changes(filename, base):
+    """
+    Потоково читает файл notes.json и отбирает заметки, изменённые относительно base.
+
+    Каждая заметка файла разбирается в словарь, но объекты Note и индексы
+    строятся потом только для отобранных заметок.
+
+    Аргументы:
+    filename (str): Имя файла.
+    base (dict): Идентификатор -> (modified, category) на момент последней синхронизации.
+
+    Возвращает:
+    tuple: (changes, notes) — список (категория, словарь заметки) изменённых и новых заметок
+    и словарь идентификатор -> (modified, category) для всех заметок файла; None, если в файле
+    нет идентификаторов (его записала старая версия приложения).
+    """
+    changes, notes = [], {}
+    for category, fields in iter_notes_file(filename):
+        note_id = fields.get("id")
+        if note_id is None:
+            return None
+        state = (fields.get("modified"), category)
+        notes[note_id] = state
+        if base.get(note_id) != state:
+            changes.append((category, fields))
+    return changes, notes
+
+
+def _base_of(manager):
+    with manager.lock:
+        return {note.id: (note.modified, category)
+                for category, notes in manager.notes.items() for note in notes}
+
+
+class NoteFileSync:
+    """
+    Совместная работа нескольких экземпляров приложения с одним notes.json.
+
+    Сохранение выполняется под исключительной блокировкой и только если
+    файл не менялся с последней синхронизации; иначе save() возвращает False,
+    и сначала нужно влить внешние изменения (check() и apply()). Изменение
+    файла определяется по времени изменения и размеру, а хеш содержимого
+    считается только когда они отличаются. При слиянии применяются только
+    изменённые заметки (см. NoteManager.merge_notes()).
+
+    Атрибуты:
+    manager (NoteManager): Менеджер заметок.
+    filename (str): Файл заметок.
+    lock (FileLock): Блокировка файла.
+    base (dict): Идентификатор -> (modified, category) для заметок файла при последней синхронизации.
+    state (FileState): Состояние файла при последней синхронизации.
+    conflicts (int): Сколько сохранений отложено из-за внешних изменений.
+    """
+    def __init__(self, manager, filename, lock_timeout=10.0):
+        self.manager = manager
+        self.filename = filename
+        self.lock = FileLock(filename, lock_timeout)
+        self.base = {}
+        self.state = None
+        self.conflicts = 0
+        self._mutex = threading.Lock()
+
+    def load(self):
+        """
+        Загружает заметки из файла и запоминает его состояние.
+        """
+        with self.lock.hold(shared=True):
+            state = file_state(self.filename)
+            self.manager.load_from_file(self.filename)
+        base = _base_of(self.manager)
+        with self._mutex:
+            self.base, self.state = base, state
+
+    def load_in_batches(self, batch_size=256):
+        """
+        Постепенно загружает заметки из файла; рассчитан на фоновый поток.
+
+        Заметки добавляются порциями через NoteManager.load_batch(), так что
+        между порциями менеджер доступен другим потокам. Состояние файла
+        запоминается после загрузки; если файл заменили во время чтения,
+        изменения найдёт следующий check().
+
+        Аргументы:
+        batch_size (int, optional): Размер порции.
+
+        Возвращает:
+        generator: Кортежи (категория, количество добавленных заметок, перенумерованные
+        идентификаторы, категория прочитана полностью) для каждой порции.
+        """
+        before = file_state(self.filename)
+        base = {}
+        category, batch = None, []
+
+        def flush(complete):
+            notes, renumbered = self.manager.load_batch(category, batch)
+            for note in notes:
+                base[note.id] = (note.modified, category)
+            return category, len(notes), renumbered, complete
+
+        for next_category, fields in iter_notes_file(self.filename, include_empty=True):
+            if category is not None and next_category != category:
+                yield flush(True)
+                batch = []
+            category = next_category
+            if fields is not None:
+                batch.append(fields)
+                if len(batch) == batch_size:
+                    yield flush(False)
+                    batch = []
+        if category is not None:
+            yield flush(True)
+        after = file_state(self.filename, digest=False)
+        with self._mutex:
+            self.base = base
+            self.state = before if _same_stat(before, after) else None
+
+    def changed(self):
+        """
+        Быстро проверяет (по времени изменения и размеру), менялся ли файл с последней синхронизации.
+
+        Возвращает:
+        bool: True, если файл, возможно, изменён.
+        """
+        return not _same_stat(file_state(self.filename, digest=False), self.state)
+
+    def check(self):
+        """
+        Читает внешние изменения файла; можно вызывать из фонового потока.
+
+        Возвращает:
+        tuple: Подготовленные изменения для apply() или None, если содержимое файла не менялось.
+        """
+        if not self.changed():
+            return None
+        with self.lock.hold(shared=True):
+            state = file_state(self.filename)
+            with self._mutex:
+                known, base = self.state, self.base
+            if state is None:  # Файл удалён: заметки остаются и будут записаны при сохранении
+                return None
+            if known is not None and state.digest == known.digest:
+                with self._mutex:
+                    self.state = state
+                return None
+            changes = read_changes(self.filename, base)
+        return state, changes
+
+    def apply(self, pending):
+        """
+        Вливает изменения, подготовленные check(), в менеджер.
+
+        Аргументы:
+        pending (tuple): Результат check().
+
+        Возвращает:
+        dict: Итог NoteManager.merge_notes(); для файла без идентификаторов — итог reload().
+        """
+        state, changes = pending
+        if changes is None:
+            summary, base = self._reload()
+        else:
+            changes, base = changes
+            summary = self.manager.merge_notes(changes, base, self.base)
+        with self._mutex:
+            self.base, self.state = base, state
+        logging.info("Merged external changes from %s: %s", self.filename, summary)
+        return summary
+
+    def _reload(self):
+        # Файл без идентификаторов (записан старой версией или без NoteFileSync) перечитывается
+        # целиком, а несохранённые здесь заметки добавляются заново: поверх заметки файла с тем же
+        # временем создания, если она не новее, иначе отдельной заметкой
+        manager = self.manager
+        with self.lock.hold(shared=True), manager.lock:  # В том же порядке, что и в load()
+            with self._mutex:
+                known = self.base
+            unsaved = []
+            for category, notes in manager.notes.items():
+                for note in notes:
+                    if known.get(note.id) != (note.modified, category):
+                        history = manager.history.get(note.id)
+                        unsaved.append((note.title, note.content, category, note.created, note.modified,
+                                        note.tags, history.to_dict() if history else None))
+            manager.load_from_file(self.filename)
+            base = _base_of(manager)
+            by_created = {note.created: note for notes in manager.notes.values() for note in notes}
+            kept, added = [], []
+            for fields in unsaved:
+                title, content, category, created, modified, tags, _ = fields
+                note = by_created.pop(created, None)
+                if note is None:
+                    added.append(fields)
+                elif note.modified < modified:
+                    manager.update_note_by_id(note.id, title, content, modified)
+                    manager.set_tags(note.id, tags, modified)
+                    if note.category != category:
+                        manager.move_note_by_id(note.id, category)
+                    kept.append(note.id)
+            kept.extend(note.id for note in manager.add_notes(added))
+        if kept:
+            logging.warning("%s was rewritten without note ids; %s unsaved notes kept", self.filename, len(kept))
+        return {"reloaded": True, "kept": kept}, base
+
+    def refresh(self):
+        """
+        Синхронно вливает внешние изменения файла, если они есть.
+
+        Возвращает:
+        dict: Итог apply() или None, если файл не менялся.
+        """
+        pending = self.check()
+        return None if pending is None else self.apply(pending)
+
+    def save_manager(self, attempts=SAVE_ATTEMPTS):
+        """
+        Записывает заметки менеджера, предварительно вливая внешние изменения файла.
+
+        Так сохраняют и скрипты (cli.py, server.py): файл пишется под
+        блокировкой и с идентификаторами заметок, поэтому открытые окна
+        приложения вливают изменения, а не перечитывают файл целиком.
+
+        Аргументы:
+        attempts (int, optional): Сколько раз пробовать, если файл меняется между слиянием и записью.
+
+        Возвращает:
+        bool: True, если файл записан.
+        """
+        for _ in range(attempts):
+            self.refresh()
+            if self.save(self.manager.snapshot(include_ids=True, include_history=True)):
+                return True
+        logging.error("Notes were not saved: %s keeps changing", self.filename)
+        return False
+
+    def save(self, snapshot):
+        """
+        Записывает снимок, если файл не менялся с последней синхронизации.
+
+        Аргументы:
+        snapshot (dict): Снимок NoteManager.snapshot(include_ids=True).
+
+        Возвращает:
+        bool: True, если файл записан; False, если сначала нужно влить внешние изменения.
+        """
+        with self.lock.hold():
+            with self._mutex:
+                known = self.state
+            state = file_state(self.filename, digest=False)
+            if not _same_stat(state, known):
+                state = file_state(self.filename)
+                if state is not None and (known is None or state.digest != known.digest):
+                    self.conflicts += 1
+                    logging.warning("%s was changed by another process; merge before saving", self.filename)
+                    return False
+            write_snapshot(snapshot, self.filename, deduplicate=True)
+            state = file_state(self.filename)
+        base = {note["id"]: (note["modified"], category) for category, notes in snapshot.items() for note in notes}
+        with self._mutex:
+            self.base, self.state = base, state
+        return True
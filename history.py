@@ -0,0 +1,201 @@
+import time
+
+
+def make_delta(source, target):
+    """
+    Строит дельту, превращающую source в target.
+
+    Дельта описывает одну изменённую область: общий префикс и суффикс
+    сохраняются, а середина заменяется текстом. Для типичной правки
+    (вставка, удаление или замена в одном месте) она занимает столько же,
+    сколько изменённый фрагмент.
+
+    Аргументы:
+    source (str): Исходный текст.
+    target (str): Итоговый текст.
+
+    Возвращает:
+    tuple: (prefix, suffix, text).
+    """
+    limit = min(len(source), len(target))
+    # Двоичный поиск границ: сравнение срезов выполняется в C, а не посимвольно в Python
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if source[low:middle] == target[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = low
+    low, high = 0, limit - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if source[len(source) - middle:len(source) - low] == target[len(target) - middle:len(target) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    suffix = low
+    return prefix, suffix, target[prefix:len(target) - suffix]
+
+
+def apply_delta(source, delta):
+    """
+    Применяет дельту make_delta() к тексту.
+
+    Аргументы:
+    source (str): Исходный текст.
+    delta (tuple): (prefix, suffix, text).
+
+    Возвращает:
+    str: Итоговый текст.
+    """
+    prefix, suffix, text = delta
+    return source[:prefix] + text + source[len(source) - suffix:]
+
+
+class NoteHistory:
+    """
+    История версий одной заметки.
+
+    Текущая версия хранится только в самой заметке, а прошлые — как
+    обратные дельты: каждая запись превращает следующую (более новую)
+    версию в свою. Каждая CHECKPOINT_EVERY-я запись и записи, дельта которых
+    не меньше половины текста, хранятся целиком, поэтому для получения
+    любой версии применяется не больше CHECKPOINT_EVERY - 1 дельт.
+
+    Записи: (time, title, text) — полная копия, (time, title, text, prefix, suffix) — дельта.
+
+    Атрибуты:
+    entries (list): Записи прошлых версий, от старых к новым.
+    first (int): Номер самой старой сохранённой версии (растёт при удалении старых).
+    time (float): Время создания текущей версии или None, если неизвестно.
+    """
+    CHECKPOINT_EVERY = 16
+
+    def __init__(self, entries=None, first=0, time=None):
+        self.entries = entries if entries is not None else []
+        self.first = first
+        self.time = time
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def current(self):
+        """
+        Номер текущей версии.
+        """
+        return self.first + len(self.entries)
+
+    def record(self, title, content, new_content, timestamp=None):
+        """
+        Сохраняет заменяемую версию перед изменением заметки.
+
+        Аргументы:
+        title (str): Заголовок заменяемой версии.
+        content (str): Содержимое заменяемой версии.
+        new_content (str): Содержимое новой версии.
+        timestamp (float, optional): Время изменения; по умолчанию текущее.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        prefix, suffix, text = make_delta(new_content, content)
+        if (self.current + 1) % self.CHECKPOINT_EVERY == 0 or 2 * len(text) >= len(content):
+            self.entries.append((self.time, title, content))
+        else:
+            self.entries.append((self.time, title, text, prefix, suffix))
+        self.time = timestamp
+
+    def get(self, revision, title, content):
+        """
+        Восстанавливает версию.
+
+        Аргументы:
+        revision (int): Номер версии.
+        title (str): Заголовок текущей версии.
+        content (str): Содержимое текущей версии.
+
+        Возвращает:
+        tuple: (title, content).
+        """
+        if revision == self.current:
+            return title, content
+        if not self.first <= revision < self.current:
+            raise IndexError(f"revision {revision} is not stored")
+        position = revision - self.first
+        # Ближайшая более новая полная копия (или текущая версия) — не дальше CHECKPOINT_EVERY записей
+        start = position
+        while start < len(self.entries) and len(self.entries[start]) != 3:
+            start += 1
+        if start < len(self.entries):
+            text = self.entries[start][2]
+        else:
+            text = content
+        for entry in reversed(self.entries[position:start]):
+            text = apply_delta(text, (entry[3], entry[4], entry[2]))
+        return self.entries[position][1], text
+
+    def revisions(self, title):
+        """
+        Возвращает описание всех сохранённых версий.
+
+        Аргументы:
+        title (str): Заголовок текущей версии.
+
+        Возвращает:
+        list: Словари {"revision", "time", "title"} от старых к новым, включая текущую.
+        """
+        result = [{"revision": self.first + position, "time": entry[0], "title": entry[1]}
+                  for position, entry in enumerate(self.entries)]
+        result.append({"revision": self.current, "time": self.time, "title": title})
+        return result
+
+    def prune(self, keep=None, max_age=None, now=None):
+        """
+        Удаляет старые версии.
+
+        Дельта записи ссылается только на более новую версию, поэтому
+        оставшиеся версии восстанавливаются как прежде.
+
+        Аргументы:
+        keep (int, optional): Сколько прошлых версий оставить.
+        max_age (float, optional): Удалить версии, заменённые раньше, чем max_age секунд назад.
+        now (float, optional): Текущее время; по умолчанию time.time().
+
+        Возвращает:
+        int: Количество удалённых версий.
+        """
+        drop = 0
+        if keep is not None:
+            drop = max(0, len(self.entries) - keep)
+        if max_age is not None:
+            cutoff = (time.time() if now is None else now) - max_age
+            # Версия заменена в момент создания следующей за ней
+            replaced = [entry[0] for entry in self.entries[1:]] + [self.time]
+            while drop < len(self.entries) and replaced[drop] is not None and replaced[drop] < cutoff:
+                drop += 1
+        if drop:
+            self.entries = self.entries[drop:]
+            self.first += drop
+        return drop
+
+    def to_dict(self):
+        """
+        Возвращает историю в виде словаря для сохранения в JSON.
+
+        Возвращает:
+        dict: {"first", "time", "entries"}.
+        """
+        return {"first": self.first, "time": self.time, "entries": [list(entry) for entry in self.entries]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Восстанавливает историю из словаря to_dict().
+
+        Аргументы:
+        data (dict): Сохранённая история.
+
+        Возвращает:
+        NoteHistory: История.
+        """
+        return cls([tuple(entry) for entry in data["entries"]], data["first"], data["time"])
@@ -0,0 +1,104 @@
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+NOTE_EXTENSIONS = (".txt", ".md")
+CHUNK_SIZE = 500
+
+
+def parse_note_file(path, category=None):
+    """
+    Читает файл заметки.
+
+    Заголовок берётся из первой строки вида "# Заголовок" в файлах .md,
+    иначе — из имени файла без расширения.
+
+    Аргументы:
+    path (str): Путь к файлу.
+    category (str, optional): Категория заметки.
+
+    Возвращает:
+    tuple: (title, content, category).
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+        content = file.read()
+    title = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith(".md") and content.startswith("# "):
+        heading, _, content = content.partition("\n")
+        title = heading[2:].strip() or title
+        content = content.lstrip("\n")
+    return title, content, category
+
+
+def _parse_chunk(chunk):
+    return [parse_note_file(path, category) for path, category in chunk]
+
+
+def find_note_files(directory, category=None):
+    """
+    Находит файлы заметок в каталоге и его подкаталогах.
+
+    Категорией заметки становится путь её подкаталога относительно directory;
+    для файлов в самом каталоге используется category.
+
+    Аргументы:
+    directory (str): Каталог для импорта.
+    category (str, optional): Категория файлов в корне каталога.
+
+    Возвращает:
+    list: Пары (путь, категория) в порядке обхода.
+    """
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        relative = os.path.relpath(root, directory)
+        folder = category if relative == os.curdir else relative.replace(os.sep, "/")
+        for name in sorted(files):
+            if name.lower().endswith(NOTE_EXTENSIONS):
+                found.append((os.path.join(root, name), folder))
+    return found
+
+
+def import_directory(manager, directory, category=None, workers=None, progress=None):
+    """
+    Импортирует файлы .txt и .md из каталога в менеджер заметок.
+
+    Файлы читаются и разбираются пачками в пуле процессов, после чего все
+    заметки добавляются одним вызовом NoteManager.add_notes().
+
+    Аргументы:
+    manager (NoteManager): Менеджер заметок.
+    directory (str): Каталог для импорта.
+    category (str, optional): Категория файлов в корне каталога.
+    workers (int, optional): Количество процессов; по умолчанию — число ядер.
+        При 1 или небольшом числе файлов разбор выполняется в текущем процессе.
+    progress (callable, optional): progress(done, total) — вызывается после каждой пачки.
+
+    Возвращает:
+    list: Добавленные заметки.
+    """
+    started = time.perf_counter()
+    files = find_note_files(directory, category)
+    chunks = [files[start:start + CHUNK_SIZE] for start in range(0, len(files), CHUNK_SIZE)]
+    workers = workers or os.cpu_count() or 1
+    parsed = []
+    if workers > 1 and len(chunks) > 1:
+        # spawn, а не fork: потоки окна (автосохранение, поиск, загрузка) могут держать
+        # блокировки, и их копии в дочернем процессе никогда не освободятся
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=context) as executor:
+            for notes in executor.map(_parse_chunk, chunks):
+                parsed.extend(notes)
+                if progress:
+                    progress(len(parsed), len(files))
+    else:
+        for chunk in chunks:
+            parsed.extend(_parse_chunk(chunk))
+            if progress:
+                progress(len(parsed), len(files))
+    notes = manager.add_notes(parsed)
+    elapsed = time.perf_counter() - started
+    logging.debug("Imported %s notes from %s in %.2fs", len(notes), directory, elapsed)
+    return notes
@@ -0,0 +1,646 @@
+import heapq
+import re
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Разбивает текст на множество слов в нижнем регистре.
+
+    Аргументы:
+    text (str): Исходный текст.
+
+    Возвращает:
+    set: Множество слов.
+    """
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def trigrams(text):
+    """
+    Возвращает множество триграмм (подстрок из трёх символов) текста.
+
+    Аргументы:
+    text (str): Исходный текст.
+
+    Возвращает:
+    set: Множество триграмм.
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def intersect_postings(postings, limit=None):
+    """
+    Пересекает списки идентификаторов, начиная с самых коротких.
+
+    Аргументы:
+    postings (list): Списки вхождений (array).
+    limit (int, optional): Пересекать только столько самых коротких списков;
+        остальные отсекаются последующей проверкой по тексту.
+
+    Возвращает:
+    set: Идентификаторы, входящие во все пересекаемые списки.
+    """
+    postings = sorted(postings, key=len)[:limit]
+    result = set(postings[0])
+    for other in postings[1:]:
+        result.intersection_update(other)
+        if not result:
+            break
+    return result
+
+
+def split_query(query):
+    """
+    Разбивает поисковый запрос на термы (через пробел, условие И).
+
+    Аргументы:
+    query (str): Строка поиска.
+
+    Возвращает:
+    list: Список термов в нижнем регистре.
+    """
+    return query.lower().split()
+
+
+class TokenIndex:
+    """
+    Инвертированный индекс по словам содержимого заметок.
+
+    Терм запроса совпадает с заметкой, если он является подстрокой её
+    содержимого без учёта регистра — как и при линейном поиске. Для частей
+    терма длиной от трёх символов кандидаты получаются пересечением списков
+    вхождений триграмм и затем проверяются по тексту заметки; для более
+    коротких частей берутся заметки со словами словаря, содержащими часть.
+
+    Триграммы строятся по словам заметки, поэтому их можно пересчитать
+    при обновлении без старого текста. Слова каждой заметки хранятся
+    компактно — массивом array('I') номеров слов словаря,
+    а не множеством строк; словарь слов не сокращается до очистки индекса.
+    Списки вхождений триграмм — отсортированные массивы array('q').
+
+    Атрибуты:
+    postings (dict): Слово -> множество идентификаторов заметок.
+    trigram_postings (dict): Триграмма -> отсортированный массив идентификаторов заметок.
+    """
+    CACHE_SIZE = 256
+    MAX_TRIGRAMS = 4
+
+    def __init__(self):
+        self.postings = {}
+        self.trigram_postings = {}
+        self._notes = {}
+        self._tokens = {}
+        self._word_ids = {}
+        self._words = []
+        self._term_cache = OrderedDict()
+
+    def __len__(self):
+        return len(self._notes)
+
+    def get(self, note_id):
+        """
+        Возвращает заметку по идентификатору.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+
+        Возвращает:
+        Note: Заметка или None.
+        """
+        return self._notes.get(note_id)
+
+    def clear(self):
+        """
+        Очищает индекс.
+        """
+        self.postings.clear()
+        self.trigram_postings.clear()
+        self._notes.clear()
+        self._tokens.clear()
+        self._word_ids.clear()
+        self._words.clear()
+        self._term_cache.clear()
+
+    def add(self, note):
+        """
+        Добавляет заметку в индекс.
+
+        Аргументы:
+        note (Note): Заметка с назначенным идентификатором.
+        """
+        tokens = tokenize(note.content)
+        self._notes[note.id] = note
+        self._tokens[note.id] = self._encode(tokens)
+        for token in tokens:
+            self._add_posting(token, note.id)
+        for trigram in _token_trigrams(tokens):
+            self._add_trigram_posting(trigram, note.id)
+
+    def add_many(self, notes):
+        """
+        Добавляет заметки в индекс пакетом.
+
+        Идентификаторы сначала собираются по словам всего пакета, и каждый
+        список вхождений дополняется один раз; триграммы считаются один раз
+        на различное слово пакета. Кэш частей терма сбрасывается один раз
+        вместо дополнения при каждом новом слове.
+
+        Аргументы:
+        notes (iterable): Заметки с назначенными идентификаторами.
+        """
+        self._term_cache.clear()
+        batch, tokenized = {}, []
+        for note in notes:
+            tokens = tokenize(note.content)
+            tokenized.append((note, tokens))
+            for token in tokens:
+                ids = batch.get(token)
+                if ids is None:
+                    batch[token] = [note.id]
+                else:
+                    ids.append(note.id)
+        word_ids, words = self._word_ids, self._words
+        for token in batch:
+            if token not in word_ids:
+                word_ids[token] = len(words)
+                words.append(token)
+        for note, tokens in tokenized:
+            self._notes[note.id] = note
+            self._tokens[note.id] = array('I', map(word_ids.__getitem__, tokens))
+        grams = {}
+        for token, ids in batch.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                self.postings[token] = set(ids)
+            else:
+                posting.update(ids)
+            for trigram in trigrams(token):
+                lists = grams.get(trigram)
+                if lists is None:
+                    grams[trigram] = [ids]
+                else:
+                    lists.append(ids)
+        for trigram, lists in grams.items():
+            _merge_posting(self.trigram_postings, trigram, lists)
+
+    def remove(self, note):
+        """
+        Удаляет заметку из индекса.
+
+        Аргументы:
+        note (Note): Заметка.
+        """
+        self._notes.pop(note.id, None)
+        tokens = self._decode(self._tokens.pop(note.id, ()))
+        for token in tokens:
+            self._remove_posting(token, note.id)
+        for trigram in _token_trigrams(tokens):
+            self._remove_trigram_posting(trigram, note.id)
+
+    def update(self, note):
+        """
+        Обновляет слова заметки после изменения содержимого.
+
+        Аргументы:
+        note (Note): Изменённая заметка.
+        """
+        old_tokens = self._decode(self._tokens.get(note.id, ()))
+        new_tokens = tokenize(note.content)
+        for token in old_tokens - new_tokens:
+            self._remove_posting(token, note.id)
+        for token in new_tokens - old_tokens:
+            self._add_posting(token, note.id)
+        old_trigrams = _token_trigrams(old_tokens)
+        new_trigrams = _token_trigrams(new_tokens)
+        for trigram in old_trigrams - new_trigrams:
+            self._remove_trigram_posting(trigram, note.id)
+        for trigram in new_trigrams - old_trigrams:
+            self._add_trigram_posting(trigram, note.id)
+        self._notes[note.id] = note
+        self._tokens[note.id] = self._encode(new_tokens)
+
+    def memory_size(self, note_id):
+        """
+        Возвращает примерный объём индекса, приходящийся на заметку, в байтах.
+
+        Учитываются массив слов заметки, её доля в словаре и списках
+        вхождений слов и оценка сверху для её вхождений в списки триграмм.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+
+        Возвращает:
+        int: Объём памяти.
+        """
+        ids = self._tokens.get(note_id)
+        if ids is None:
+            return 0
+        size = sys.getsizeof(ids)
+        for word_id in ids:
+            token = self._words[word_id]
+            posting = self.postings[token]
+            size += (sys.getsizeof(token) + sys.getsizeof(posting)) // len(posting)
+            size += max(len(token) - 2, 0) * array('q').itemsize
+        return size
+
+    def _encode(self, tokens):
+        word_ids = self._word_ids
+        ids = []
+        for token in tokens:
+            word_id = word_ids.get(token)
+            if word_id is None:
+                word_id = word_ids[token] = len(self._words)
+                self._words.append(token)
+            ids.append(word_id)
+        return array('I', ids)
+
+    def _decode(self, ids):
+        words = self._words
+        return {words[word_id] for word_id in ids}
+
+    def search(self, query):
+        """
+        Ищет заметки, содержащие все термы запроса.
+
+        Аргументы:
+        query (str): Строка поиска.
+
+        Возвращает:
+        set: Множество идентификаторов найденных заметок.
+        """
+        terms = split_query(query)
+        if not terms:
+            return set()
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            ids = self._candidates(term)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        # Короткие термы из букв и цифр найдены по словарю точно; остальные проверяются по тексту
+        inexact = [term for term in terms if len(term) >= 3 or not _TOKEN_RE.fullmatch(term)]
+        if not inexact:
+            return candidates
+        return {note_id for note_id in candidates if self._verify(note_id, inexact)}
+
+    def _verify(self, note_id, terms):
+        content = None
+        for term in terms:
+            # Заметка, где терм встречается целым словом, совпадает без проверки текста
+            if note_id in self.postings.get(term, ()):
+                continue
+            if content is None:
+                content = self._notes[note_id].content.lower()
+            if term not in content:
+                return False
+        return True
+
+    def _candidates(self, term):
+        pieces = _TOKEN_RE.findall(term)
+        if not pieces:
+            return set(self._notes)
+        result = None
+        for piece in sorted(pieces, key=len, reverse=True):
+            if len(piece) >= 3:
+                postings = [self.trigram_postings.get(trigram) for trigram in trigrams(piece)]
+                ids = intersect_postings(postings, self.MAX_TRIGRAMS) if all(postings) else set()
+            else:
+                ids = set()
+                for token in self._matching_tokens(piece):
+                    ids |= self.postings.get(token, set())
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result
+
+    def _matching_tokens(self, piece):
+        tokens = self._term_cache.get(piece)
+        if tokens is None:
+            tokens = {token for token in self.postings if piece in token}
+            self._term_cache[piece] = tokens
+            if len(self._term_cache) > self.CACHE_SIZE:
+                self._term_cache.popitem(last=False)
+        else:
+            self._term_cache.move_to_end(piece)
+        return tokens
+
+    def _add_posting(self, token, note_id):
+        ids = self.postings.get(token)
+        if ids is None:
+            self.postings[token] = {note_id}
+            for piece, tokens in self._term_cache.items():
+                if piece in token:
+                    tokens.add(token)
+        else:
+            ids.add(note_id)
+
+    def _add_trigram_posting(self, trigram, note_id):
+        _insert_posting(self.trigram_postings, trigram, note_id)
+
+    def _remove_trigram_posting(self, trigram, note_id):
+        _delete_posting(self.trigram_postings, trigram, note_id)
+
+    def _remove_posting(self, token, note_id):
+        ids = self.postings.get(token)
+        if ids is not None:
+            ids.discard(note_id)
+            if not ids:
+                del self.postings[token]
+                for tokens in self._term_cache.values():
+                    tokens.discard(token)
+
+
+def _token_trigrams(tokens):
+    result = set()
+    for token in tokens:
+        result |= trigrams(token)
+    return result
+
+
+def _insert_posting(postings, key, note_id):
+    posting = postings.get(key)
+    if posting is None:
+        postings[key] = array('q', (note_id,))
+    elif posting[-1] < note_id:
+        posting.append(note_id)
+    else:
+        position = bisect_left(posting, note_id)
+        if position == len(posting) or posting[position] != note_id:
+            posting.insert(position, note_id)
+
+
+def _merge_posting(postings, key, lists):
+    # Сливает в список вхождений идентификаторы пакета: списки без повторов, но могут пересекаться
+    ids = sorted(lists[0]) if len(lists) == 1 else sorted(set().union(*lists))
+    posting = postings.get(key)
+    if posting is None:
+        postings[key] = array('q', ids)
+    elif posting[-1] < ids[0]:
+        posting.extend(ids)
+    else:
+        postings[key] = array('q', sorted(set(posting).union(ids)))
+
+
+def _delete_posting(postings, key, note_id):
+    posting = postings.get(key)
+    if posting is not None:
+        position = bisect_left(posting, note_id)
+        if position < len(posting) and posting[position] == note_id:
+            del posting[position]
+            if not posting:
+                del postings[key]
+
+
+def normalize_title(text):
+    """
+    Приводит заголовок или запрос к виду для нечёткого сравнения: нижний регистр, одиночные пробелы.
+
+    Аргументы:
+    text (str): Заголовок или запрос.
+
+    Возвращает:
+    str: Нормализованный текст.
+    """
+    return " ".join(text.lower().split())
+
+
+def _title_trigrams(title):
+    # Пробелы по краям дают триграммы начала и конца слов
+    return trigrams(" " + normalize_title(title) + " ")
+
+
+def _query_variants(query):
+    # Запрос и варианты с одной перестановкой соседних букв (частая опечатка)
+    variants = [query]
+    if len(query) <= TitleIndex.MAX_VARIANT_LENGTH:
+        for i in range(len(query) - 1):
+            if query[i] != query[i + 1] and " " not in query[i:i + 2]:
+                variants.append(query[:i] + query[i + 1] + query[i] + query[i + 2:])
+    return variants
+
+
+def _most_common(counts, limit):
+    # То же, что Counter.most_common(), но без кучи по всем ключам: счётчики — небольшие
+    # целые, поэтому порог находится по гистограмме значений, а равные порогу берутся как есть
+    total = threshold = 0
+    histogram = Counter(counts.values())
+    for threshold in sorted(histogram, reverse=True):
+        total += histogram[threshold]
+        if total >= limit:
+            break
+    top, tied = [], []
+    for note_id, count in counts.items():
+        if count > threshold:
+            top.append((count, note_id))
+        elif count == threshold:
+            tied.append(note_id)
+    top.sort(reverse=True)
+    top.extend((threshold, note_id) for note_id in tied[:limit - len(top)])
+    return top
+
+
+def _is_subsequence(query, text):
+    # Начало и конец самого раннего вхождения букв запроса по порядку или None
+    position = first = -1
+    for char in query:
+        position = text.find(char, position + 1)
+        if position < 0:
+            return None
+        if first < 0:
+            first = position
+    return first, position
+
+
+def fuzzy_scorer(query):
+    """
+    Готовит функцию оценки сходства заголовков с запросом для нечёткого поиска.
+
+    По убыванию оценки: заголовок начинается с запроса; запрос с начала
+    слова; запрос внутри слова; запрос с одной перестановкой соседних букв;
+    все слова запроса в другом порядке; буквы запроса идут в заголовке по
+    порядку с пропусками (чем плотнее, тем выше); опечатки — доля общих триграмм с запросом или его вариантом с
+    переставленными соседними буквами. Среди равных выше короткие заголовки.
+    Триграммы запроса и его вариантов считаются один раз.
+
+    Аргументы:
+    query (str): Запрос, нормализованный normalize_title().
+
+    Возвращает:
+    callable: score(title) -> float; 0, если заголовок не похож на запрос.
+    """
+    words = query.split()
+    transposed = _query_variants(query)[1:]
+    variants = [trigrams(" " + variant) for variant in [query] + transposed]
+    minimum = TitleIndex.MIN_SIMILARITY * len(variants[0])
+
+    def score(title):
+        text = normalize_title(title)
+        if not query or not text:
+            return 0.0
+        position = text.find(query)
+        if position == 0:
+            result = 5.0
+        elif position > 0:
+            result = 4.5 if text[position - 1] == " " else 4.0
+        elif any(variant in text for variant in transposed):
+            result = 3.5
+        elif len(words) > 1 and all(word in text for word in words):
+            result = 3.0
+        else:
+            span = _is_subsequence(query, text)
+            if span is not None:
+                result = 2.0 + len(query) / (span[1] - span[0] + 1)
+            else:
+                grams = trigrams(" " + text + " ")
+                common = max(len(variant & grams) for variant in variants)
+                if common < minimum:
+                    return 0.0
+                result = common / len(variants[0])
+        return result - len(text) / 10000
+    return score
+
+
+def fuzzy_score(query, title):
+    """
+    Оценивает сходство одного заголовка с запросом (см. fuzzy_scorer()).
+
+    Аргументы:
+    query (str): Запрос, нормализованный normalize_title().
+    title (str): Заголовок.
+
+    Возвращает:
+    float: Оценка; 0, если заголовок не похож на запрос.
+    """
+    return fuzzy_scorer(query)(title)
+
+
+class TitleIndex:
+    """
+    Триграммный индекс заголовков для нечёткого поиска (быстрого перехода к заметке).
+
+    Триграммы заголовка строятся с пробелами по краям слов; списки вхождений —
+    отсортированные array('q'), как в TokenIndex. Кандидаты — заметки, у
+    которых больше всего общих триграмм с запросом (и, по желанию, с его
+    вариантами с переставленными соседними буквами); опечатки и другой
+    порядок слов оставляют большую часть триграмм общими. Списки просматриваются от самых
+    редких, пока их суммарная длина не превысит POSTING_BUDGET; частые
+    триграммы (не больше REFINE_TRIGRAMS) затем проверяются двоичным поиском
+    только у REFINE лучших кандидатов, поэтому время отбора ограничено и для миллиона заголовков.
+
+    Атрибуты:
+    postings (dict): Триграмма -> отсортированный массив идентификаторов заметок.
+    POSTING_BUDGET (int): Сколько вхождений подсчитывается за один запрос.
+    REFINE (int): Скольким лучшим кандидатам досчитываются частые триграммы.
+    REFINE_TRIGRAMS (int): Сколько самых редких из оставшихся триграмм досчитывается.
+    MIN_SIMILARITY (float): Минимальная доля общих триграмм для совпадения с опечатками.
+    MAX_VARIANT_LENGTH (int): До какой длины запроса перебираются перестановки букв.
+    """
+    POSTING_BUDGET = 10000
+    REFINE = 100
+    REFINE_TRIGRAMS = 8
+    MIN_SIMILARITY = 0.4
+    MAX_VARIANT_LENGTH = 24
+
+    def __init__(self):
+        self.postings = {}
+
+    def clear(self):
+        """
+        Очищает индекс.
+        """
+        self.postings.clear()
+
+    def add(self, note):
+        """
+        Добавляет заголовок заметки в индекс.
+
+        Аргументы:
+        note (Note): Заметка с назначенным идентификатором.
+        """
+        for trigram in _title_trigrams(note.title):
+            _insert_posting(self.postings, trigram, note.id)
+
+    def add_many(self, notes):
+        """
+        Добавляет заголовки заметок в индекс; каждый список вхождений дополняется один раз.
+
+        Аргументы:
+        notes (iterable): Заметки с назначенными идентификаторами.
+        """
+        grams = {}
+        for note in notes:
+            for trigram in _title_trigrams(note.title):
+                ids = grams.get(trigram)
+                if ids is None:
+                    grams[trigram] = [note.id]
+                else:
+                    ids.append(note.id)
+        for trigram, ids in grams.items():
+            _merge_posting(self.postings, trigram, [ids])
+
+    def remove(self, note):
+        """
+        Удаляет заголовок заметки из индекса.
+
+        Аргументы:
+        note (Note): Заметка (с заголовком, под которым она была добавлена).
+        """
+        for trigram in _title_trigrams(note.title):
+            _delete_posting(self.postings, trigram, note.id)
+
+    def update(self, note_id, old_title, new_title):
+        """
+        Обновляет триграммы заметки после смены заголовка.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+        old_title (str): Прежний заголовок.
+        new_title (str): Новый заголовок.
+        """
+        old, new = _title_trigrams(old_title), _title_trigrams(new_title)
+        for trigram in old - new:
+            _delete_posting(self.postings, trigram, note_id)
+        for trigram in new - old:
+            _insert_posting(self.postings, trigram, note_id)
+
+    def candidates(self, query, limit, transpositions=False):
+        """
+        Отбирает заметки с наибольшим числом общих с запросом триграмм.
+
+        Аргументы:
+        query (str): Запрос, нормализованный normalize_title().
+        limit (int): Максимальное количество кандидатов.
+        transpositions (bool, optional): Учитывать варианты запроса с переставленными соседними буквами.
+
+        Возвращает:
+        list: Идентификаторы заметок, начиная с лучших.
+        """
+        grams = set()
+        for variant in _query_variants(query) if transpositions else [query]:
+            grams |= trigrams(" " + variant)
+        postings = sorted(filter(None, map(self.postings.get, grams)), key=len)
+        counts = Counter()
+        budget = self.POSTING_BUDGET
+        while postings and (budget >= len(postings[0]) or not counts):
+            posting = postings.pop(0)
+            counts.update(posting[-budget:] if len(posting) > budget else posting)
+            budget -= len(posting)
+        if not postings:
+            return [note_id for _, note_id in _most_common(counts, limit)]
+        # Частые триграммы проверяются только у лучших кандидатов: поиск в отсортированном списке
+        candidates = _most_common(counts, self.REFINE)
+        postings = postings[:self.REFINE_TRIGRAMS]
+        refined = []
+        for count, note_id in candidates:
+            for posting in postings:
+                position = bisect_left(posting, note_id)
+                if position < len(posting) and posting[position] == note_id:
+                    count += 1
+            refined.append((count, note_id))
+        return [note_id for _, note_id in heapq.nlargest(limit, refined)]
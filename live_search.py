@@ -0,0 +1,157 @@
+import logging
+import queue
+import threading
+
+from index import split_query
+from metrics import metrics
+from tags import is_filter
+
+
+class LiveSearch:
+    """
+    Поиск по мере ввода в фоновом потоке.
+
+    Каждый новый запрос отменяет предыдущий. Если запрос продолжает предыдущий
+    завершённый запрос (начинается с него), а заметки с тех пор не менялись,
+    результаты предыдущего запроса сужаются вместо нового поиска по индексу.
+    Результаты передаются в главный поток очередью, которую главный поток
+    опрашивает через root.after и забирает по одной порции за такт.
+
+    Атрибуты:
+    manager (NoteManager): Менеджер заметок.
+    root (tk.Tk): Объект с методом after для опроса в главном потоке.
+    on_results (callable): on_results(notes, first, done) — вызывается в главном потоке для каждой порции.
+    batch_size (int): Размер порции результатов.
+    poll_ms (int): Интервал опроса очереди результатов, в миллисекундах.
+    """
+    CHECK_EVERY = 256
+
+    def __init__(self, manager, root, on_results, batch_size=500, poll_ms=16):
+        self.manager = manager
+        self.root = root
+        self.on_results = on_results
+        self.batch_size = batch_size
+        self.poll_ms = poll_ms
+        self._generation = 0
+        self._submitted = 0
+        self._finished = 0
+        self._previous = None
+        self._queries = queue.Queue()
+        self._results = queue.Queue()
+        self._polling = False
+        self._worker = threading.Thread(target=self._run, name="live-search", daemon=True)
+        self._worker.start()
+
+    def submit(self, query):
+        """
+        Запускает поиск, отменяя выполняющийся.
+
+        Аргументы:
+        query (str): Строка поиска.
+        """
+        self._generation += 1
+        self._submitted = self._generation
+        self._queries.put((self._generation, query))
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def cancel(self):
+        """
+        Отменяет текущий поиск; его результаты больше не доставляются.
+        """
+        self._generation += 1
+
+    def close(self):
+        """
+        Останавливает рабочий поток.
+        """
+        self.cancel()
+        self._queries.put(None)
+        self._worker.join()
+
+    @metrics.timed("live_search")
+    def search(self, query, generation=None):
+        """
+        Выполняет поиск в текущем потоке с повторным использованием предыдущих результатов.
+
+        Аргументы:
+        query (str): Строка поиска.
+        generation (int, optional): Номер запроса; поиск прерывается, если он устарел.
+
+        Возвращает:
+        list: Найденные заметки или None, если поиск отменён.
+        """
+        previous = self._previous
+        version = self.manager.version
+        if (previous is not None and previous[0] and query.lower().startswith(previous[0].lower())
+                and previous[1] == version and not is_filter(query)):
+            terms = split_query(query)
+            notes = []
+            candidates = previous[2]
+            for start in range(0, len(candidates), self.CHECK_EVERY):
+                if self._cancelled(generation):
+                    return None
+                # Содержимое может загружаться из хранилища (SQLite) или распаковываться,
+                # поэтому читается под блокировкой, порциями, чтобы не задерживать запись надолго
+                with self.manager.lock:
+                    for note in candidates[start:start + self.CHECK_EVERY]:
+                        content = note.content.lower()
+                        if all(term in content for term in terms):
+                            notes.append(note)
+        else:
+            notes = self.manager.search_notes(query)
+        if self._cancelled(generation):
+            return None
+        self._previous = (query, version, notes)
+        return notes
+
+    def _cancelled(self, generation):
+        return generation is not None and generation != self._generation
+
+    def _run(self):
+        while True:
+            item = self._queries.get()
+            # Берём только последний запрос из очереди
+            while item is not None and not self._queries.empty():
+                item = self._queries.get()
+            if item is None:
+                return
+            generation, query = item
+            try:
+                self._deliver(generation, query)
+            except Exception as error:
+                logging.error("Live search for %r failed: %s", query, error)
+            finally:
+                self._finished = generation
+
+    def _deliver(self, generation, query):
+        if self._cancelled(generation):
+            return
+        notes = self.search(query, generation)
+        if notes is None:
+            return
+        if not notes:
+            self._results.put((generation, [], True, True))
+        for start in range(0, len(notes), self.batch_size):
+            if self._cancelled(generation):
+                return
+            batch = notes[start:start + self.batch_size]
+            self._results.put((generation, batch, start == 0, start + self.batch_size >= len(notes)))
+
+    def _poll(self):
+        try:
+            while True:
+                generation, batch, first, done = self._results.get_nowait()
+                if generation == self._generation:
+                    self.on_results(batch, first, done)
+                    break
+        except queue.Empty:
+            pass
+        finally:
+            # Ошибка в on_results не должна навсегда остановить опрос: иначе _polling
+            # остаётся True и результаты следующих запросов не доставляются
+            if self._finished >= self._submitted and self._results.empty():
+                self._polling = False
+            else:
+                self.root.after(self.poll_ms, self._poll)
@@ -0,0 +1,197 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import generate_corpus
+from data import NoteManager
+from metrics import Histogram
+
+
+async def request(reader, writer, method, path, payload=None):
+    """
+    Выполняет запрос HTTP/1.1 по открытому соединению.
+
+    Аргументы:
+    reader (asyncio.StreamReader): Поток чтения соединения.
+    writer (asyncio.StreamWriter): Поток записи соединения.
+    method (str): Метод HTTP.
+    path (str): Путь с параметрами.
+    payload (dict, optional): Тело запроса в JSON.
+
+    Возвращает:
+    tuple: (код статуса, разобранный JSON ответа).
+    """
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in lines[1:] if line)}
+    if headers.get("transfer-encoding") == "chunked":
+        parts = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            chunk = await reader.readexactly(size + 2)
+            if not size:
+                break
+            parts.append(chunk[:-2])
+        data = b"".join(parts)
+    else:
+        data = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, json.loads(data) if data else None
+
+
+async def _client(host, port, deadline, rng, mix, queries, categories, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choices(list(mix), weights=list(mix.values()))[0]
+            started = time.perf_counter()
+            if kind == "search":
+                status, _ = await request(reader, writer, "GET", f"/search?q={rng.choice(queries)}&limit=100")
+            elif kind == "list":
+                status, _ = await request(reader, writer, "GET",
+                                          f"/notes?category={rng.choice(categories).replace(' ', '%20')}&limit=50")
+            elif kind == "get":
+                status, _ = await request(reader, writer, "GET", f"/notes/{rng.randint(1, 1000)}")
+                status = 200 if status == 404 else status
+            else:
+                status, _ = await request(reader, writer, "POST", "/notes",
+                                          {"title": "load", "content": "load test note", "category": "Load"})
+            latencies[kind].add(time.perf_counter() - started)
+            if status >= 400:
+                errors.append((kind, status))
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, clients=16, duration=5.0, seed=0, mix=None, queries=("a",), categories=("Category 0",)):
+    """
+    Нагружает сервер параллельными клиентами и собирает задержки.
+
+    Аргументы:
+    host (str): Адрес сервера.
+    port (int): Порт сервера.
+    clients (int, optional): Количество одновременных соединений.
+    duration (float, optional): Длительность в секундах.
+    seed (int, optional): Начальное значение генератора.
+    mix (dict, optional): Доли запросов: search, list, get, add.
+    queries (sequence, optional): Строки поиска.
+    categories (sequence, optional): Категории для листинга.
+
+    Возвращает:
+    dict: Тип запроса (и "all") -> {"count", "rps", "p50", "p99"}; "errors" -> число ошибок.
+    """
+    mix = mix or {"search": 3, "list": 3, "get": 3, "add": 1}
+    latencies = {kind: Histogram() for kind in mix}
+    errors = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, deadline, random.Random(seed + number), mix, queries, categories,
+                                   latencies, errors) for number in range(clients)))
+    elapsed = time.perf_counter() - started
+    report = {}
+    total = Histogram()
+    for kind, histogram in latencies.items():
+        total.merge(histogram)
+        report[kind] = _summary(histogram, elapsed)
+    report["all"] = _summary(total, elapsed)
+    report["errors"] = len(errors)
+    return report
+
+
+def _summary(histogram, elapsed):
+    return {"count": histogram.count, "rps": histogram.count / elapsed,
+            "p50": histogram.percentile(0.5), "p99": histogram.percentile(0.99)}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"server did not start on port {port}")
+
+
+def format_report(report):
+    """
+    Форматирует результаты нагрузки в виде таблицы.
+
+    Аргументы:
+    report (dict): Результат run_load().
+
+    Возвращает:
+    str: Текст таблицы.
+    """
+    lines = [f"{'request':<10}{'count':>10}{'req/s':>12}{'p50, ms':>12}{'p99, ms':>12}"]
+    for kind, summary in report.items():
+        if kind == "errors":
+            continue
+        p50 = "" if summary["p50"] is None else f"{summary['p50'] * 1000:.2f}"
+        p99 = "" if summary["p99"] is None else f"{summary['p99'] * 1000:.2f}"
+        lines.append(f"{kind:<10}{summary['count']:>10}{summary['rps']:>12.1f}{p50:>12}{p99:>12}")
+    lines.append(f"errors: {report['errors']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="port of a running server; by default a server is started")
+    parser.add_argument("--notes", type=int, default=10000, help="size of the store for the started server")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    corpus = list(generate_corpus(args.notes, seed=args.seed))
+    rng = random.Random(args.seed)
+    queries = [word for _, content, _ in rng.sample(corpus, min(20, len(corpus))) for word in content.split()[:1]]
+    categories = sorted({category for _, _, category in corpus})
+
+    server = None
+    with tempfile.TemporaryDirectory() as directory:
+        port = args.port
+        if port is None:
+            filename = os.path.join(directory, "notes.db")
+            logging.disable(logging.INFO)
+            manager = NoteManager()
+            from storage import SQLiteStorage
+            manager.attach_storage(SQLiteStorage(filename))
+            manager.add_notes(corpus)
+            manager.close()
+            port = _free_port()
+            server = subprocess.Popen([sys.executable, "server.py", "--sqlite", filename, "--port", str(port)],
+                                      cwd=os.path.dirname(os.path.abspath(__file__)))
+            _wait_for_port(port)
+        try:
+            report = asyncio.run(run_load(args.host, port, args.clients, args.duration, args.seed,
+                                          queries=queries or ["a"], categories=categories))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+    print(format_report(report))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,92 @@
-import tkinter as tk
-from ui import NoteApp
+import argparse
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import time
+import tracemalloc
 
-if __name__ == "__main__":
+# Отсчёт времени старта (первая отрисовка и готовность окна) ведётся с этого момента
+STARTED = time.perf_counter()
+
+from metrics import metrics
+
+
+def write_profile_report(profiler, stream, limit=30):
+    """
+    Пишет отчёт профилирования: горячие функции, выделения памяти и метрики.
+
+    Аргументы:
+    profiler (cProfile.Profile): Остановленный профилировщик.
+    stream (file): Поток для отчёта.
+    limit (int, optional): Сколько строк выводить в каждом разделе.
+    """
+    stats = io.StringIO()
+    pstats.Stats(profiler, stream=stats).sort_stats("cumulative").print_stats(limit)
+    stream.write(stats.getvalue())
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        stream.write(f"\nMemory: current {current / 2 ** 20:.1f} MiB, peak {peak / 2 ** 20:.1f} MiB\n")
+        for statistic in tracemalloc.take_snapshot().statistics("lineno")[:limit]:
+            stream.write(f"{statistic}\n")
+    stream.write("\n" + metrics.format_report() + "\n")
+
+
+def open_storage(args):
+    """
+    Создаёт хранилище, выбранное аргументами командной строки.
+
+    Аргументы:
+    args (argparse.Namespace): Аргументы с полями journal и sqlite.
+
+    Возвращает:
+    Storage: Хранилище или None, если заметки хранятся в notes.json.
+    """
+    if not (args.sqlite or args.journal):
+        return None
+    # sqlite3 и журнал нужны не всем запускам, поэтому импортируются по требованию
+    from storage import JournalStorage, SQLiteStorage
+    return SQLiteStorage(args.sqlite) if args.sqlite else JournalStorage(args.journal)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Note application.")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="FILE",
+                        help="profile with cProfile and tracemalloc, write the report to FILE (stderr by default)")
+    parser.add_argument("--log-level", default="INFO", help="logging level, e.g. WARNING to silence info messages")
+    store = parser.add_mutually_exclusive_group()
+    store.add_argument("--journal", help="journal storage path instead of notes.json")
+    store.add_argument("--sqlite", help="SQLite database file instead of notes.json")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+
+    import tkinter as tk
+    from ui import NoteApp
+
+    storage = open_storage(args)
     root = tk.Tk()
-    app = NoteApp(root)
-    root.mainloop()
+    if not args.profile:
+        NoteApp(root, storage=storage, started=STARTED)
+        root.mainloop()
+        return 0
+
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        NoteApp(root, storage=storage, started=STARTED)
+        root.mainloop()
+    finally:
+        profiler.disable()
+        if args.profile == "-":
+            write_profile_report(profiler, sys.stderr)
+        else:
+            with open(args.profile, 'w') as file:
+                write_profile_report(profiler, file)
+        tracemalloc.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+import functools
+import math
+import threading
+import time
+
+
+class Histogram:
+    """
+    Гистограмма значений с логарифмическими корзинами.
+
+    Подходит и для длительностей в секундах, и для размеров в байтах: каждый
+    интервал [2 ** (e - 1), 2 ** e) делится на SUBBUCKETS равных корзин,
+    поэтому относительная погрешность перцентилей не больше 1 / SUBBUCKETS.
+
+    Атрибуты:
+    count (int): Количество значений.
+    total (float): Сумма значений.
+    min (float): Наименьшее значение или None.
+    max (float): Наибольшее значение или None.
+    buckets (dict): Номер корзины -> количество значений (None — для нуля).
+    """
+    SUBBUCKETS = 8
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = {}
+
+    def add(self, value):
+        """
+        Добавляет значение.
+
+        Аргументы:
+        value (float): Неотрицательное значение.
+        """
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        bucket = None
+        if value > 0:
+            mantissa, exponent = math.frexp(value)
+            bucket = exponent * self.SUBBUCKETS + int((mantissa - 0.5) * 2 * self.SUBBUCKETS)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def merge(self, other):
+        """
+        Добавляет значения другой гистограммы.
+
+        Аргументы:
+        other (Histogram): Гистограмма.
+        """
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def percentile(self, fraction):
+        """
+        Оценивает перцентиль по верхней границе корзины.
+
+        Аргументы:
+        fraction (float): Доля от 0 до 1 (0.99 — 99-й перцентиль).
+
+        Возвращает:
+        float: Оценка перцентиля или None, если значений нет.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets, key=lambda b: -math.inf if b is None else b):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                if bucket is None:
+                    return 0.0
+                exponent, part = divmod(bucket, self.SUBBUCKETS)
+                return min(self.max, math.ldexp(0.5 + (part + 1) / (2 * self.SUBBUCKETS), exponent))
+        return self.max
+
+    def to_dict(self):
+        """
+        Возвращает сводку гистограммы.
+
+        Возвращает:
+        dict: count, total, mean, min, max, p50, p90, p99.
+        """
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+        }
+
+
+class Metrics:
+    """
+    Реестр счётчиков и гистограмм.
+
+    Все методы потокобезопасны: метрики пишутся и из главного потока, и из
+    фоновых (автосохранение, живой поиск).
+
+    Атрибуты:
+    enabled (bool): Если False, значения не записываются.
+    """
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def increment(self, name, value=1):
+        """
+        Увеличивает счётчик.
+
+        Аргументы:
+        name (str): Имя счётчика.
+        value (int, optional): Приращение.
+        """
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """
+        Добавляет значение в гистограмму.
+
+        Аргументы:
+        name (str): Имя гистограммы (например, "save_to_file.bytes").
+        value (float): Значение.
+        """
+        if self.enabled:
+            with self._lock:
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    histogram = self._histograms[name] = Histogram()
+                histogram.add(value)
+
+    def timed(self, name):
+        """
+        Декоратор, который считает вызовы функции и записывает их длительность.
+
+        Длительность пишется в гистограмму "<name>.seconds", число вызовов —
+        в счётчик "<name>.calls", исключения — в счётчик "<name>.errors".
+
+        Аргументы:
+        name (str): Имя операции.
+        """
+        calls, errors, seconds = f"{name}.calls", f"{name}.errors", f"{name}.seconds"
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                except Exception:
+                    self.increment(errors)
+                    raise
+                finally:
+                    self.increment(calls)
+                    self.observe(seconds, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        """
+        Сбрасывает все метрики.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        """
+        Возвращает текущие значения метрик.
+
+        Возвращает:
+        dict: {"counters": {имя: значение}, "histograms": {имя: сводка Histogram.to_dict()}}.
+        """
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {name: histogram.to_dict() for name, histogram in self._histograms.items()},
+            }
+
+    def format_report(self):
+        """
+        Форматирует метрики в виде таблицы.
+
+        Возвращает:
+        str: Текст отчёта.
+        """
+        snapshot = self.snapshot()
+        lines = [f"{'counter':<40}{'value':>12}"]
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name:<40}{value:>12}")
+        lines.append("")
+        lines.append(f"{'histogram':<40}{'count':>8}{'mean':>12}{'p50':>12}{'p99':>12}{'max':>12}")
+        for name, summary in sorted(snapshot["histograms"].items()):
+            lines.append(f"{name:<40}{summary['count']:>8}{summary['mean']:>12.4g}"
+                         f"{summary['p50']:>12.4g}{summary['p99']:>12.4g}{summary['max']:>12.4g}")
+        return "\n".join(lines)
+
+
+# Общий реестр метрик приложения
+metrics = Metrics()
@@ -0,0 +1,348 @@
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import threading
+
+from metrics import metrics
+
+CHUNK_NOTES = 2048
+PARALLEL_MIN_NOTES = 20000
+
+
+def make_matcher(query, regex=False, case_sensitive=False):
+    """
+    Строит описание проверки содержимого, которое можно передать в другой процесс.
+
+    Аргументы:
+    query (str): Строка поиска: слова через пробел (условие И) или регулярное выражение.
+    regex (bool, optional): Искать регулярное выражение (re.search).
+    case_sensitive (bool, optional): Учитывать регистр.
+
+    Возвращает:
+    tuple: Описание для compile_matcher(); None, если в запросе нет слов.
+
+    Исключения:
+    re.error: Если регулярное выражение записано с ошибкой.
+    """
+    if regex:
+        flags = 0 if case_sensitive else re.IGNORECASE
+        re.compile(query, flags)
+        return ("regex", query, flags)
+    terms = tuple(query.split() if case_sensitive else query.lower().split())
+    if not terms:
+        return None
+    return ("terms", terms, case_sensitive)
+
+
+def compile_matcher(spec):
+    """
+    Превращает описание make_matcher() в функцию проверки.
+
+    Аргументы:
+    spec (tuple): Описание проверки.
+
+    Возвращает:
+    callable: match(content) -> bool.
+    """
+    kind, value, option = spec
+    if kind == "regex":
+        search = re.compile(value, option).search
+        return lambda content: search(content) is not None
+    if option:
+        return lambda content: all(term in content for term in value)
+
+    def match(content):
+        content = content.lower()
+        return all(term in content for term in value)
+    return match
+
+
+def _scan(ids, contents, match):
+    return [note_id for note_id, content in zip(ids, contents) if match(content)]
+
+
+def _worker(connection, generation):
+    # Процесс пула: хранит свои порции заметок между запросами и просматривает их по команде
+    chunks = {}
+    while True:
+        message = connection.recv()
+        op = message[0]
+        if op == "load":
+            chunks[message[1]] = (message[2], message[3])
+        elif op == "drop":
+            chunks.pop(message[1], None)
+        elif op == "scan":
+            _, query_id, spec, chunk_ids = message
+            try:
+                match = compile_matcher(spec)
+                for chunk_id in chunk_ids:
+                    if generation.value != query_id:  # Запрос заменён новым
+                        break
+                    connection.send(("found", query_id, chunk_id, _scan(*chunks[chunk_id], match)))
+            except Exception as error:
+                connection.send(("error", query_id, repr(error)))
+        elif op == "stop":
+            return
+
+
+def _read_replies(connection, number, replies):
+    # Поток родительского процесса: непрерывно вычитывает ответы процесса пула, чтобы тот
+    # никогда не ждал на записи, пока родитель сам пересылает ему порции
+    try:
+        while True:
+            replies.put(connection.recv())
+    except (EOFError, OSError):
+        replies.put(("exited", None, number))
+
+
+class ParallelSearch:
+    """
+    Параллельный полный просмотр заметок для запросов, на которые не отвечает
+    индекс: регулярных выражений, поиска с учётом регистра, проверок всего корпуса.
+
+    Заметки делятся на порции по CHUNK_NOTES идентификаторов. Каждая порция
+    один раз пересылается одному процессу постоянного пула и хранится там
+    между запросами; повторно пересылаются только порции, в которых заметки
+    добавились, удалились или получили новое содержимое (см.
+    Note.stored_content). Ответы процессов вычитываются отдельными потоками,
+    поэтому пересылка не ждёт процессы, занятые отменённым запросом. Запрос рассылает процессам только описание проверки, каждый
+    процесс просматривает свои порции по возрастанию, а результаты выдаются
+    порциями в порядке идентификаторов, как только готовы все предыдущие.
+    Новый запрос (или cancel()) отменяет выполняющийся: процессы прекращают
+    просмотр на границе порции. Если заметок меньше min_notes или процесс
+    один, просмотр идёт в текущем процессе. Если процесс пула завершился,
+    запрос прерывается RuntimeError, а следующий запрос запускает пул заново.
+
+    Результаты соответствуют заметкам на момент начала запроса; заметки,
+    удалённые во время просмотра, пропускаются.
+
+    Атрибуты:
+    manager (NoteManager): Менеджер заметок.
+    workers (int): Количество процессов пула.
+    min_notes (int): Сколько заметок нужно для параллельного просмотра.
+    """
+    def __init__(self, manager, workers=None, min_notes=PARALLEL_MIN_NOTES):
+        self.manager = manager
+        self.workers = workers or os.cpu_count() or 1
+        self.min_notes = min_notes
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._shared_generation = None
+        self._processes = []
+        self._connections = []
+        self._readers = []
+        self._replies = None
+        self._version = None
+        self._chunks = {}
+        self._shipped = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        """
+        Останавливает процессы пула.
+        """
+        with self._lock:
+            self.cancel()
+            for connection in self._connections:
+                try:
+                    connection.send(("stop",))
+                except OSError:
+                    pass
+            for process in self._processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            for reader in self._readers:  # Завершаются сами: процесс закрыл свой конец канала
+                reader.join(timeout=5)
+            for connection in self._connections:
+                connection.close()
+            self._processes, self._connections, self._readers = [], [], []
+            self._replies = None
+            self._shipped = {}
+
+    def cancel(self):
+        """
+        Отменяет выполняющийся запрос; его генератор search() завершится.
+        """
+        with self._lock:
+            self._generation += 1
+            if self._shared_generation is not None:
+                self._shared_generation.value = self._generation
+
+    @metrics.timed("parallel_search")
+    def find(self, query, regex=False, case_sensitive=False):
+        """
+        Выполняет запрос целиком.
+
+        Аргументы:
+        query (str): Слова через пробел (условие И) или регулярное выражение.
+        regex (bool, optional): Искать регулярное выражение.
+        case_sensitive (bool, optional): Учитывать регистр.
+
+        Возвращает:
+        list: Найденные заметки по возрастанию идентификатора.
+        """
+        return [note for notes in self.search(query, regex, case_sensitive) for note in notes]
+
+    def search(self, query, regex=False, case_sensitive=False):
+        """
+        Выполняет запрос, выдавая результаты по мере готовности.
+
+        Аргументы:
+        query (str): Слова через пробел (условие И) или регулярное выражение.
+        regex (bool, optional): Искать регулярное выражение.
+        case_sensitive (bool, optional): Учитывать регистр.
+
+        Возвращает:
+        generator: Непустые списки найденных заметок; вместе — по возрастанию идентификатора.
+        Генератор завершается досрочно, если запрос отменён.
+
+        Исключения:
+        re.error: Если регулярное выражение записано с ошибкой (сразу, а не при переборе).
+        RuntimeError: Если просмотр в процессе пула завершился ошибкой.
+        """
+        spec = make_matcher(query, regex, case_sensitive)
+        if spec is None:
+            return iter(())
+        return self._search(spec)
+
+    def _search(self, spec):
+        with self._lock:
+            self._generation += 1
+            query_id = self._generation
+            parallel = self.workers > 1 and sum(map(len, self.manager.notes.values())) >= self.min_notes
+            if parallel:
+                self._ensure_pool()
+                self._shared_generation.value = query_id
+            self._sync(parallel)
+            order = sorted(self._chunks)
+            if parallel:
+                plans = [[] for _ in self._connections]
+                for chunk_id in order:
+                    plans[chunk_id % len(plans)].append(chunk_id)
+                for number, chunk_ids in enumerate(plans):
+                    self._send(number, ("scan", query_id, spec, chunk_ids))
+                replies = self._replies
+        if not parallel:
+            yield from self._search_here(spec, query_id, order)
+            return
+        found, position = {}, 0
+        try:
+            while position < len(order):
+                with self._lock:
+                    if self._generation != query_id:
+                        return
+                    try:
+                        message = replies.get(timeout=0.05)
+                    except queue.Empty:
+                        continue
+                    if message[0] == "exited":
+                        self._fail(f"search process {message[2]} exited")
+                    if message[1] != query_id:
+                        continue  # Остаток отменённого запроса
+                    if message[0] == "error":
+                        raise RuntimeError(f"Parallel search failed: {message[2]}")
+                    found[message[2]] = message[3]
+                while position < len(order) and order[position] in found:
+                    if self._generation != query_id:
+                        return
+                    notes = self._notes(found.pop(order[position]))
+                    position += 1
+                    if notes:
+                        yield notes
+        finally:
+            if position < len(order) and self._generation == query_id:
+                self.cancel()  # Результаты больше не нужны: процессы прекращают просмотр
+
+    def _search_here(self, spec, query_id, order):
+        match = compile_matcher(spec)
+        for chunk_id in order:
+            with self._lock:
+                if self._generation != query_id:
+                    return
+                ids = self._chunks[chunk_id]
+            with self.manager.lock:
+                notes = [note for note in map(self.manager.get_note, ids) if note is not None]
+                contents = [note.content for note in notes]
+            found = [note for note, content in zip(notes, contents) if match(content)]
+            if found:
+                yield found
+
+    def _notes(self, ids):
+        notes = (self.manager.get_note(note_id) for note_id in ids)
+        return [note for note in notes if note is not None]
+
+    def _ensure_pool(self):
+        if self._processes:
+            return
+        context = multiprocessing.get_context("spawn")  # Без копии потоков и Tk родительского процесса
+        self._shared_generation = context.Value("q", self._generation, lock=False)
+        self._replies = queue.Queue()
+        for number in range(self.workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker, args=(child, self._shared_generation),
+                                      name=f"search-{number}", daemon=True)
+            process.start()
+            child.close()
+            reader = threading.Thread(target=_read_replies, args=(parent, number, self._replies),
+                                      name=f"search-replies-{number}", daemon=True)
+            reader.start()
+            self._processes.append(process)
+            self._connections.append(parent)
+            self._readers.append(reader)
+        self._shipped = {}
+        logging.info("Parallel search pool started with %s processes", self.workers)
+
+    def _send(self, number, message):
+        try:
+            self._connections[number].send(message)
+        except (EOFError, OSError):
+            self._fail(f"search process {number} exited")
+
+    def _fail(self, reason):
+        # Пул останавливается целиком: порции погибшего процесса потеряны, следующий запрос запустит новый
+        logging.error("Parallel search failed: %s; restarting the pool on the next query", reason)
+        self.close()
+        raise RuntimeError(f"Parallel search failed: {reason}")
+
+    @metrics.timed("parallel_search_sync")
+    def _sync(self, parallel):
+        # Перестраивает порции, если заметки менялись, и пересылает процессам только изменённые
+        manager = self.manager
+        if manager.version == self._version and (not parallel or len(self._shipped) == len(self._chunks)):
+            return
+        loads = []
+        with manager.lock:
+            grouped = {}
+            for notes in manager.notes.values():
+                for note in notes:
+                    grouped.setdefault(note.id // CHUNK_NOTES, []).append(note)
+            self._chunks = {}
+            for chunk_id, notes in grouped.items():
+                notes.sort(key=lambda note: note.id)
+                self._chunks[chunk_id] = ids = [note.id for note in notes]
+                if parallel:
+                    # Новое содержимое — всегда новый объект, поэтому правки в один и тот же
+                    # момент времени тоже замечаются; ссылки не дают адресам объектов повториться
+                    stored = [note.stored_content for note in notes]
+                    shipped = self._shipped.get(chunk_id)
+                    if shipped is None or shipped[0] != ids or any(
+                            old is not new for old, new in zip(shipped[1], stored)):
+                        loads.append((chunk_id, ids, [note.content for note in notes]))
+                        self._shipped[chunk_id] = (ids, stored)
+            self._version = manager.version
+        for chunk_id, ids, contents in loads:
+            self._send(chunk_id % len(self._connections), ("load", chunk_id, ids, contents))
+        for chunk_id in [chunk_id for chunk_id in self._shipped if chunk_id not in self._chunks]:
+            self._send(chunk_id % len(self._connections), ("drop", chunk_id))
+            del self._shipped[chunk_id]
+        metrics.increment("parallel_search.chunks_shipped", len(loads))
@@ -0,0 +1,350 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from urllib.parse import parse_qs, urlsplit
+
+from cli import close_manager, open_manager, save_manager
+
+MAX_BODY = 16 * 1024 * 1024
+STREAM_BATCH = 200
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    """
+    Ошибка запроса, которая возвращается клиенту с кодом статуса.
+
+    Атрибуты:
+    status (int): Код статуса HTTP.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class NoteServer:
+    """
+    Локальный HTTP/JSON-сервис поверх NoteManager на asyncio.
+
+    Все изменения проходят через очередь и выполняются по одному задачей
+    записи, поэтому клиенты не мешают друг другу. Чтения выполняются
+    под NoteManager.lock и видят согласованное состояние; все они идут в
+    потоках (asyncio.to_thread), чтобы ожидание блокировки, пока задача
+    записи применяет изменения и сохраняет файл, не останавливало цикл
+    событий и остальные соединения. Результаты поиска и списки заметок передаются по частям
+    (Transfer-Encoding: chunked).
+
+    Маршруты:
+    GET /categories — категории с количеством заметок.
+    GET /notes?category=&order=&offset=&limit= — страница заметок (всех или категории);
+        order — title или modified, "-" перед ним — обратный порядок.
+    GET /notes/<id> — заметка с содержимым.
+    POST /notes — создать заметку {"title", "content", "category"}.
+    PUT /notes/<id> — изменить заметку {"title", "content", "category"}.
+    DELETE /notes/<id> — удалить заметку.
+    GET /search?q=&limit= — найденные заметки.
+
+    Атрибуты:
+    manager (NoteManager): Менеджер заметок.
+    on_write (callable): Вызывается после каждой серии изменений (например, для сохранения в файл).
+    """
+    def __init__(self, manager, on_write=None):
+        self.manager = manager
+        self.on_write = on_write
+        self._writes = None
+        self._writer = None
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """
+        Запускает сервер и задачу записи.
+
+        Аргументы:
+        host (str, optional): Адрес для прослушивания.
+        port (int, optional): Порт; 0 — выбрать свободный.
+
+        Возвращает:
+        int: Порт, на котором работает сервер.
+        """
+        self._writes = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Останавливает сервер, дождавшись выполнения принятых изменений.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._writer is not None:
+            await self._writes.put(None)
+            await self._writer
+
+    async def write(self, function, *args):
+        """
+        Ставит изменение в очередь задачи записи и ждёт результата.
+
+        Аргументы:
+        function (callable): Метод NoteManager.
+        *args: Аргументы метода.
+
+        Возвращает:
+        Результат метода.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((function, args, future))
+        return await future
+
+    async def _write_loop(self):
+        while True:
+            batch = [await self._writes.get()]
+            # Изменения, накопившиеся за время предыдущей серии, выполняются одной серией
+            while not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            stop = None in batch
+            items = [item for item in batch if item is not None]
+            if items:
+                results = await asyncio.to_thread(self._apply, items)
+                for (_, _, future), (ok, value) in zip(items, results):
+                    if future.cancelled():
+                        continue
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+            if stop:
+                return
+
+    def _apply(self, items):
+        results = []
+        for function, args, _ in items:
+            try:
+                results.append((True, function(*args)))
+            except Exception as error:
+                results.append((False, error))
+        if self.on_write is not None:
+            try:
+                self.on_write()
+            except Exception as error:
+                logging.error("Saving after write failed: %s", error)
+        return results
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as error:
+                    await _send_json(writer, error.status, {"error": str(error)}, keep_alive=False)
+                    return
+                if request is None:
+                    return
+                method, target, body, keep_alive = request
+                try:
+                    await self._dispatch(writer, method, target, body, keep_alive)
+                except HTTPError as error:
+                    await _send_json(writer, error.status, {"error": str(error)}, keep_alive)
+                except Exception as error:
+                    logging.error("Request %s %s failed: %s", method, target, error)
+                    await _send_json(writer, 500, {"error": "internal error"}, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, writer, method, target, body, keep_alive):
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["categories"] and method == "GET":
+            await _send_json(writer, 200, await asyncio.to_thread(self._categories), keep_alive)
+        elif parts == ["search"] and method == "GET":
+            notes = await asyncio.to_thread(self._search, query.get("q", ""), _int_param(query, "limit", None))
+            await _stream_json(writer, notes, keep_alive)
+        elif parts == ["notes"] and method == "GET":
+            order = query.get("order", "")
+            if order.lstrip("-") not in ("", "title", "modified"):
+                raise HTTPError(400, "order must be title or modified")
+            if "category" not in query and not order:
+                raise HTTPError(400, "category or order parameter is required")
+            page = await asyncio.to_thread(self._page, query.get("category"), order,
+                                           _int_param(query, "offset", 0), _int_param(query, "limit", 100))
+            await _stream_json(writer, page, keep_alive)
+        elif parts == ["notes"] and method == "POST":
+            fields = _note_fields(body)
+            note = await self.write(self.manager.add_note, fields["title"], fields["content"], fields.get("category"))
+            await _send_json(writer, 201, {"id": note.id}, keep_alive)
+        elif len(parts) == 2 and parts[0] == "notes":
+            note_id = _note_id(parts[1])
+            if method == "GET":
+                note = await asyncio.to_thread(self._note, note_id)
+            elif method == "PUT":
+                fields = _note_fields(body)
+                note = await self.write(self._update, note_id, fields)
+            elif method == "DELETE":
+                note = await self.write(self.manager.delete_note_by_id, note_id)
+                note = note and {"id": note.id}
+            else:
+                raise HTTPError(405, f"{method} is not allowed")
+            if note is None:
+                raise HTTPError(404, f"note {note_id} not found")
+            await _send_json(writer, 200, note, keep_alive)
+        elif parts and parts[0] in ("categories", "search", "notes"):
+            raise HTTPError(405, f"{method} is not allowed")
+        else:
+            raise HTTPError(404, f"{url.path} not found")
+
+    def _categories(self):
+        with self.manager.lock:
+            return [{"name": category, "count": len(notes)} for category, notes in self.manager.notes.items()]
+
+    def _search(self, query, limit):
+        with self.manager.lock:
+            return [_summary(note) for note in self.manager.search_notes(query)[:limit]]
+
+    def _page(self, category, order, offset, limit):
+        with self.manager.lock:
+            notes = self.manager.query(category, order.lstrip("-") or None, order.startswith("-"), offset, limit)
+            return [_summary(note) for note in notes]
+
+    def _note(self, note_id):
+        with self.manager.lock:
+            note = self.manager.get_note(note_id)
+            return note and note.to_dict(include_id=True)
+
+    def _update(self, note_id, fields):
+        with self.manager.lock:
+            note = self.manager.update_note_by_id(note_id, fields["title"], fields["content"])
+            if note is not None and fields.get("category") and fields["category"] != note.category:
+                self.manager.move_note_by_id(note_id, fields["category"])
+            return note and note.to_dict(include_id=True)
+
+
+def _summary(note):
+    return {"id": note.id, "title": note.title, "category": note.category}
+
+
+def _int_param(query, name, default):
+    if name not in query:
+        return default
+    try:
+        return max(0, int(query[name]))
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+
+
+def _note_id(text):
+    try:
+        return int(text)
+    except ValueError:
+        raise HTTPError(404, f"note {text} not found")
+
+
+def _note_fields(body):
+    try:
+        fields = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "body must be JSON")
+    if not isinstance(fields, dict) or not isinstance(fields.get("title"), str) or not isinstance(fields.get("content"), str):
+        raise HTTPError(400, "title and content are required")
+    return fields
+
+
+async def _read_request(reader):
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as error:
+        if error.partial.strip():
+            raise HTTPError(400, "incomplete request")
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(400, "request head too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length", "") or "0"
+    if not (length.isascii() and length.isdigit()):
+        raise HTTPError(400, "invalid Content-Length")
+    length = int(length)
+    if length > MAX_BODY:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return method, target, body, keep_alive
+
+
+def _head(status, keep_alive, extra):
+    return (f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n{extra}\r\n").encode("latin-1")
+
+
+async def _send_json(writer, status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write(_head(status, keep_alive, f"Content-Length: {len(body)}\r\n") + body)
+    await writer.drain()
+
+
+async def _stream_json(writer, items, keep_alive):
+    # Массив JSON по частям: клиент начинает получать данные до сериализации всего ответа
+    writer.write(_head(200, keep_alive, "Transfer-Encoding: chunked\r\n"))
+    for start in range(0, len(items), STREAM_BATCH):
+        text = ",".join(json.dumps(item, ensure_ascii=False) for item in items[start:start + STREAM_BATCH])
+        _write_chunk(writer, ("[" if start == 0 else ",") + text)
+        await writer.drain()
+    _write_chunk(writer, "]" if items else "[]")
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+def _write_chunk(writer, text):
+    chunk = text.encode("utf-8")
+    writer.write(f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n")
+
+
+async def serve(args):
+    manager = open_manager(args)
+    on_write = (lambda: save_manager(manager, args)) if manager.storage is None else None
+    server = NoteServer(manager, on_write)
+    port = await server.start(args.host, args.port)
+    logging.warning("Serving notes on http://%s:%s", args.host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+        close_manager(manager, args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON service for notes.")
+    store = parser.add_mutually_exclusive_group()
+    store.add_argument("--file", default="notes.json", help="notes JSON file (saved after each batch of writes)")
+    store.add_argument("--journal", help="journal storage path")
+    store.add_argument("--sqlite", help="SQLite database file")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
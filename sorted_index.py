@@ -0,0 +1,193 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class SortedIndex:
+    """
+    Отсортированный список ключей с быстрым доступом по позиции.
+
+    Ключи хранятся блоками не длиннее 2 * LOAD; количество ключей в блоках
+    ведётся в дереве Фенвика. Вставка и удаление стоят O(log n + LOAD),
+    поиск позиции ключа и ключа по позиции — O(log n), поэтому страница из
+    k ключей с любого смещения читается за O(log n + k), без копирования
+    и сортировки всего списка.
+
+    Атрибуты:
+    LOAD (int): Нормальный размер блока.
+    """
+    LOAD = 512
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._blocks = [keys[start:start + self.LOAD] for start in range(0, len(keys), self.LOAD)]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [block[-1] for block in self._blocks]
+        tree = [0] * (len(self._blocks) + 1)
+        for position, block in enumerate(self._blocks, 1):
+            tree[position] += len(block)
+            parent = position + (position & -position)
+            if parent < len(tree):
+                tree[parent] += tree[position]
+        self._tree = tree
+        self._len = sum(len(block) for block in self._blocks)
+
+    def _update(self, block, delta):
+        position = block + 1
+        while position < len(self._tree):
+            self._tree[position] += delta
+            position += position & -position
+
+    def _before(self, block):
+        # Количество ключей в блоках левее block
+        total, position = 0, block
+        while position:
+            total += self._tree[position]
+            position -= position & -position
+        return total
+
+    def _locate(self, index):
+        # (блок, позиция в блоке) для index-го ключа: спуск по дереву Фенвика
+        block, step = 0, 1 << len(self._tree).bit_length()
+        while step:
+            if block + step < len(self._tree) and self._tree[block + step] <= index:
+                block += step
+                index -= self._tree[block]
+            step >>= 1
+        return block, index
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def __contains__(self, key):
+        block = bisect_left(self._maxes, key)
+        if block == len(self._blocks):
+            return False
+        keys = self._blocks[block]
+        position = bisect_left(keys, key)
+        return position < len(keys) and keys[position] == key
+
+    def add(self, key):
+        """
+        Добавляет ключ.
+
+        Аргументы:
+        key: Ключ (сравнимый с остальными ключами).
+        """
+        if not self._blocks:
+            self._blocks.append([key])
+            self._rebuild()
+            return
+        block = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        keys = self._blocks[block]
+        insort(keys, key)
+        self._maxes[block] = keys[-1]
+        self._len += 1
+        if len(keys) > 2 * self.LOAD:
+            self._blocks[block:block + 1] = [keys[:self.LOAD], keys[self.LOAD:]]
+            self._rebuild()
+        else:
+            self._update(block, 1)
+
+    def update(self, keys):
+        """
+        Добавляет ключи пакетом.
+
+        Большой по сравнению с индексом пакет сливается с ключами индекса
+        одной сортировкой (O(n + k log k)) вместо k отдельных вставок.
+
+        Аргументы:
+        keys (iterable): Ключи.
+        """
+        keys = sorted(keys)
+        if len(keys) * 8 < self._len:
+            for key in keys:
+                self.add(key)
+            return
+        # Две отсортированные последовательности: сортировка сливает их за линейное время
+        merged = list(self)
+        merged.extend(keys)
+        merged.sort()
+        self._blocks = [merged[start:start + self.LOAD] for start in range(0, len(merged), self.LOAD)]
+        self._rebuild()
+
+    def discard(self, key):
+        """
+        Удаляет ключ, если он есть.
+
+        Аргументы:
+        key: Ключ.
+
+        Возвращает:
+        bool: True, если ключ был удалён.
+        """
+        block = bisect_left(self._maxes, key)
+        if block == len(self._blocks):
+            return False
+        keys = self._blocks[block]
+        position = bisect_left(keys, key)
+        if position == len(keys) or keys[position] != key:
+            return False
+        del keys[position]
+        self._len -= 1
+        if keys:
+            self._maxes[block] = keys[-1]
+            self._update(block, -1)
+        else:
+            del self._blocks[block]
+            self._rebuild()
+        return True
+
+    def bisect_left(self, key):
+        """
+        Возвращает позицию, с которой начинаются ключи не меньше key.
+        """
+        block = bisect_left(self._maxes, key)
+        if block == len(self._blocks):
+            return self._len
+        return self._before(block) + bisect_left(self._blocks[block], key)
+
+    def bisect_right(self, key):
+        """
+        Возвращает позицию, с которой начинаются ключи больше key.
+        """
+        block = bisect_right(self._maxes, key)
+        if block == len(self._blocks):
+            return self._len
+        return self._before(block) + bisect_right(self._blocks[block], key)
+
+    def islice(self, start=0, stop=None, reverse=False):
+        """
+        Перебирает ключи с позиции start до stop (не включая).
+
+        Аргументы:
+        start (int, optional): Позиция первого ключа.
+        stop (int, optional): Позиция за последним ключом; по умолчанию конец.
+        reverse (bool, optional): Перебирать от stop - 1 к start.
+
+        Возвращает:
+        generator: Ключи.
+        """
+        stop = self._len if stop is None else min(stop, self._len)
+        start = max(start, 0)
+        if start >= stop:
+            return
+        if reverse:
+            block, position = self._locate(stop - 1)
+            for _ in range(stop - start):
+                yield self._blocks[block][position]
+                position -= 1
+                if position < 0:
+                    block -= 1
+                    position = len(self._blocks[block]) - 1
+        else:
+            block, position = self._locate(start)
+            for _ in range(stop - start):
+                yield self._blocks[block][position]
+                position += 1
+                if position == len(self._blocks[block]):
+                    block, position = block + 1, 0
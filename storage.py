@@ -0,0 +1,479 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from blobs import pack_snapshot
+from data import Note, write_snapshot
+from index import split_query
+
+
+class Storage:
+    """
+    Интерфейс хранилища заметок, подключаемого через NoteManager.attach_storage().
+
+    Атрибуты:
+    index: Поисковый индекс хранилища, заменяющий TokenIndex, или None.
+    """
+    index = None
+
+    def load(self, manager):
+        """
+        Загружает заметки из хранилища в менеджер.
+
+        Аргументы:
+        manager (NoteManager): Менеджер заметок.
+        """
+        raise NotImplementedError
+
+    def record(self, op, fields):
+        """
+        Сохраняет изменение, сделанное в менеджере.
+
+        Аргументы:
+        op (str): Тип операции: add, add_many, update, patch, delete, move, rename_category, delete_category.
+        fields (dict): Данные операции.
+        """
+        raise NotImplementedError
+
+    def reset(self, manager):
+        """
+        Заменяет содержимое хранилища текущим состоянием менеджера.
+
+        Аргументы:
+        manager (NoteManager): Менеджер заметок.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Освобождает ресурсы хранилища.
+        """
+
+
+class JournalStorage(Storage):
+    """
+    Хранилище заметок в виде снимка и журнала изменений (только дозапись).
+
+    Каждое изменение NoteManager дописывается в журнал одной строкой JSON.
+    При запуске журнал применяется поверх последнего снимка. Когда журнал
+    превышает порог, он закрывается, а новый снимок пишется в фоне.
+
+    Файлы:
+    <path>.snap — снимок {"seq": N, "notes": {...}} с идентификаторами заметок.
+    <path>.journal — текущий журнал.
+    <path>.journal.1 — журнал, закрытый на время сжатия.
+
+    Атрибуты:
+    path (str): Базовый путь хранилища.
+    compact_threshold (int): Размер журнала в байтах, после которого начинается сжатие.
+    fsync (bool): Вызывать fsync после каждой записи журнала.
+    seq (int): Номер последней записи журнала.
+    """
+    def __init__(self, path, compact_threshold=4 * 1024 * 1024, fsync=True):
+        self.path = os.fspath(path)
+        self.snapshot_path = self.path + ".snap"
+        self.journal_path = self.path + ".journal"
+        self.sealed_path = self.journal_path + ".1"
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.seq = 0
+        self.manager = None
+        self._journal = None
+        self._compactor = None
+
+    def load(self, manager):
+        """
+        Восстанавливает заметки: загружает снимок и применяет журналы.
+
+        Аргументы:
+        manager (NoteManager): Менеджер, в который загружаются заметки.
+        """
+        self.manager = manager
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as file:
+                data = json.load(file)
+            snapshot_seq = data["seq"]
+            manager.load_data(data["notes"])
+        self.seq = snapshot_seq
+        replayed = 0
+        for path in (self.sealed_path, self.journal_path):
+            for record in self._read_journal(path):
+                if record["seq"] > snapshot_seq:
+                    manager.apply_record(record)
+                    replayed += 1
+                self.seq = max(self.seq, record["seq"])
+        self._journal = open(self.journal_path, 'ab')
+        if os.path.exists(self.sealed_path):
+            # Прошлое сжатие не завершилось: дописываем снимок сейчас
+            self._write_snapshot(self._take_snapshot())
+            os.remove(self.sealed_path)
+        logging.info("Journal storage %s loaded, %s records replayed", self.path, replayed)
+
+    def record(self, op, fields):
+        """
+        Дописывает изменение в журнал.
+
+        Аргументы:
+        op (str): Тип операции.
+        fields (dict): Данные операции.
+        """
+        self.seq += 1
+        line = json.dumps({"seq": self.seq, "op": op, **fields}) + "\n"
+        self._journal.write(line.encode("utf-8"))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        if self._journal.tell() >= self.compact_threshold and not self.compacting:
+            self.compact()
+
+    @property
+    def compacting(self):
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def compact(self, background=True):
+        """
+        Сжимает журнал: закрывает текущий и записывает новый снимок.
+
+        Аргументы:
+        background (bool, optional): Записывать снимок в фоновом потоке.
+        """
+        self.wait()
+        snapshot = self._take_snapshot()
+        self._journal.close()
+        os.replace(self.journal_path, self.sealed_path)
+        self._journal = open(self.journal_path, 'ab')
+        if background:
+            self._compactor = threading.Thread(target=self._finish_compaction, args=(snapshot,), name="journal-compaction", daemon=True)
+            self._compactor.start()
+        else:
+            self._finish_compaction(snapshot)
+
+    def reset(self, manager):
+        """
+        Заменяет содержимое хранилища текущим состоянием менеджера (например, после импорта).
+
+        Аргументы:
+        manager (NoteManager): Менеджер заметок.
+        """
+        self.manager = manager
+        self.compact(background=False)
+
+    def wait(self):
+        """
+        Дожидается завершения фонового сжатия.
+        """
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def close(self):
+        """
+        Дожидается сжатия и закрывает журнал.
+        """
+        self.wait()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _take_snapshot(self):
+        return {"seq": self.seq, "notes": self.manager.snapshot(include_ids=True, include_history=True)}
+
+    def _write_snapshot(self, snapshot):
+        write_snapshot(dict(snapshot, notes=pack_snapshot(snapshot["notes"])), self.snapshot_path)
+
+    def _finish_compaction(self, snapshot):
+        self._write_snapshot(snapshot)
+        os.remove(self.sealed_path)
+        logging.info("Journal %s compacted at seq %s", self.journal_path, snapshot['seq'])
+
+    def _read_journal(self, path):
+        if not os.path.exists(path):
+            return
+        offset = 0
+        with open(path, 'rb') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if record is None or not line.endswith(b"\n"):
+                    # Обрезанная при сбое последняя запись отбрасывается
+                    logging.warning("Truncating damaged journal %s at byte %s", path, offset)
+                    break
+                offset += len(line)
+                yield record
+            else:
+                return
+        with open(path, 'r+b') as file:
+            file.truncate(offset)
+
+
+class SQLiteIndex:
+    """
+    Поисковый индекс NoteManager поверх таблицы FTS5 хранилища SQLite.
+
+    Заметки хранятся в нём только по идентификатору; содержимое не читается,
+    пока его не запросят, а поиск выполняется запросом к SQLite.
+    """
+    def __init__(self, storage):
+        self.storage = storage
+        self._notes = {}
+
+    def __len__(self):
+        return len(self._notes)
+
+    def get(self, note_id):
+        return self._notes.get(note_id)
+
+    def clear(self):
+        self._notes.clear()
+
+    def add(self, note):
+        self._notes[note.id] = note
+
+    def add_many(self, notes):
+        for note in notes:
+            self._notes[note.id] = note
+
+    def remove(self, note):
+        self._notes.pop(note.id, None)
+
+    def update(self, note):
+        self._notes[note.id] = note
+
+    def memory_size(self, note_id):
+        return 0  # Индекс хранится в базе, а не в памяти процесса
+
+    def search(self, query):
+        return self.storage.search_ids(query)
+
+
+class SQLiteStorage(Storage):
+    """
+    Хранилище заметок в базе SQLite с полнотекстовым индексом FTS5.
+
+    Заголовки и категории лежат в индексированных таблицах и загружаются при
+    запуске, а содержимое заметок читается из базы только при обращении к
+    Note.content. Поиск по подстроке выполняется через FTS5 с токенизатором
+    trigram.
+
+    Ограничение: при открытии загружаются заголовки всех заметок, и по ним
+    строятся индекс заголовков, индексы сортировки и карты тегов, поэтому
+    время запуска и память растут с числом заметок в базе (но не с объёмом
+    их содержимого).
+
+    Атрибуты:
+    path (str): Путь к файлу базы данных.
+    import_from (str): Файл notes.json, переносимый в пустую базу при первой загрузке.
+    index (SQLiteIndex): Поисковый индекс для NoteManager.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS categories (name TEXT PRIMARY KEY, position INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY,
+            category TEXT NOT NULL,
+            title TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            created REAL,
+            modified REAL,
+            tags TEXT
+        );
+        CREATE INDEX IF NOT EXISTS notes_by_category ON notes (category, position);
+        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(content, tokenize='trigram');
+    """
+
+    def __init__(self, path, import_from=None):
+        self.path = os.fspath(path)
+        self.import_from = import_from
+        self.index = SQLiteIndex(self)
+        # Соединение используется и из фоновых потоков (живой поиск) под NoteManager.lock
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.create_function("contains_ci", 2, _contains_ci, deterministic=True)
+        self.conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(notes)")}
+        if "modified" not in columns:  # База, созданная до появления времени заметок
+            with self.conn:
+                self.conn.execute("ALTER TABLE notes ADD COLUMN created REAL")
+                self.conn.execute("ALTER TABLE notes ADD COLUMN modified REAL")
+        if "tags" not in columns:  # База, созданная до появления тегов
+            with self.conn:
+                self.conn.execute("ALTER TABLE notes ADD COLUMN tags TEXT")
+        self._position = self._next_value("notes")
+        self._category_position = self._next_value("categories")
+
+    def load(self, manager):
+        """
+        Загружает заголовки и категории; при первом запуске переносит notes.json.
+
+        Аргументы:
+        manager (NoteManager): Менеджер заметок.
+        """
+        empty = self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM notes)").fetchone()[0]
+        if empty and self.import_from and os.path.exists(self.import_from):
+            manager.load_from_file(self.import_from)
+            self.reset(manager)
+            logging.info("Notes migrated from %s to %s", self.import_from, self.path)
+        notes_by_category = {}
+        rows = self.conn.execute(
+            "SELECT notes.id, notes.category, notes.title, notes.created, notes.modified, notes.tags FROM notes"
+            " JOIN categories ON categories.name = notes.category"
+            " ORDER BY categories.position, notes.position")
+        for note_id, category, title, created, modified, tags in rows:
+            note = Note(title, None, category, id=note_id, created=created, modified=modified,
+                        tags=json.loads(tags) if tags else ())
+            note.loader = self.load_content
+            notes_by_category.setdefault(category, []).append(note)
+        manager.replace_notes(notes_by_category)
+        logging.info("SQLite storage %s loaded", self.path)
+
+    def load_content(self, note_id):
+        """
+        Читает содержимое заметки из базы.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+
+        Возвращает:
+        str: Содержимое заметки.
+        """
+        row = self.conn.execute("SELECT content FROM notes_fts WHERE rowid = ?", (note_id,)).fetchone()
+        return row[0] if row else ""
+
+    def search_ids(self, query):
+        """
+        Ищет заметки, содержащие все термы запроса (подстроки без учёта регистра).
+
+        Аргументы:
+        query (str): Строка поиска.
+
+        Возвращает:
+        set: Множество идентификаторов найденных заметок.
+        """
+        terms = split_query(query)
+        if not terms:
+            return set()
+        conditions, params = [], []
+        # Триграммный индекс работает для термов от трёх символов; короткие проверяются перебором
+        indexed = [term for term in terms if len(term) >= 3]
+        if indexed:
+            conditions.append("notes_fts MATCH ?")
+            params.append(" AND ".join('"' + term.replace('"', '""') + '"' for term in indexed))
+        for term in terms:
+            conditions.append("contains_ci(content, ?)")
+            params.append(term)
+        rows = self.conn.execute(f"SELECT rowid FROM notes_fts WHERE {' AND '.join(conditions)}", params)
+        return {row[0] for row in rows}
+
+    def record(self, op, fields):
+        """
+        Применяет изменение к базе в отдельной транзакции.
+
+        Аргументы:
+        op (str): Тип операции.
+        fields (dict): Данные операции.
+        """
+        with self.conn:
+            if op == "add":
+                self._ensure_category(fields["category"])
+                self._insert(fields)
+            elif op == "add_many":
+                self._insert_many(fields["notes"])
+            elif op == "update":
+                self.conn.execute("UPDATE notes SET title = ?, modified = ? WHERE id = ?",
+                                  (fields["title"], fields["time"], fields["id"]))
+                self.conn.execute("UPDATE notes_fts SET content = ? WHERE rowid = ?", (fields["content"], fields["id"]))
+            elif op == "patch":
+                self.conn.execute("UPDATE notes_fts SET content = substr(content, 1, ?) || ? || substr(content, ? + 1)"
+                                  " WHERE rowid = ?", (fields["start"], fields["text"], fields["end"], fields["id"]))
+                self.conn.execute("UPDATE notes SET modified = ? WHERE id = ?", (fields["time"], fields["id"]))
+            elif op == "delete":
+                self.conn.execute("DELETE FROM notes WHERE id = ?", (fields["id"],))
+                self.conn.execute("DELETE FROM notes_fts WHERE rowid = ?", (fields["id"],))
+            elif op == "move":
+                self._ensure_category(fields["category"])
+                self.conn.execute("UPDATE notes SET category = ?, position = ? WHERE id = ?",
+                                  (fields["category"], self._take_position(), fields["id"]))
+            elif op == "tags":
+                self.conn.execute("UPDATE notes SET tags = ?, modified = ? WHERE id = ?",
+                                  (_tags_column(fields["tags"]), fields["time"], fields["id"]))
+            elif op == "rename_category":
+                self.conn.execute("UPDATE categories SET name = ?, position = ? WHERE name = ?",
+                                  (fields["new"], self._take_category_position(), fields["old"]))
+                self.conn.execute("UPDATE notes SET category = ? WHERE category = ?", (fields["new"], fields["old"]))
+            elif op == "delete_category":
+                self.conn.execute("DELETE FROM notes_fts WHERE rowid IN (SELECT id FROM notes WHERE category = ?)",
+                                  (fields["category"],))
+                self.conn.execute("DELETE FROM notes WHERE category = ?", (fields["category"],))
+                self.conn.execute("DELETE FROM categories WHERE name = ?", (fields["category"],))
+            else:
+                raise ValueError(f"Unknown storage operation: {op}")
+
+    def reset(self, manager):
+        """
+        Перезаписывает базу текущим состоянием менеджера в одной транзакции.
+
+        Аргументы:
+        manager (NoteManager): Менеджер заметок.
+        """
+        snapshot = manager.snapshot(include_ids=True)
+        with self.conn:
+            self.conn.execute("DELETE FROM notes")
+            self.conn.execute("DELETE FROM notes_fts")
+            self.conn.execute("DELETE FROM categories")
+            for category, notes in snapshot.items():
+                self._ensure_category(category)
+                self._insert_many(notes)
+
+    def close(self):
+        """
+        Закрывает соединение с базой.
+        """
+        self.conn.close()
+
+    def _insert(self, fields):
+        self.conn.execute("INSERT INTO notes (id, category, title, position, created, modified, tags)"
+                          " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          (fields["id"], fields["category"], fields["title"], self._take_position(),
+                           fields.get("created"), fields.get("modified"), _tags_column(fields.get("tags"))))
+        self.conn.execute("INSERT INTO notes_fts (rowid, content) VALUES (?, ?)", (fields["id"], fields["content"]))
+
+    def _insert_many(self, notes):
+        for category in dict.fromkeys(fields["category"] for fields in notes):
+            self._ensure_category(category)
+        self.conn.executemany("INSERT INTO notes (id, category, title, position, created, modified, tags)"
+                              " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              [(fields["id"], fields["category"], fields["title"], self._take_position(),
+                                fields.get("created"), fields.get("modified"), _tags_column(fields.get("tags")))
+                               for fields in notes])
+        self.conn.executemany("INSERT INTO notes_fts (rowid, content) VALUES (?, ?)",
+                              [(fields["id"], fields["content"]) for fields in notes])
+
+    def _ensure_category(self, category):
+        exists = self.conn.execute("SELECT 1 FROM categories WHERE name = ?", (category,)).fetchone()
+        if not exists:
+            self.conn.execute("INSERT INTO categories (name, position) VALUES (?, ?)",
+                              (category, self._take_category_position()))
+
+    def _take_position(self):
+        self._position += 1
+        return self._position
+
+    def _take_category_position(self):
+        self._category_position += 1
+        return self._category_position
+
+    def _next_value(self, table):
+        return self.conn.execute(f"SELECT COALESCE(MAX(position), 0) FROM {table}").fetchone()[0]
+
+
+def _tags_column(tags):
+    # Теги хранятся списком JSON; заметка без тегов — NULL
+    return json.dumps(tags, ensure_ascii=False) if tags else None
+
+
+def _contains_ci(text, term):
+    return text is not None and term in text.lower()
@@ -0,0 +1,363 @@
+import re
+import sys
+from array import array
+
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|(#|tag:|category:)(?:"((?:[^"\\]|\\.)*)"|([^\s()"]+))|("(?:[^"\\]|\\.)*"|[^\s()]+))')
+_KEYWORDS = {"AND", "OR", "NOT"}
+_PREFIXES = ("#", "tag:", "category:")
+
+
+def normalize_tag(tag):
+    """
+    Приводит тег к каноническому виду: без пробелов по краям и в нижнем регистре.
+
+    Аргументы:
+    tag (str): Тег.
+
+    Возвращает:
+    str: Тег или пустая строка, если тег пустой.
+    """
+    return sys.intern(" ".join(tag.split()).lower())
+
+
+def normalize_tags(tags):
+    """
+    Приводит теги к каноническому виду, убирая пустые и повторы.
+
+    Аргументы:
+    tags (iterable): Теги.
+
+    Возвращает:
+    tuple: Отсортированные теги.
+    """
+    return tuple(sorted({tag for tag in map(normalize_tag, tags) if tag}))
+
+
+class Bitset:
+    """
+    Изменяемое множество небольших неотрицательных чисел в виде битовой карты.
+
+    Биты хранятся в bytearray, поэтому добавление и удаление стоят O(1), а для
+    логических операций карта превращается в int (int(bitset)) за O(n / 8).
+
+    Атрибуты:
+    count (int): Количество чисел в множестве.
+    """
+    __slots__ = ("_bytes", "count")
+
+    def __init__(self):
+        self._bytes = bytearray()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, number):
+        position = number >> 3
+        return position < len(self._bytes) and bool(self._bytes[position] >> (number & 7) & 1)
+
+    def __int__(self):
+        return int.from_bytes(self._bytes, "little")
+
+    def __iter__(self):
+        return iter_bits(int(self))
+
+    def add(self, number):
+        """
+        Добавляет число.
+
+        Аргументы:
+        number (int): Неотрицательное число (идентификатор заметки).
+        """
+        position, mask = number >> 3, 1 << (number & 7)
+        if position >= len(self._bytes):
+            # Запас растёт геометрически, чтобы последовательные добавления не копировали карту каждый раз
+            self._bytes.extend(bytes(max(position + 1 - len(self._bytes), len(self._bytes) // 2)))
+        if not self._bytes[position] & mask:
+            self._bytes[position] |= mask
+            self.count += 1
+
+    def discard(self, number):
+        """
+        Удаляет число, если оно есть.
+
+        Аргументы:
+        number (int): Неотрицательное число.
+        """
+        position, mask = number >> 3, 1 << (number & 7)
+        if position < len(self._bytes) and self._bytes[position] & mask:
+            self._bytes[position] &= ~mask
+            self.count -= 1
+
+    def memory_size(self):
+        """
+        Возвращает размер карты в байтах.
+        """
+        return sys.getsizeof(self._bytes)
+
+
+def bits_of(numbers):
+    """
+    Строит битовую карту из чисел.
+
+    Аргументы:
+    numbers (iterable): Неотрицательные числа.
+
+    Возвращает:
+    int: Битовая карта.
+    """
+    bitset = Bitset()
+    for number in numbers:
+        bitset.add(number)
+    return int(bitset)
+
+
+def iter_bits(bits):
+    """
+    Перебирает номера установленных битов числа по возрастанию.
+
+    Число просматривается словами по 64 бита, поэтому нулевые участки
+    разреженной карты пропускаются быстро.
+
+    Аргументы:
+    bits (int): Битовая карта.
+
+    Возвращает:
+    generator: Номера битов.
+    """
+    if bits <= 0:
+        return
+    data = bits.to_bytes((bits.bit_length() + 63) // 64 * 8, "little")
+    words = array("Q")
+    words.frombytes(data)  # Порядок байтов не важен: слово проверяется только на ноль
+    for word_position, word in enumerate(words):
+        if word:
+            base = word_position * 8
+            for byte_position in range(base, base + 8):
+                byte = data[byte_position]
+                if byte:
+                    start = byte_position * 8
+                    for bit in _BYTE_BITS[byte]:
+                        yield start + bit
+
+
+class TagIndex:
+    """
+    Битовые карты тегов и категорий для логических фильтров по заметкам.
+
+    Для каждого тега, каждой категории и всех заметок ведётся Bitset, где
+    номер бита — идентификатор заметки (идентификаторы плотные). Фильтр
+    вида "#a AND category:Work AND NOT #b" вычисляется побитовыми операциями
+    над int за O(n / 64) на операцию, независимо от числа совпадений.
+
+    Атрибуты:
+    tags (dict): Тег -> Bitset идентификаторов заметок.
+    categories (dict): Категория -> Bitset идентификаторов заметок.
+    all (Bitset): Идентификаторы всех заметок.
+    """
+    def __init__(self):
+        self.tags = {}
+        self.categories = {}
+        self.all = Bitset()
+
+    def add(self, note):
+        """
+        Добавляет заметку в карты её тегов и категории.
+
+        Аргументы:
+        note (Note): Заметка.
+        """
+        self.all.add(note.id)
+        bitset = self.categories.get(note.category)
+        if bitset is None:
+            bitset = self.categories[note.category] = Bitset()
+        bitset.add(note.id)
+        for tag in note.tags:
+            bitset = self.tags.get(tag)
+            if bitset is None:
+                bitset = self.tags[tag] = Bitset()
+            bitset.add(note.id)
+
+    def remove(self, note):
+        """
+        Убирает заметку из карт её тегов и категории; опустевшие карты тегов удаляются.
+
+        Аргументы:
+        note (Note): Заметка.
+        """
+        self.all.discard(note.id)
+        bitset = self.categories.get(note.category)
+        if bitset is not None:
+            bitset.discard(note.id)
+        for tag in note.tags:
+            bitset = self.tags.get(tag)
+            if bitset is not None:
+                bitset.discard(note.id)
+                if not bitset:
+                    del self.tags[tag]
+
+    def rename_category(self, old_category, new_category):
+        """
+        Переносит карту категории под новое название.
+        """
+        if old_category in self.categories:
+            self.categories[new_category] = self.categories.pop(old_category)
+
+    def drop_category(self, category):
+        """
+        Удаляет карту категории (её заметки должны быть уже убраны через remove()).
+        """
+        self.categories.pop(category, None)
+
+    def counts(self):
+        """
+        Возвращает количество заметок с каждым тегом.
+
+        Возвращает:
+        dict: Тег -> количество заметок, по алфавиту.
+        """
+        return {tag: len(self.tags[tag]) for tag in sorted(self.tags)}
+
+    def evaluate(self, expression, search=None):
+        """
+        Вычисляет фильтр побитовыми операциями.
+
+        Аргументы:
+        expression (tuple): Разобранный фильтр (см. parse_filter()).
+        search (callable, optional): search(слово) -> идентификаторы заметок, содержащих слово;
+            без неё слова содержимого ничего не находят.
+
+        Возвращает:
+        int: Битовая карта идентификаторов подходящих заметок.
+        """
+        kind = expression[0]
+        if kind == "tag":
+            bitset = self.tags.get(expression[1])
+            return 0 if bitset is None else int(bitset)
+        if kind == "category":
+            bitset = self.categories.get(expression[1])
+            return 0 if bitset is None else int(bitset)
+        if kind == "text":
+            return 0 if search is None else bits_of(search(expression[1]))
+        if kind == "not":
+            return int(self.all) & ~self.evaluate(expression[1], search)
+        values = [self.evaluate(operand, search) for operand in expression[1:]]
+        result = values[0]
+        for value in values[1:]:
+            result = result & value if kind == "and" else result | value
+        return result
+
+
+def is_filter(query):
+    """
+    Проверяет, что строка поиска содержит условия по тегам или категориям.
+
+    Аргументы:
+    query (str): Строка поиска.
+
+    Возвращает:
+    bool: True, если запрос нужно разбирать parse_filter().
+    """
+    return any(word.lstrip("(").startswith(_PREFIXES) for word in query.split())
+
+
+def parse_filter(query):
+    """
+    Разбирает логический фильтр по тегам, категориям и словам содержимого.
+
+    Термы: "#тег" или "tag:тег", "category:Категория" (названия с пробелами —
+    в кавычках: category:"Рабочие заметки"), остальные слова ищутся в
+    содержимом. Операторы AND, OR, NOT (заглавными буквами) и скобки;
+    соседние термы без оператора объединяются через AND.
+
+    Аргументы:
+    query (str): Строка фильтра.
+
+    Возвращает:
+    tuple: Дерево фильтра: ("tag", тег), ("category", имя), ("text", слово),
+    ("not", x), ("and", x, y, ...), ("or", x, y, ...).
+
+    Исключения:
+    ValueError: Если фильтр записан с ошибкой.
+    """
+    tokens = []
+    position, query = 0, query.rstrip()
+    while position < len(query):
+        match = _TOKEN.match(query, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Invalid filter near {query[position:]!r}")
+        position = match.end()
+        opening, closing, prefix, quoted, bare, word = match.groups()
+        if opening or closing:
+            tokens.append(opening or closing)
+        elif prefix is not None:
+            name = _unquote(quoted) if quoted is not None else bare
+            if prefix == "category:":
+                tokens.append(("category", name))
+            else:
+                tag = normalize_tag(name)
+                if not tag:
+                    raise ValueError("Empty tag in filter")
+                tokens.append(("tag", tag))
+        elif word in _KEYWORDS:
+            tokens.append(word)
+        else:
+            tokens.append(("text", _unquote(word[1:-1]) if word.startswith('"') else word))
+    if not tokens:
+        raise ValueError("Empty filter")
+    parser = _FilterParser(tokens)
+    expression = parser.parse_or()
+    if parser.position != len(tokens):
+        raise ValueError(f"Unexpected {tokens[parser.position]!r} in filter")
+    return expression
+
+
+def _unquote(text):
+    return re.sub(r"\\(.)", r"\1", text)
+
+
+class _FilterParser:
+    # Рекурсивный спуск: OR < AND (явный или неявный) < NOT < скобки и термы
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("Unexpected end of filter")
+        self.position += 1
+        return token
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else ("or", *operands)
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.peek() not in (None, "OR", ")"):
+            if self.peek() == "AND":
+                self.take()
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else ("and", *operands)
+
+    def parse_not(self):
+        if self.peek() == "NOT":
+            self.take()
+            return ("not", self.parse_not())
+        token = self.take()
+        if token == "(":
+            expression = self.parse_or()
+            if self.take() != ")":
+                raise ValueError("Missing ')' in filter")
+            return expression
+        if isinstance(token, str):
+            raise ValueError(f"Unexpected {token!r} in filter")
+        return token
@@ -1,5 +1,55 @@
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
 import pytest
 from data import NoteManager
+from utils import search_notes
+from autosave import AutosaveScheduler
+from storage import JournalStorage, SQLiteStorage
+from benchmarks import generate_corpus, run_benchmarks, compare_to_baseline, check_throughput
+from live_search import LiveSearch
+from importer import import_directory
+from metrics import Histogram, metrics
+import cli
+from server import NoteServer
+from loadtest import request
+from editor import DirtyRange
+import archive
+from sorted_index import SortedIndex
+from filesync import FileLock, NoteFileSync
+from tags import parse_filter
+from parallel_search import ParallelSearch
+
+class FakeRoot:
+    """Заменяет tk.Tk: хранит отложенные вызовы after() до явного запуска."""
+    def __init__(self):
+        self.callbacks = {}
+        self.next_id = 0
+
+    def after(self, ms, callback):
+        self.next_id += 1
+        self.callbacks[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, timer_id):
+        self.callbacks.pop(timer_id, None)
+
+    def run_pending(self):
+        callbacks, self.callbacks = self.callbacks, {}
+        for callback in callbacks.values():
+            callback()
+
+    def run_until_idle(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.callbacks and time.monotonic() < deadline:
+            time.sleep(0.005)
+            self.run_pending()
 
 def test_add_note():
     manager = NoteManager()
@@ -59,6 +109,936 @@ def test_edit_note_category():
     note_to_edit.category = "Another Category"
     assert note_to_edit.category == "Another Category"
 
+def test_search_notes_index_matches_linear_scan():
+    manager = NoteManager()
+    manager.add_note("LotR", "Frodo and Sam", "Movies")
+    manager.add_note("Matrix", "Neo, part-42", "Movies")
+    manager.add_note("Dune", "Harkonen", "Books")
+    all_notes = [note for notes in manager.notes.values() for note in notes]
+    for query in ["frodo", "ROD", "o", "part-4", ",", "missing"]:
+        assert search_notes(manager, query) == search_notes(all_notes, query)
+
+def test_search_notes_multi_term_and():
+    manager = NoteManager()
+    manager.add_note("One", "alpha beta", "Test Category")
+    manager.add_note("Two", "alpha gamma", "Test Category")
+    assert [note.title for note in search_notes(manager, "alpha beta")] == ["One"]
+    assert [note.title for note in search_notes(manager, "alpha")] == ["One", "Two"]
+
+def test_search_index_follows_mutations(tmpdir):
+    manager = NoteManager()
+    manager.add_note("Test Note", "old text", "Test Category")
+    manager.update_note("Test Category", 0, "Test Note", "new text")
+    assert search_notes(manager, "old") == []
+    assert len(search_notes(manager, "new")) == 1
+    manager.delete_note("Test Category", 0)
+    assert search_notes(manager, "new") == []
+
+    manager.add_note("Test Note", "saved text", "Test Category")
+    filename = tmpdir.join("notes.json")
+    manager.save_to_file(filename)
+    new_manager = NoteManager()
+    new_manager.load_from_file(filename)
+    assert [note.title for note in search_notes(new_manager, "saved")] == ["Test Note"]
+
+def test_autosave_coalesces_changes(tmpdir):
+    manager = NoteManager()
+    root = FakeRoot()
+    filename = tmpdir.join("notes.json")
+    autosaver = AutosaveScheduler(manager, filename, root, byte_budget=1000)
+    manager.add_note("Test Note", "This is a test note.", "Test Category")
+    for _ in range(5):
+        autosaver.notify()
+    assert len(root.callbacks) == 1
+    root.run_pending()
+    autosaver.close()
+    assert autosaver.writes == 1
+    assert autosaver.writes_skipped == 4
+    new_manager = NoteManager()
+    new_manager.load_from_file(filename)
+    assert new_manager.get_notes("Test Category")[0].title == "Test Note"
+
+def test_autosave_byte_budget_and_flush(tmpdir):
+    manager = NoteManager()
+    root = FakeRoot()
+    filename = tmpdir.join("notes.json")
+    autosaver = AutosaveScheduler(manager, filename, root, byte_budget=10)
+    autosaver.notify(nbytes=20)
+    assert not root.callbacks
+    manager.add_note("Test Note", "This is a test note.", "Test Category")
+    autosaver.notify()
+    autosaver.flush()
+    assert not root.callbacks
+    assert autosaver.writes == 2
+    autosaver.close()
+    new_manager = NoteManager()
+    new_manager.load_from_file(filename)
+    assert len(new_manager.get_notes("Test Category")) == 1
+
+def test_journal_storage_replays_changes(tmpdir):
+    path = tmpdir.join("notes")
+    manager = NoteManager()
+    manager.attach_storage(JournalStorage(path, fsync=False))
+    manager.add_note("First", "one", "Test Category")
+    manager.add_note("Second", "two", "Test Category")
+    manager.update_note("Test Category", 1, "Second", "two updated")
+    manager.delete_note("Test Category", 0)
+    manager.move_note("Test Category", 0, "Other Category")
+    manager.rename_category("Other Category", "Renamed Category")
+    manager.close()
+
+    new_manager = NoteManager()
+    new_manager.attach_storage(JournalStorage(path, fsync=False))
+    assert new_manager.snapshot() == manager.snapshot()
+    assert new_manager.get_notes("Renamed Category")[0].content == "two updated"
+    new_manager.close()
+
+def test_journal_storage_compaction_and_damaged_tail(tmpdir):
+    path = tmpdir.join("notes")
+    manager = NoteManager()
+    storage = JournalStorage(path, compact_threshold=200, fsync=False)
+    manager.attach_storage(storage)
+    for number in range(10):
+        manager.add_note(f"Note {number}", "x" * 50, "Test Category")
+    storage.wait()
+    assert tmpdir.join("notes.snap").check()
+    manager.close()
+    with open(str(path) + ".journal", "ab") as journal:
+        journal.write(b'{"seq": 999, "op": "delete"')
+
+    new_manager = NoteManager()
+    new_manager.attach_storage(JournalStorage(path, fsync=False))
+    assert len(new_manager.get_notes("Test Category")) == 10
+    new_manager.add_note("Note 10", "x", "Test Category")
+    new_manager.close()
+    final_manager = NoteManager()
+    final_manager.attach_storage(JournalStorage(path, fsync=False))
+    assert len(final_manager.get_notes("Test Category")) == 11
+    filename = tmpdir.join("export.json")
+    final_manager.save_to_file(filename)
+    assert "id" not in json.loads(filename.read())["Test Category"][0]
+    final_manager.close()
+
+def test_sqlite_storage_lazy_content_and_search(tmpdir):
+    path = tmpdir.join("notes.db")
+    manager = NoteManager()
+    manager.attach_storage(SQLiteStorage(path))
+    manager.add_note("First", "Frodo and Sam", "Movies")
+    manager.add_note("Second", "Neo", "Movies")
+    manager.update_note("Movies", 1, "Second", "Neo, part-42")
+    manager.add_note("Third", "Harkonen", "Books")
+    manager.move_note("Movies", 0, "Books")
+    manager.close()
+
+    new_manager = NoteManager()
+    new_manager.attach_storage(SQLiteStorage(path))
+    notes = new_manager.get_notes("Books")
+    assert [note.title for note in notes] == ["Third", "First"]
+    assert repr(notes[1]) == "Note(First, lazy, Books)"
+    assert new_manager.get_note_content("Books", 1) == "Frodo and Sam"
+    assert [note.title for note in search_notes(new_manager, "ROD")] == ["First"]
+    assert [note.title for note in search_notes(new_manager, "part-4 neo")] == ["Second"]
+    assert [note.title for note in search_notes(new_manager, "o")] == ["Second", "Third", "First"]
+    assert set(new_manager.memory_usage()) == {"Books", "Movies"}
+    new_manager.delete_category("Books")
+    assert search_notes(new_manager, "frodo") == []
+    new_manager.close()
+
+def test_sqlite_storage_migrates_json(tmpdir):
+    manager = NoteManager()
+    manager.add_note("Test Note", "This is a test note.", "Test Category")
+    filename = tmpdir.join("notes.json")
+    manager.save_to_file(filename)
+
+    new_manager = NoteManager()
+    new_manager.attach_storage(SQLiteStorage(tmpdir.join("notes.db"), import_from=str(filename)))
+    assert new_manager.get_notes("Test Category")[0].title == "Test Note"
+    assert new_manager.get_note_content("Test Category", 0) == "This is a test note."
+    new_manager.close()
+
+def test_note_ids_are_stable():
+    manager = NoteManager()
+    first = manager.add_note("First", "one", "Test Category")
+    second = manager.add_note("Second", "two", "Test Category")
+    third = manager.add_note("Third", "three", "Test Category")
+    manager.delete_note_by_id(first.id)
+    assert manager.note_id_at("Test Category", 0) == second.id
+    manager.move_note_by_id(second.id, "Other Category")
+    manager.update_note_by_id(second.id, "Second", "two updated")
+    assert manager.get_note(second.id).category == "Other Category"
+    assert manager.get_note_content("Other Category", 0) == "two updated"
+    assert [note.id for note in manager.get_notes("Test Category")] == [third.id]
+    assert manager.get_note(first.id) is None
+    assert manager.delete_note_by_id(first.id) is None
+
+def test_search_order_follows_category_order():
+    manager = NoteManager()
+    first = manager.add_note("First", "match", "A")
+    manager.add_note("Second", "match", "B")
+    manager.add_note("Third", "match", "A")
+    manager.move_note_by_id(first.id, "A")
+    assert [note.title for note in search_notes(manager, "match")] == ["Third", "First", "Second"]
+
+def test_note_page():
+    manager = NoteManager()
+    for number in range(10):
+        manager.add_note(f"Note {number}", "", "Test Category")
+    manager.delete_note("Test Category", 2)
+    assert [note.title for note in manager.note_page("Test Category", 1, 3)] == ["Note 1", "Note 3", "Note 4"]
+    assert [note.title for note in manager.note_page("Test Category", 8, 5)] == ["Note 9"]
+    assert manager.note_page("Missing", 0, 5) == []
+
+def test_benchmark_corpus_is_deterministic():
+    corpus = list(generate_corpus(100, seed=7, categories=5))
+    assert corpus == list(generate_corpus(100, seed=7, categories=5))
+    assert corpus != list(generate_corpus(100, seed=8, categories=5))
+    assert {category for _, _, category in corpus} <= {f"Category {number}" for number in range(5)}
+
+def test_benchmark_regression_threshold():
+    results = run_benchmarks(sizes=[50], operations=10, memory=True)
+    assert set(results) == {f"{name}@50" for name in ("add_note", "add_notes", "search_notes", "quick_open", "regex_scan", "update_note", "save_to_file", "cli_search", "load_from_file", "delete_note")}
+    assert all(result["peak_bytes"] is not None for result in results.values())
+    assert compare_to_baseline(results, results) == []
+    assert check_throughput(results, {"add_notes": 1}) == []
+    assert check_throughput(results, {"add_notes": 10 ** 12}) == [f"add_notes@50: {1 / results['add_notes@50']['per_op']:.0f} ops/s < {10 ** 12} ops/s"]
+    slower = {key: dict(result, seconds=result["seconds"] * 2) for key, result in results.items()}
+    assert len(compare_to_baseline(slower, results, threshold=0.5)) == len(results)
+
+def test_trigram_index_matches_linear_scan_on_substrings():
+    manager = NoteManager()
+    for title, content, category in generate_corpus(300, seed=3, categories=4):
+        manager.add_note(title, content, category)
+    for note in manager.note_page("Category 0", 0, 20):
+        manager.update_note_by_id(note.id, note.title, note.content.upper() + " Part-42/x")
+    all_notes = [note for notes in manager.notes.values() for note in notes]
+    for query in ["aba", "ART-4", "t-42/", "kob", "zu ba", "b", "qqq", "2/x bab"]:
+        assert search_notes(manager, query) == search_notes(all_notes, query)
+    assert all(list(posting) == sorted(posting) for posting in manager.index.trigram_postings.values())
+
+def test_live_search_delivers_latest_query_in_batches():
+    manager = NoteManager()
+    for number in range(25):
+        manager.add_note(f"Note {number}", "alpha" if number % 2 else "beta", "Test Category")
+    root = FakeRoot()
+    batches = []
+    live_search = LiveSearch(manager, root, lambda notes, first, done: batches.append((len(notes), first, done)), batch_size=5)
+    live_search.submit("beta")
+    live_search.submit("alpha")
+    root.run_until_idle()
+    live_search.close()
+    assert batches[0][1] and batches[-1][2]
+    assert sum(count for count, _, _ in batches) == 12
+    assert [done for _, _, done in batches].count(True) == 1
+
+def test_live_search_keeps_polling_after_failed_delivery():
+    manager = NoteManager()
+    for number in range(10):
+        manager.add_note(f"Note {number}", "alpha", "Test Category")
+    root = FakeRoot()
+    delivered = []
+
+    def on_results(notes, first, done):
+        if not delivered:
+            delivered.append(None)
+            raise AttributeError("'NoneType' object has no attribute 'extend'")
+        delivered.append(len(notes))
+    live_search = LiveSearch(manager, root, on_results, batch_size=5)
+    live_search.submit("alpha")
+    with pytest.raises(AttributeError):
+        root.run_until_idle()
+    root.run_until_idle()
+    live_search.submit("alpha")
+    root.run_until_idle()
+    live_search.close()
+    assert sum(delivered[1:]) == 15
+
+def test_live_search_narrows_previous_results(monkeypatch):
+    manager = NoteManager()
+    manager.add_note("One", "part-42 alpha", "Test Category")
+    manager.add_note("Two", "part-43 alpha", "Test Category")
+    live_search = LiveSearch(manager, FakeRoot(), lambda notes, first, done: None)
+    assert len(live_search.search("part-4")) == 2
+    calls = []
+    monkeypatch.setattr(manager, "search_notes", lambda query: calls.append(query) or [])
+    assert [note.title for note in live_search.search("part-42 al")] == ["One"]
+    assert calls == []
+    manager.add_note("Three", "part-42 alpha", "Test Category")
+    live_search.search("part-42 alp")
+    assert calls == ["part-42 alp"]
+    live_search.close()
+
+def test_live_search_narrows_lazy_sqlite_content_under_lock(tmp_path, monkeypatch):
+    path = tmp_path / "notes.db"
+    manager = NoteManager()
+    manager.attach_storage(SQLiteStorage(path))
+    manager.add_note("One", "part-42 alpha", "Test Category")
+    manager.add_note("Two", "part-43 alpha", "Test Category")
+    manager.close()
+
+    manager = NoteManager()
+    storage = SQLiteStorage(path)
+    manager.attach_storage(storage)
+    live_search = LiveSearch(manager, FakeRoot(), lambda notes, first, done: None)
+    assert len(live_search.search("part-4")) == 2
+    owned = []
+    load_content = storage.load_content
+    monkeypatch.setattr(storage, "load_content",
+                        lambda note_id: owned.append(manager.lock._is_owned()) or load_content(note_id))
+    for note in manager.get_notes("Test Category"):
+        note.loader = storage.load_content
+    assert [note.title for note in live_search.search("part-42 al")] == ["One"]
+    assert owned == [True, True]
+    live_search.close()
+    manager.close()
+
+def test_note_is_compact_and_category_interned():
+    manager = NoteManager()
+    first = manager.add_note("First", "one", "".join(["Test ", "Category"]))
+    second = manager.add_note("Second", "two", "".join(["Test ", "Category"]))
+    assert not hasattr(first, "__dict__")
+    assert first.category is second.category
+
+def test_batched_index_matches_single_additions():
+    from data import Note
+    from index import TitleIndex, TokenIndex
+    corpus = list(generate_corpus(300, seed=5, categories=3))
+    notes = [Note(title, content, category, number) for number, (title, content, category) in enumerate(corpus)]
+    single, batched = TokenIndex(), TokenIndex()
+    single_titles, batched_titles = TitleIndex(), TitleIndex()
+    for note in notes:
+        single.add(note)
+        single_titles.add(note)
+    # Пакеты с идентификаторами и после, и между уже добавленными
+    for batch in (notes[100:200], notes[:100:2], notes[200:], notes[1:100:2]):
+        batched.add_many(batch)
+        batched_titles.add_many(batch)
+    assert batched.postings == single.postings
+    assert batched.trigram_postings == single.trigram_postings
+    assert batched_titles.postings == single_titles.postings
+    for note in notes[::3]:
+        single.remove(note)
+        batched.remove(note)
+    assert batched.trigram_postings == single.trigram_postings
+
+def test_index_stores_note_words_compactly():
+    manager = NoteManager()
+    first = manager.add_note("First", "Alpha beta gamma", "Test Category")
+    second = manager.add_note("Second", "beta delta", "Test Category")
+    assert manager.index._tokens[first.id].typecode == "I"
+    assert manager.index.memory_size(first.id) > manager.index.memory_size(second.id) > 0
+    manager.update_note_by_id(first.id, "First", "gamma epsilon")
+    assert [note.title for note in search_notes(manager, "beta")] == ["Second"]
+    assert [note.title for note in search_notes(manager, "psil")] == ["First"]
+    manager.delete_note_by_id(second.id)
+    assert "delta" not in manager.index.postings and "elt" not in manager.index.trigram_postings
+    usage = manager.memory_usage()["Test Category"]
+    assert usage > first.memory_size() + manager.index.memory_size(first.id)
+
+def test_compress_cold_notes_and_memory_usage():
+    manager = NoteManager()
+    manager.HOT_NOTES = 1
+    text = "lorem ipsum dolor sit amet " * 100
+    cold = manager.add_note("Cold", text, "Test Category")
+    hot = manager.add_note("Hot", text + "hot", "Test Category")
+    manager.add_note("Other", "short", "Other Category")
+    before = manager.memory_usage()
+    manager.note_content(hot.id)
+    assert manager.compress_cold(min_size=100) == 1
+    assert cold.compressed and not hot.compressed
+    assert manager.memory_usage()["Test Category"] < before["Test Category"]
+    assert manager.get_note_content("Test Category", 0) == text
+    assert [note.title for note in search_notes(manager, "dolor")] == ["Cold", "Hot"]
+    manager.update_note_by_id(cold.id, "Cold", "fresh")
+    assert not cold.compressed
+
+def test_add_notes_batch_is_journaled_and_searchable(tmp_path):
+    path = tmp_path / "notes"
+    manager = NoteManager()
+    manager.attach_storage(JournalStorage(path, fsync=False))
+    manager.add_note("Existing", "alpha", "Work")
+    notes = manager.add_notes([("One", "alpha beta", "Work"), ("Two", "gamma", "Home")])
+    assert [note.id for note in notes] == [2, 3]
+    assert [note.title for note in search_notes(manager, "alpha")] == ["Existing", "One"]
+    manager.close()
+
+    restored = NoteManager()
+    restored.attach_storage(JournalStorage(path, fsync=False))
+    assert restored.snapshot() == manager.snapshot()
+    restored.close()
+
+def test_import_directory(tmp_path):
+    (tmp_path / "Work").mkdir()
+    (tmp_path / "plain.txt").write_text("plain text", encoding="utf-8")
+    (tmp_path / "Work" / "plan.md").write_text("# Weekly plan\n\nship it", encoding="utf-8")
+    (tmp_path / "Work" / "skip.json").write_text("{}", encoding="utf-8")
+    manager = NoteManager()
+    progress = []
+    notes = import_directory(manager, tmp_path, category="Inbox", workers=1,
+                             progress=lambda done, total: progress.append((done, total)))
+    assert [(note.title, note.content, note.category) for note in notes] == [
+        ("plain", "plain text", "Inbox"), ("Weekly plan", "ship it", "Work")]
+    assert progress[-1] == (2, 2)
+
+def test_metrics_record_operations(tmp_path):
+    metrics.reset()
+    manager = NoteManager()
+    manager.add_note("Test Title", "Test Content", "Test Category")
+    manager.search_notes("content")
+    filename = tmp_path / "notes.json"
+    manager.save_to_file(filename)
+    NoteManager().load_from_file(filename)
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["add_note.calls"] == 1
+    assert snapshot["counters"]["search_notes.calls"] == 1
+    assert snapshot["histograms"]["search_notes.seconds"]["count"] == 1
+    size = filename.stat().st_size
+    assert snapshot["histograms"]["write_snapshot.bytes"]["max"] == size
+    assert snapshot["histograms"]["load_from_file.bytes"]["max"] == size
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for value in [1, 2, 3, 100]:
+        histogram.add(value)
+    summary = histogram.to_dict()
+    assert (summary["count"], summary["min"], summary["max"], summary["mean"]) == (4, 1, 100, 26.5)
+    assert summary["p50"] == 2.25
+    assert summary["p99"] == 100
+
+def test_cli_commands(tmp_path):
+    filename = str(tmp_path / "notes.json")
+    out = io.StringIO()
+    assert cli.main(["--file", filename, "add", "Plan", "ship the release", "--category", "Work"], out) == 0
+    assert cli.main(["--file", filename, "add", "List", "buy milk"], out) == 0
+    out = io.StringIO()
+    assert cli.main(["--file", filename, "search", "SHIP"], out) == 0
+    assert out.getvalue() == "Work\tPlan\n"
+    assert cli.main(["--file", filename, "search", "absent"], io.StringIO()) == 1
+    (tmp_path / "inbox").mkdir()
+    (tmp_path / "inbox" / "idea.txt").write_text("an idea", encoding="utf-8")
+    cli.main(["--file", filename, "import", str(tmp_path / "inbox"), "--category", "Ideas"], io.StringIO())
+    exported = str(tmp_path / "export.json")
+    cli.main(["--file", filename, "export", exported], io.StringIO())
+    out = io.StringIO()
+    cli.main(["--file", exported, "stats", "--json"], out)
+    assert json.loads(out.getvalue()) == {"notes": 3, "categories": 3,
+                                          "by_category": {"Work": 1, "Uncategorized": 1, "Ideas": 1}}
+
+def test_iter_notes_file_matches_json_load(tmp_path, monkeypatch):
+    data = {"A": [{"title": "1", "content": "x" * 1000, "category": "A"}], "B": [], "C": [
+        {"title": str(number), "content": "y", "category": "C"} for number in range(50)]}
+    filename = tmp_path / "notes.json"
+    filename.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    monkeypatch.setattr(archive._JSONStream, "CHUNK_SIZE", 7)
+    notes = list(archive.iter_notes_file(filename))
+    assert notes == [(category, note) for category, items in data.items() for note in items]
+    legacy = [{"title": "old", "content": "z"}, {"title": "cat", "content": "w", "category": "C"}]
+    filename.write_text(json.dumps(legacy), encoding="utf-8")
+    assert list(archive.iter_notes_file(filename)) == [
+        ("Uncategorized", {"title": "old", "content": "z", "category": "Uncategorized"}), ("C", legacy[1])]
+
+def test_cli_does_not_import_tkinter():
+    code = "import sys, cli; cli.main(['--file', 'missing.json', 'stats'], open(__import__('os').devnull, 'w')); print('tkinter' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.strip() == "False"
+
+def test_server_crud_and_search():
+    async def scenario():
+        manager = NoteManager()
+        manager.add_note("Existing", "alpha", "Work")
+        server = NoteServer(manager)
+        port = await server.start(port=0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            status, body = await request(reader, writer, "POST", "/notes", {"title": "New", "content": "alpha beta"})
+            assert (status, body) == (201, {"id": 2})
+            status, body = await request(reader, writer, "PUT", "/notes/2",
+                                         {"title": "New", "content": "alpha gamma", "category": "Home"})
+            assert body.pop("modified") >= body.pop("created")
+            assert (status, body) == (200, {"title": "New", "content": "alpha gamma", "category": "Home", "id": 2})
+            status, notes = await request(reader, writer, "GET", "/search?q=alpha")
+            assert [note["title"] for note in notes] == ["Existing", "New"]
+            assert await request(reader, writer, "GET", "/notes?category=Home") == (
+                200, [{"id": 2, "title": "New", "category": "Home"}])
+            status, notes = await request(reader, writer, "GET", "/notes?order=-modified&limit=1")
+            assert [note["title"] for note in notes] == ["New"]
+            assert (await request(reader, writer, "DELETE", "/notes/1"))[0] == 200
+            assert (await request(reader, writer, "GET", "/notes/1"))[0] == 404
+            assert (await request(reader, writer, "POST", "/notes", {"title": "No content"}))[0] == 400
+        finally:
+            writer.close()
+            await server.close()
+        assert [(note.title, note.content) for note in manager.get_notes("Home")] == [("New", "alpha gamma")]
+
+    asyncio.run(scenario())
+
+def test_server_rejects_invalid_content_length():
+    async def scenario():
+        server = NoteServer(NoteManager())
+        port = await server.start(port=0)
+        try:
+            for length in ("abc", "-5"):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(f"POST /notes HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode("latin-1"))
+                await writer.drain()
+                assert (await reader.readline()).startswith(b"HTTP/1.1 400")
+                writer.close()
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+def test_server_serializes_concurrent_writes():
+    async def scenario():
+        manager = NoteManager()
+        saves = []
+        server = NoteServer(manager, on_write=lambda: saves.append(len(manager.snapshot().get("Load", []))))
+        port = await server.start(port=0)
+
+        async def client(number):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            for _ in range(10):
+                await request(reader, writer, "POST", "/notes", {"title": str(number), "content": "x", "category": "Load"})
+            writer.close()
+
+        await asyncio.gather(*(client(number) for number in range(5)))
+        await server.close()
+        assert len(manager.get_notes("Load")) == 50
+        assert sorted(note.id for note in manager.get_notes("Load")) == list(range(1, 51))
+        assert saves[-1] == 50 and len(saves) <= 50
+
+    asyncio.run(scenario())
+
+def test_revision_history_restore_and_persist(tmp_path):
+    manager = NoteManager()
+    note = manager.add_note("Draft", "The quick brown fox", "Test Category")
+    manager.update_note_by_id(note.id, "Draft", "The quick red fox", timestamp=1.0)
+    manager.update_note_by_id(note.id, "Final", "The quick red fox jumps", timestamp=2.0)
+    assert [(r["revision"], r["title"]) for r in manager.revisions(note.id)] == [(0, "Draft"), (1, "Draft"), (2, "Final")]
+    assert manager.note_revision(note.id, 0) == ("Draft", "The quick brown fox")
+    # Небольшая правка хранится дельтой, а не копией текста
+    assert len(manager.history[note.id].entries[-1][2]) < len("The quick red fox")
+
+    manager.restore_revision(note.id, 0)
+    assert (note.title, note.content) == ("Draft", "The quick brown fox")
+    assert manager.note_revision(note.id, 2) == ("Final", "The quick red fox jumps")
+
+    filename = tmp_path / "notes.json"
+    manager.save_to_file(filename)
+    restored = NoteManager()
+    restored.load_from_file(filename)
+    restored_id = restored.note_id_at("Test Category", 0)
+    assert restored.revisions(restored_id) == manager.revisions(note.id)
+    assert restored.note_revision(restored_id, 1) == ("Draft", "The quick red fox")
+
+def test_revision_history_checkpoints_and_retention():
+    manager = NoteManager()
+    note = manager.add_note("Title", "line\n" * 200, "Test Category")
+    versions = [note.content]
+    for number in range(40):
+        content = versions[-1] + f"edit {number}\n"
+        manager.update_note_by_id(note.id, "Title", content, timestamp=float(number))
+        versions.append(content)
+    history = manager.history[note.id]
+    assert sum(len(entry) == 3 for entry in history.entries) >= 40 // history.CHECKPOINT_EVERY
+    assert all(manager.note_revision(note.id, revision)[1] == content for revision, content in enumerate(versions))
+    assert manager.prune_history(keep=5) == 35
+    assert [r["revision"] for r in manager.revisions(note.id)] == [35, 36, 37, 38, 39, 40]
+    assert manager.note_revision(note.id, 35)[1] == versions[35]
+    assert manager.note_revision(note.id, 34) is None
+
+def test_dirty_range_tracks_edits():
+    rng = random.Random(7)
+    saved = "".join(rng.choice("abc\n") for _ in range(200))
+    text = saved
+    dirty = DirtyRange(len(text))
+    for _ in range(300):
+        if rng.random() < 0.5:
+            position, chars = rng.randint(0, len(text)), "x" * rng.randint(1, 3)
+            text = text[:position] + chars + text[position:]
+            dirty.insert(position, len(chars))
+        else:
+            start = rng.randint(0, len(text))
+            end = min(len(text), start + rng.randint(0, 4))
+            text = text[:start] + text[end:]
+            dirty.delete(start, end)
+        if rng.random() < 0.1:
+            start, end = dirty.saved_span()
+            saved = saved[:start] + text[dirty.start:dirty.end] + saved[end:]
+            assert saved == text
+            dirty.reset(len(text))
+    assert dirty.length == len(text)
+
+def test_patch_note_is_journaled_as_span(tmp_path):
+    path = tmp_path / "notes"
+    manager = NoteManager()
+    manager.attach_storage(JournalStorage(path, fsync=False))
+    note = manager.add_note("Log", "line one\nline two\n" * 1000, "Test Category")
+    manager.patch_note_by_id(note.id, 5, 8, "ONE")
+    manager.close()
+    last = json.loads((tmp_path / "notes.journal").read_text().splitlines()[-1])
+    assert (last["op"], last["start"], last["end"], last["text"]) == ("patch", 5, 8, "ONE")
+    assert note.content.startswith("line ONE\nline two")
+    assert [n.title for n in search_notes(manager, "line ONE")] == ["Log"]
+    assert manager.note_revision(note.id, 0)[1].startswith("line one")
+
+    restored = NoteManager()
+    restored.attach_storage(JournalStorage(path, fsync=False))
+    assert restored.snapshot() == manager.snapshot()
+    restored.close()
+
+    sqlite = NoteManager()
+    sqlite.attach_storage(SQLiteStorage(tmp_path / "notes.db"))
+    note = sqlite.add_note("Log", "hello world", "Test Category")
+    sqlite.patch_note_by_id(note.id, 6, 11, "there")
+    sqlite.close()
+    reopened = NoteManager()
+    reopened.attach_storage(SQLiteStorage(tmp_path / "notes.db"))
+    assert reopened.get_note_content("Test Category", 0) == "hello there"
+    assert [n.title for n in reopened.search_notes("there")] == ["Log"]
+    reopened.close()
+
+def test_jsonl_export_import_round_trip(tmp_path, monkeypatch):
+    manager = NoteManager()
+    manager.add_notes([(f"t{number}", f"текст {number}", f"C{number % 3}") for number in range(25)])
+    note = manager.add_note("edited", "v1", "Work")
+    manager.update_note_by_id(note.id, "edited", "v2")
+    filename = tmp_path / "notes.jsonl.gz"
+    reports = []
+    assert archive.export_jsonl(manager, filename, progress=lambda done, total: reports.append((done, total))) == 26
+    assert reports[-1] == (26, 26)
+    assert filename.read_bytes()[:2] == b"\x1f\x8b"
+    monkeypatch.setattr(archive, "BATCH_SIZE", 4)
+    restored = NoteManager()
+    restored.add_note("old", "dropped")
+    assert archive.import_jsonl(restored, filename, replace=True) == 26
+    assert restored.snapshot() == manager.snapshot()
+    copy = restored.search_notes("v2")[0]
+    assert restored.note_revision(copy.id, 0) == ("edited", "v1")
+
+def test_convert_notes_file_to_jsonl(tmp_path):
+    source = tmp_path / "notes.json"
+    source.write_text(json.dumps([{"title": "a", "content": "x"}, {"title": "b", "content": "y", "category": "B"}]),
+                      encoding="utf-8")
+    target = tmp_path / "notes.jsonl"
+    assert archive.convert_notes_file(source, target) == 2
+    lines = target.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["category"] for line in lines] == ["Uncategorized", "B"]
+    target.write_text(lines[0] + "\nnot json\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=":2:"):
+        list(archive.read_jsonl(target))
+
+def test_sorted_index_matches_sorted_list(monkeypatch):
+    monkeypatch.setattr(SortedIndex, "LOAD", 4)
+    rng = random.Random(7)
+    index = SortedIndex(rng.sample(range(1000), 50))
+    expected = sorted(index)
+    for _ in range(500):
+        key = rng.randrange(1000)
+        if key in expected:
+            assert index.discard(key)
+            expected.remove(key)
+        else:
+            index.add(key)
+            expected.append(key)
+            expected.sort()
+    assert list(index) == expected and len(index) == len(expected)
+    assert list(index.islice(10, 30)) == expected[10:30]
+    assert list(index.islice(5, 40, reverse=True)) == expected[5:40][::-1]
+    assert index.bisect_left(expected[17]) == 17 and index.bisect_right(expected[17]) == 18
+
+def test_query_orders_pages_and_follows_changes(monkeypatch):
+    monkeypatch.setattr("data.QUERY_BATCH", 3)
+    manager = NoteManager()
+    for number in range(10):
+        manager.add_note(f"note {9 - number}", "text", "Even" if number % 2 == 0 else "Odd")
+    titles = lambda notes: [note.title for note in notes]
+    assert titles(manager.query(order_by="title", offset=2, limit=4)) == ["note 2", "note 3", "note 4", "note 5"]
+    assert titles(manager.query("Even", order_by="title")) == ["note 1", "note 3", "note 5", "note 7", "note 9"]
+    note = manager.get_notes("Odd")[0]
+    manager.update_note_by_id(note.id, "a first", "changed", timestamp=note.modified + 100)
+    assert titles(manager.query(order_by="modified", reverse=True, limit=2))[0] == "a first"
+    assert titles(manager.query("Odd", order_by="title", limit=1)) == ["a first"]
+    manager.move_note_by_id(note.id, "Even")
+    manager.rename_category("Even", "All")
+    assert titles(manager.query("All", order_by="title", limit=2)) == ["a first", "note 1"]
+    assert list(manager.query("Even", order_by="title")) == []
+    manager.delete_category("All")
+    assert titles(manager.query(order_by="title")) == ["note 0", "note 2", "note 4", "note 6"]
+    # Следующий пакет продолжает с последнего выданного ключа
+    pages = manager.query(order_by="title")
+    assert [next(pages).title for _ in range(3)] == ["note 0", "note 2", "note 4"]
+    manager.add_note("note 1", "late", "Odd")
+    assert titles(pages) == ["note 6"]
+    with pytest.raises(ValueError):
+        manager.query(order_by="content")
+
+def test_sqlite_storage_keeps_timestamps(tmp_path):
+    path = tmp_path / "notes.db"
+    manager = NoteManager()
+    manager.attach_storage(SQLiteStorage(path))
+    note = manager.add_note("Title", "one", "Work")
+    manager.patch_note_by_id(note.id, 0, 3, "two", timestamp=note.created + 5)
+    manager.close()
+    restored = NoteManager()
+    restored.attach_storage(SQLiteStorage(path))
+    loaded = restored.get_note(note.id)
+    assert (loaded.created, loaded.modified) == (note.created, note.created + 5)
+    restored.close()
+
+def test_file_sync_merges_changes_from_another_instance(tmp_path):
+    filename = str(tmp_path / "notes.json")
+    first = NoteManager()
+    first.add_note("Shared", "one", "Work")
+    first.add_note("Doomed", "bye", "Work")
+    first_sync = NoteFileSync(first, filename)
+    assert first_sync.save(first.snapshot(include_ids=True))
+    second = NoteManager()
+    second_sync = NoteFileSync(second, filename)
+    second_sync.load()
+
+    first.update_note_by_id(1, "Shared", "edited by first")
+    first.delete_note_by_id(2)
+    first.add_note("From first", "new", "Home")
+    assert first_sync.save(first.snapshot(include_ids=True))
+    local = second.add_note("From second", "mine", "Home")
+    assert local.id == 3
+    assert not second_sync.save(second.snapshot(include_ids=True))
+
+    summary = second_sync.refresh()
+    assert summary == {"added": [3], "updated": [1], "deleted": [2], "renumbered": {3: 4}}
+    assert second.get_note(1).content == "edited by first"
+    assert [note.title for note in second.get_notes("Home")] == ["From second", "From first"]
+    assert second_sync.save(second.snapshot(include_ids=True))
+    assert first_sync.refresh()["added"] == [4]
+    assert second_sync.refresh() is None
+    os.utime(filename)  # Изменилось только время: хеш совпадает, слияния нет
+    assert second_sync.changed() and second_sync.refresh() is None
+
+def test_file_sync_keeps_local_notes_when_a_script_saves(tmp_path):
+    filename = str(tmp_path / "notes.json")
+    window = NoteManager()
+    window_sync = NoteFileSync(window, filename)
+    window_sync.load()
+    window.add_note("Typed in window", "unsaved", "Inbox")
+    assert cli.main(["--file", filename, "add", "From script", "text", "--category", "Work"], io.StringIO()) == 0
+    summary = window_sync.refresh()
+    assert not summary.get("reloaded") and summary["renumbered"] == {1: 2}
+    assert [note.title for note in window.get_notes("Inbox")] == ["Typed in window"]
+    assert [note.title for note in window.get_notes("Work")] == ["From script"]
+    assert window_sync.save(window.snapshot(include_ids=True))
+
+def test_file_sync_reload_keeps_unsaved_notes(tmp_path):
+    filename = str(tmp_path / "notes.json")
+    window = NoteManager()
+    window_sync = NoteFileSync(window, filename)
+    shared = window.add_note("Shared", "one", "Work")
+    window.add_note("Other", "two", "Work")
+    assert window_sync.save(window.snapshot(include_ids=True))
+    window.update_note_by_id(shared.id, "Shared", "edited in window", shared.modified + 10)
+    window.add_note("Typed in window", "unsaved", "Inbox")
+    script = NoteManager()
+    script.load_from_file(filename)
+    script.update_note("Work", 1, "Other", "edited by old script")
+    script.save_to_file(filename)  # Без идентификаторов и без блокировки
+    summary = window_sync.refresh()
+    assert summary["reloaded"] and len(summary["kept"]) == 2
+    contents = {note.title: note.content for notes in window.notes.values() for note in notes}
+    assert contents == {"Shared": "edited in window", "Other": "edited by old script", "Typed in window": "unsaved"}
+    assert window_sync.save_manager()
+    assert window_sync.refresh() is None
+
+def test_file_lock_is_exclusive(tmp_path):
+    filename = tmp_path / "notes.json"
+    with FileLock(filename).hold():
+        with pytest.raises(TimeoutError):
+            with FileLock(filename, timeout=0.1).hold(shared=True):
+                pass
+    with FileLock(filename).hold(shared=True), FileLock(filename, timeout=0.1).hold(shared=True):
+        pass
+
+def test_file_sync_loads_in_batches(tmp_path):
+    filename = str(tmp_path / "notes.json")
+    source = NoteManager()
+    for i in range(5):
+        source.add_note(f"Work {i}", "text", "Work")
+    source.add_note("Milk", "buy", "Home")
+    source.notes["Empty"] = source.notes["Home"].__class__()
+    assert NoteFileSync(source, filename).save(source.snapshot(include_ids=True))
+
+    manager = NoteManager()
+    sync = NoteFileSync(manager, filename)
+    events = list(sync.load_in_batches(batch_size=2))
+    assert [(category, count, complete) for category, count, _, complete in events] == [
+        ("Work", 2, False), ("Work", 2, False), ("Work", 1, True), ("Home", 1, True), ("Empty", 0, True)]
+    loaded = NoteManager()
+    NoteFileSync(loaded, filename).load()
+    assert manager.snapshot(include_ids=True) == loaded.snapshot(include_ids=True)
+    assert not sync.changed() and sync.refresh() is None
+
+def test_load_batch_renumbers_notes_created_during_loading():
+    manager = NoteManager()
+    local = manager.add_note("Typed while loading", "", "Inbox")
+    notes, renumbered = manager.load_batch("Work", [{"id": 1, "title": "From file", "content": "x"}])
+    assert renumbered == {1: 2} and local.id == 2
+    assert manager.get_note(1) is notes[0] and manager.get_note(1).category == "Work"
+    assert manager.add_note("Next", "", "Inbox").id == 3
+
+def test_tag_filters_use_bitmaps():
+    manager = NoteManager()
+    a = manager.add_note("A", "buy milk", "Work", tags=["Urgent", "home "])
+    b = manager.add_note("B", "milk", "Work", tags=["urgent"])
+    c = manager.add_note("C", "bread", "Home", tags=["urgent", "later"])
+    assert a.tags == ("home", "urgent")
+    assert manager.filter_notes("#urgent AND category:Work AND NOT #home") == [b]
+    assert manager.filter_notes("(#later OR #home) milk") == [a]
+    assert manager.search_notes("#urgent NOT category:Work") == [c]
+    assert manager.search_notes("#urgent AND") == []
+    manager.set_tags(b.id, ["home"])
+    manager.move_note_by_id(c.id, "Work")
+    assert manager.filter_notes("category:Work #home") == [a, b]
+    manager.delete_note_by_id(a.id)
+    assert manager.tag_counts() == {"home": 1, "later": 1, "urgent": 1}
+    with pytest.raises(ValueError):
+        parse_filter("(#a OR")
+
+def test_tags_persist_in_file_journal_and_sqlite(tmp_path):
+    manager = NoteManager()
+    note = manager.add_note("Tagged", "text", "Work", tags=["x"])
+    manager.set_tags(note.id, ["x", "y"])
+    filename = str(tmp_path / "notes.json")
+    manager.save_to_file(filename)
+    loaded = NoteManager()
+    loaded.load_from_file(filename)
+    assert loaded.filter_notes("#y")[0].tags == ("x", "y")
+    for storage_class, path in ((JournalStorage, tmp_path / "journal"), (SQLiteStorage, tmp_path / "notes.db")):
+        stored = NoteManager()
+        stored.attach_storage(storage_class(path))
+        added = stored.add_note("Tagged", "text", "Work", tags=["x"])
+        stored.set_tags(added.id, ["y"])
+        stored.close()
+        reopened = NoteManager()
+        reopened.attach_storage(storage_class(path))
+        assert [note.tags for note in reopened.filter_notes("#y")] == [("y",)]
+        reopened.close()
+
+def test_quick_open_ranks_fuzzy_title_matches():
+    manager = NoteManager()
+    meeting = manager.add_note("Weekly meeting notes", "", "Work")
+    plan = manager.add_note("Project plan", "", "Work")
+    manager.add_note("Shopping list", "", "Home")
+    other = manager.add_note("Meeting with Bob", "", "Home")
+    assert manager.quick_open("meeting")[:2] == [other, meeting]
+    assert manager.quick_open("metting notes")[0] is meeting
+    assert manager.quick_open("notes meeting")[0] is meeting
+    assert manager.quick_open("porject")[0] is plan
+    assert manager.quick_open("prjpln")[0] is plan
+    manager.update_note_by_id(plan.id, "Roadmap", "")
+    assert plan not in manager.quick_open("project")
+    assert manager.quick_open("roadmap") == [plan]
+    manager.delete_note_by_id(meeting.id)
+    assert meeting not in manager.quick_open("weekly")
+    assert manager.quick_open("   ") == []
+
+def test_identical_content_is_shared_and_copied_on_write():
+    manager = NoteManager()
+    template = "".join(["Meeting agenda template. "] * 20)
+    first = manager.add_note("One", template, "Work")
+    second = manager.add_note("Two", "".join(["Meeting agenda template. "] * 20), "Home")
+    manager.add_note("Three", "unique", "Home")
+    assert first._content is second._content
+    stats = manager.dedup_stats()
+    assert (stats["blobs"], stats["references"]) == (2, 3)
+    assert stats["saved_bytes"] == sys.getsizeof(template) and stats["ratio"] > 1
+    manager.update_note("Work", 0, "One", template + "edited")
+    assert second.content == template and manager.blobs.refcount(template) == 1
+    manager.delete_note_by_id(second.id)
+    assert manager.blobs.refcount(template) == 0
+    assert manager.dedup_stats()["saved_bytes"] == 0
+
+def test_deduplicated_notes_file_round_trip(tmp_path):
+    manager = NoteManager()
+    template = "Boilerplate " * 10
+    for category in ("Work", "Home", "Misc"):
+        manager.add_note(category, template, category)
+    manager.add_note("Other", "different text", "Misc")
+    filename = tmp_path / "notes.json"
+    manager.save_to_file(filename)
+    data = json.loads(filename.read_text())
+    assert list(data["blobs"].values()) == [template]
+    assert [note.get("blob") for note in data["notes"]["Misc"]] == [next(iter(data["blobs"])), None]
+    loaded = NoteManager()
+    loaded.load_from_file(filename)
+    assert loaded.snapshot() == manager.snapshot()
+    assert loaded.dedup_stats()["blobs"] == 2
+    assert [(category, note["content"]) for category, note in archive.iter_notes_file(filename)] == \
+        [(category, note["content"]) for category, notes in manager.snapshot().items() for note in notes]
+    assert cli.read_notes_file(filename) == manager.snapshot()
+    exported = tmp_path / "export.json"
+    manager.save_to_file(exported, deduplicate=False)
+    assert json.loads(exported.read_text())["Work"][0]["content"] == template
+    out = io.StringIO()
+    cli.main(["--file", str(filename), "stats", "--dedup", "--json"], out)
+    assert json.loads(out.getvalue())["dedup"]["references"] == 4
+
+def test_parallel_search_streams_in_order_and_follows_changes(tmp_path):
+    manager = NoteManager()
+    manager.add_notes((f"Note {number}", f"Item {number} " + ("TODO" if number % 3 else "todo"), "Work")
+                      for number in range(5000))
+    by_id = sorted(manager.get_notes("Work"), key=lambda note: note.id)
+    with ParallelSearch(manager, workers=2, min_notes=0) as engine:
+        batches = list(engine.search(r"item \d*7 TODO", regex=True, case_sensitive=False))
+        assert len(batches) > 1
+        assert sum(batches, []) == search_notes(by_id, r"item \d*7 TODO", regex=True)
+        assert engine.find("TODO", case_sensitive=True) == search_notes(manager, "TODO", case_sensitive=True)
+        manager.update_note("Work", 0, "Note 0", "Item 0 TODO")
+        manager.delete_note_by_id(by_id[1].id)
+        assert [note.title for note in engine.find(r"^Item [01] ", regex=True)] == ["Note 0"]
+        same_tick = by_id[2]
+        manager.update_note_by_id(same_tick.id, same_tick.title, "Item 2 edited", timestamp=same_tick.modified)
+        assert engine.find("edited", case_sensitive=True) == [same_tick]
+        superseded = engine.search("item")
+        assert next(superseded)
+        assert len(engine.find("todo")) == 4998
+        assert list(superseded) == []
+    out = io.StringIO()
+    filename = str(tmp_path / "notes.json")
+    manager.save_to_file(filename)
+    assert cli.main(["--file", filename, "search", "--regex", "^Item 0 T", "--workers", "1"], out) == 0
+    assert out.getvalue() == "Work\tNote 0\n"
+
+def test_import_jsonl_replace_with_sqlite_storage(tmp_path):
+    source = NoteManager()
+    source.add_note("Imported", "new text", "Work")
+    archive.export_jsonl(source, tmp_path / "notes.jsonl")
+    manager = NoteManager()
+    manager.attach_storage(SQLiteStorage(tmp_path / "notes.db"))
+    manager.add_note("Old", "old text", "Home")
+    assert archive.import_jsonl(manager, tmp_path / "notes.jsonl", replace=True) == 1
+    assert [note.title for notes in manager.notes.values() for note in notes] == ["Imported"]
+    manager.close()
+    reopened = NoteManager()
+    reopened.attach_storage(SQLiteStorage(tmp_path / "notes.db"))
+    assert [(note.title, note.content) for notes in reopened.notes.values() for note in notes] == [("Imported", "new text")]
+    reopened.close()
+
+def test_import_jsonl_journals_history(tmp_path):
+    source = NoteManager()
+    note = source.add_note("Imported", "first", "Work")
+    source.update_note_by_id(note.id, "Imported", "second")
+    archive.export_jsonl(source, tmp_path / "notes.jsonl", include_history=True)
+    manager = NoteManager()
+    manager.attach_storage(JournalStorage(tmp_path / "journal"))
+    manager.add_note("Old", "old text", "Home")
+    assert archive.import_jsonl(manager, tmp_path / "notes.jsonl", replace=True) == 1
+    manager.close()
+    reopened = NoteManager()
+    reopened.attach_storage(JournalStorage(tmp_path / "journal"))
+    imported = reopened.get_notes("Work")[0]
+    assert list(reopened.notes) == ["Work"]
+    assert reopened.note_revision(imported.id, 0) == ("Imported", "first")
+    reopened.close()
+
 # Запуск тестов
 if __name__ == "__main__":
     pytest.main()
@@ -1,10 +1,20 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog, simpledialog, ttk, font
 import logging
+import queue
+import threading
+import time
 from data import NoteManager
-from utils import search_notes
+from autosave import AutosaveScheduler
+from widgets import VirtualListbox
+from live_search import LiveSearch
+from importer import import_directory
+from editor import NoteEditor
+from archive import export_jsonl, import_jsonl, is_jsonl
+from filesync import NoteFileSync
+from metrics import metrics
 
-logging.basicConfig(level=logging.INFO)
+JSON_FILETYPES = [("JSON files", "*.json"), ("JSON Lines", "*.jsonl *.jsonl.gz")]
 
 class NoteApp:
     """
@@ -13,20 +23,56 @@ class NoteApp:
     Атрибуты:
     root (tk.Tk): Корневой виджет Tkinter.
     manager (NoteManager): Экземпляр класса NoteManager для управления заметками.
+    storage (Storage): Хранилище заметок (например, SQLiteStorage) или None для notes.json.
+    file_sync (NoteFileSync): Синхронизация с notes.json, который могут менять другие экземпляры; None для storage.
+    loading (bool): Заметки ещё загружаются в фоновом потоке.
+    loaded_categories (set): Полностью загруженные категории; пока идёт загрузка, меняются только они.
+    first_paint_time (float): Секунды от запуска до первой отрисовки окна.
+    interactive_time (float): Секунды от запуска до окончания загрузки всех заметок.
     """
-    def __init__(self, root):
+    SYNC_POLL_MS = 1000
+    LOAD_POLL_MS = 30
+    QUICK_OPEN_RESULTS = 20
+    SAVE_ATTEMPTS = 3
+
+    def __init__(self, root, storage=None, started=None):
+        """
+        Аргументы:
+        root (tk.Tk): Корневой виджет Tkinter.
+        storage (Storage, optional): Хранилище заметок; по умолчанию notes.json.
+        started (float, optional): time.perf_counter() в момент запуска процесса для замера времени старта.
+        """
         self.root = root
+        self.storage = storage
+        self.started = time.perf_counter() if started is None else started
+        self.loading = False
+        self.loaded_categories = set()
+        self.load_error = None
+        self.first_paint_time = None
+        self.interactive_time = None
+        self._loaded_notes = 0
+        self._load_events = queue.Queue()
+        self._loader = None
         self.root.title("Note Application")
         self.root.geometry("1920x1080")
         self.manager = NoteManager()
         self.categories = []
         self.selected_category = None
-        self.selected_note_index = None
+        self.selected_note_id = None
+        self.note_ids = None
         self.autosave_enabled = tk.BooleanVar(value=False)
+        self.file_sync = NoteFileSync(self.manager, "notes.json") if storage is None else None
+        self.autosaver = AutosaveScheduler(self.manager, "notes.json", self.root, before_save=self.autosave_edits,
+                                           sync=self.file_sync)
+        self._sync_results = queue.Queue()
+        self._sync_checking = False
+        self.live_search = LiveSearch(self.manager, self.root, self.show_search_results)
 
         self.setup_ui()
+        self._paint_binding = self.root.bind("<Expose>", self._on_first_paint, add="+")
         self.load_notes()
 
+        self.root.bind("<Control-p>", lambda event: self.quick_open())
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     def setup_ui(self):
@@ -43,7 +89,8 @@ class NoteApp:
 
         self.text_area = tk.Text(self.root, font=custom_font, wrap=tk.WORD)
         self.text_area.pack(expand=True, fill='both', padx=10, pady=10)
-        self.text_area.bind("<KeyRelease>", lambda event: self.autosave())
+        self.text_area.bind("<KeyRelease>", lambda event: self.autosave(self.editor.take_edited()))
+        self.editor = NoteEditor(self.text_area)
 
         self.button_frame = tk.Frame(self.root, bg=bg_color)
         self.button_frame.pack(fill='x')
@@ -66,18 +113,27 @@ class NoteApp:
         self.delete_button = tk.Button(self.button_frame, text="Delete Note", command=self.delete_note, **button_config)
         self.delete_button.pack(side='left', padx=5, pady=5)
 
+        self.history_button = tk.Button(self.button_frame, text="History", command=self.show_history, **button_config)
+        self.history_button.pack(side='left', padx=5, pady=5)
+
         self.export_button = tk.Button(self.button_frame, text="Export Notes", command=self.export_notes, **button_config)
         self.export_button.pack(side='left', padx=5, pady=5)
 
         self.import_button = tk.Button(self.button_frame, text="Import Notes", command=self.import_notes, **button_config)
         self.import_button.pack(side='left', padx=5, pady=5)
 
+        self.import_folder_button = tk.Button(self.button_frame, text="Import Folder", command=self.import_folder, **button_config)
+        self.import_folder_button.pack(side='left', padx=5, pady=5)
+
         self.edit_title_button = tk.Button(self.button_frame, text="Edit Title", command=self.edit_title, **button_config)
         self.edit_title_button.pack(side='left', padx=5, pady=5)
 
         self.edit_category_button = tk.Button(self.button_frame, text="Edit Category", command=self.edit_category, **button_config)
         self.edit_category_button.pack(side='left', padx=5, pady=5)
 
+        self.edit_tags_button = tk.Button(self.button_frame, text="Edit Tags", command=self.edit_tags, **button_config)
+        self.edit_tags_button.pack(side='left', padx=5, pady=5)
+
         self.category_button = tk.Button(self.button_frame, text="Add Category", command=self.add_category_dialog, **button_config)
         self.category_button.pack(side='left', padx=5, pady=5)
 
@@ -90,7 +146,9 @@ class NoteApp:
         self.search_label = tk.Label(self.button_frame, text="Search:", font=custom_font, bg=bg_color)
         self.search_label.pack(side='left', padx=5, pady=5)
 
-        self.search_entry = tk.Entry(self.button_frame, font=custom_font)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.on_search_changed())
+        self.search_entry = tk.Entry(self.button_frame, font=custom_font, textvariable=self.search_var)
         self.search_entry.pack(side='left', padx=5, pady=5)
 
         self.search_button = tk.Button(self.button_frame, text="Search", command=self.search_notes, **button_config)
@@ -102,14 +160,18 @@ class NoteApp:
         self.category_frame = tk.Frame(self.root, bg=bg_color)
         self.category_frame.pack(side='left', fill='y', padx=10, pady=10)
 
-        self.category_listbox = tk.Listbox(self.category_frame, font=custom_font)
+        self.category_listbox = VirtualListbox(self.category_frame, font=custom_font, bg=bg_color)
         self.category_listbox.pack(fill='y', expand=True)
+        self.category_listbox.set_source(
+            lambda: len(self.categories),
+            lambda offset, limit: [(category, category) for category in self.categories[offset:offset + limit]]
+        )
         self.category_listbox.bind("<<ListboxSelect>>", self.display_category_notes)
 
         self.note_frame = tk.Frame(self.root, bg=bg_color)
         self.note_frame.pack(side='right', fill='y', padx=10, pady=10)
 
-        self.note_listbox = tk.Listbox(self.note_frame, font=custom_font)
+        self.note_listbox = VirtualListbox(self.note_frame, font=custom_font, bg=bg_color)
         self.note_listbox.pack(fill='y', expand=True)
         self.note_listbox.bind("<<ListboxSelect>>", self.display_note)
 
@@ -140,8 +202,11 @@ class NoteApp:
             if not title or not category:
                 messagebox.showerror("Error", "Title and category are required")
                 return
+            if not self.editable(category):
+                return
             self.manager.add_note(title, "", category)
-            self.note_listbox.insert(tk.END, title)
+            if category == self.selected_category and self.note_ids is None:
+                self.note_listbox.refresh()
             dialog.destroy()
             self.autosave()
 
@@ -170,7 +235,7 @@ class NoteApp:
                 return
             if category not in self.categories:
                 self.categories.append(category)
-                self.category_listbox.insert(tk.END, category)
+                self.category_listbox.refresh()
                 if combo:
                     combo['values'] = self.categories
             dialog.destroy()
@@ -186,186 +251,634 @@ class NoteApp:
         """
         Сохраняет текущую заметку.
         """
-        if self.selected_category and self.selected_note_index is not None:
-            content = self.text_area.get("1.0", tk.END).strip()
-            self.manager.update_note(self.selected_category, self.selected_note_index, self.manager.notes[self.selected_category][self.selected_note_index].title, content)
+        note = self.manager.get_note(self.selected_note_id)
+        if note is not None and self.editable(note.category):
+            self.apply_edits()
             messagebox.showinfo("Info", "Note saved successfully!")
-            logging.info(f"Note saved: {self.manager.notes[self.selected_category][self.selected_note_index]}")
+            logging.info("Note saved: %s", note)
+            self.autosave()
+
+    def show_history(self):
+        """
+        Открывает диалог с версиями выбранной заметки и восстанавливает выбранную версию.
+        """
+        note_id = self.selected_note_id
+        if self.manager.get_note(note_id) is None:
+            messagebox.showerror("Error", "No note selected")
+            return
+        revisions = self.manager.revisions(note_id)
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Note History")
+        dialog.configure(bg="#ffffff")
+
+        listbox = tk.Listbox(dialog, width=60, height=15, font=("Helvetica", 10))
+        listbox.pack(padx=5, pady=5, fill='both', expand=True)
+        for revision in reversed(revisions):
+            saved = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(revision["time"])) if revision["time"] else "—"
+            listbox.insert(tk.END, f"#{revision['revision']}  {saved}  {revision['title']}")
+        preview = tk.Text(dialog, width=60, height=10, wrap='word', font=("Helvetica", 10))
+        preview.pack(padx=5, pady=5, fill='both', expand=True)
+
+        def selected_revision():
+            selection = listbox.curselection()
+            return revisions[len(revisions) - 1 - selection[0]]["revision"] if selection else None
+
+        def on_select(event):
+            revision = selected_revision()
+            version = self.manager.note_revision(note_id, revision) if revision is not None else None
+            preview.delete("1.0", tk.END)
+            if version is not None:
+                preview.insert(tk.END, version[1])
+
+        def on_restore():
+            revision = selected_revision()
+            note = self.manager.get_note(note_id)
+            if revision is None or note is None or not self.editable(note.category):
+                return
+            if self.manager.restore_revision(note_id, revision) is None:
+                return
+            self.note_listbox.refresh()
+            if self.selected_note_id == note_id:
+                self.editor.load(self.manager.note_content(note_id))
+            logging.info("Note %s restored to revision %s", note_id, revision)
+            dialog.destroy()
             self.autosave()
 
+        listbox.bind("<<ListboxSelect>>", on_select)
+        tk.Button(dialog, text="Restore", command=on_restore).pack(side='left', padx=5, pady=5)
+        tk.Button(dialog, text="Close", command=dialog.destroy).pack(side='right', padx=5, pady=5)
+
+    def apply_edits(self):
+        """
+        Переносит в заметку только изменённый в редакторе участок текста.
+        """
+        note = self.manager.get_note(self.selected_note_id)
+        if note is None or (self.loading and note.category not in self.loaded_categories):
+            return
+        change = self.editor.take_changes()
+        if change is not None:
+            self.manager.patch_note_by_id(self.selected_note_id, *change)
+
+    def autosave_edits(self):
+        """
+        Переносит правки из редактора в заметку, если включено автосохранение.
+        """
+        if self.autosave_enabled.get():
+            self.apply_edits()
+
     def delete_note(self):
         """
         Удаляет выбранную заметку.
         """
-        if self.selected_category and self.selected_note_index is not None:
-            self.manager.delete_note(self.selected_category, self.selected_note_index)
-            self.note_listbox.delete(self.selected_note_index)
-            self.text_area.delete("1.0", tk.END)
+        note = self.manager.get_note(self.selected_note_id)
+        if note is not None and self.editable(note.category):
+            self.manager.delete_note_by_id(self.selected_note_id)
+            if self.note_ids is not None:
+                self.note_ids.remove(self.selected_note_id)
+            self.note_listbox.refresh()
+            self.editor.clear()
             messagebox.showinfo("Info", "Note deleted successfully!")
-            logging.info(f"Note deleted at index: {self.selected_note_index}")
+            logging.info("Note deleted: %s", self.selected_note_id)
+            self.selected_note_id = None
             self.autosave()
 
     def display_note(self, event):
         """
         Отображает содержимое выбранной заметки.
         """
-        selected_note_index = self.note_listbox.curselection()
-        if selected_note_index:
-            self.selected_note_index = selected_note_index[0]
-            note_content = self.manager.get_note_content(self.selected_category, self.selected_note_index)
-            self.text_area.delete("1.0", tk.END)
-            self.text_area.insert(tk.END, note_content)
-            logging.info(f"Displaying note at index: {self.selected_note_index}")
+        note = self.manager.get_note(self.note_listbox.selected_key)
+        if note is not None:
+            self.autosave_edits()
+            self.selected_note_id = note.id
+            note_content = self.manager.note_content(note.id)
+            self.editor.load(note_content, on_done=self.update_editor_state)
+            logging.info("Displaying note: %s", self.selected_note_id)
 
     def display_category_notes(self, event):
         """
         Отображает заметки выбранной категории.
         """
-        selected_category_index = self.category_listbox.curselection()
-        if selected_category_index:
-            self.selected_category = self.categories[selected_category_index[0]]
-            self.note_listbox.delete(0, tk.END)
-            notes = self.manager.get_notes(self.selected_category)
-            for note in notes:
-                self.note_listbox.insert(tk.END, note.title)
+        if self.category_listbox.selected_key is not None:
+            self.show_category(self.category_listbox.selected_key)
+
+    def quick_open(self):
+        """
+        Открывает палитру быстрого перехода (Ctrl+P): нечёткий поиск заметки по заголовку.
+
+        Результаты пересчитываются при каждом нажатии клавиши (NoteManager.quick_open());
+        стрелки выбирают заметку, Enter открывает её, Escape закрывает палитру.
+        """
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Go to Note")
+        dialog.configure(bg="#ffffff")
+        dialog.transient(self.root)
+        query_var = tk.StringVar()
+        entry = tk.Entry(dialog, font=("Helvetica", 12), width=60, textvariable=query_var)
+        entry.pack(padx=5, pady=5, fill='x')
+        listbox = tk.Listbox(dialog, font=("Helvetica", 10), height=self.QUICK_OPEN_RESULTS, exportselection=False)
+        listbox.pack(padx=5, pady=5, fill='both', expand=True)
+        found = []
+
+        def on_change(*args):
+            started = time.perf_counter()
+            found[:] = self.manager.quick_open(query_var.get(), self.QUICK_OPEN_RESULTS)
+            listbox.delete(0, tk.END)
+            for note in found:
+                listbox.insert(tk.END, f"{note.title}  —  {note.category}")
+            if found:
+                listbox.selection_set(0)
+            logging.debug("Quick open %r: %s results in %.1f ms", query_var.get(), len(found),
+                          (time.perf_counter() - started) * 1000)
+
+        def move(delta):
+            selection = listbox.curselection()
+            if found:
+                position = max(0, min(len(found) - 1, (selection[0] if selection else -1) + delta))
+                listbox.selection_clear(0, tk.END)
+                listbox.selection_set(position)
+                listbox.see(position)
+            return "break"
+
+        def on_open(event=None):
+            selection = listbox.curselection()
+            if selection:
+                note_id = found[selection[0]].id
+                dialog.destroy()
+                self.open_note(note_id)
+
+        query_var.trace_add("write", on_change)
+        entry.bind("<Up>", lambda event: move(-1))
+        entry.bind("<Down>", lambda event: move(1))
+        entry.bind("<Return>", on_open)
+        listbox.bind("<Double-Button-1>", on_open)
+        dialog.bind("<Escape>", lambda event: dialog.destroy())
+        entry.focus_set()
+
+    def open_note(self, note_id):
+        """
+        Показывает категорию заметки, выделяет заметку в списке и открывает её в редакторе.
+
+        Аргументы:
+        note_id (int): Идентификатор заметки.
+        """
+        note = self.manager.get_note(note_id)
+        if note is None:
+            return
+        if note.category in self.categories:
+            self.category_listbox.select(note.category, self.categories.index(note.category))
+        self.show_category(note.category)
+        self.note_listbox.select(note_id, self.manager.notes[note.category].index(note))
+        self.display_note(None)
+
+    def show_category(self, category):
+        """
+        Показывает заметки указанной категории; строки подгружаются из менеджера страницами.
+        """
+        self.selected_category = category
+        self.note_ids = None
+        self.note_listbox.set_source(
+            lambda: len(self.manager.notes.get(category, ())),
+            lambda offset, limit: [(note.id, note.title) for note in self.manager.note_page(category, offset, limit)]
+        )
+
+    def show_notes(self, notes):
+        """
+        Показывает произвольный список заметок (например, результаты поиска).
+        """
+        self.note_ids = [note.id for note in notes]
+        self.note_listbox.set_source(lambda: len(self.note_ids), self._note_titles)
+
+    def _note_titles(self, offset, limit):
+        # Заметка из списка могла быть удалена, пока список ещё не обновлён
+        notes = (self.manager.get_note(note_id) for note_id in self.note_ids[offset:offset + limit])
+        return [(note.id, note.title) for note in notes if note is not None]
 
     def export_notes(self):
         """
-        Экспортирует заметки в файл JSON.
+        Экспортирует заметки в файл JSON или JSON Lines (.jsonl, .jsonl.gz).
         """
-        filename = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
+        filename = filedialog.asksaveasfilename(defaultextension=".json", filetypes=JSON_FILETYPES)
         if filename:
-            self.manager.save_to_file(filename)
+            if is_jsonl(filename):
+                export_jsonl(self.manager, filename)
+            else:
+                self.manager.save_to_file(filename, deduplicate=False)
             messagebox.showinfo("Info", "Notes exported successfully!")
-            logging.info(f"Notes exported to {filename}")
+            logging.info("Notes exported to %s", filename)
 
     def import_notes(self):
         """
-        Импортирует заметки из файла JSON.
+        Импортирует заметки из файла JSON или JSON Lines (.jsonl, .jsonl.gz).
         """
-        filename = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+        if not self.editable():
+            return
+        filename = filedialog.askopenfilename(filetypes=JSON_FILETYPES)
         if filename:
-            self.manager.load_from_file(filename)
-            self.category_listbox.delete(0, tk.END)
-            self.note_listbox.delete(0, tk.END)
+            if is_jsonl(filename):
+                import_jsonl(self.manager, filename, replace=True)
+            else:
+                self.manager.load_from_file(filename)
+            self.note_ids = None
+            self.selected_note_id = None
             self.categories = list(self.manager.notes.keys())
-            for category in self.categories:
-                self.category_listbox.insert(tk.END, category)
+            self.category_listbox.selected_key = None
+            self.category_listbox.refresh()
+            self.note_listbox.clear()
             messagebox.showinfo("Info", "Notes imported successfully!")
-            logging.info(f"Notes imported from {filename}")
+            logging.info("Notes imported from %s", filename)
+            self.autosave()
+
+    def import_folder(self):
+        """
+        Импортирует файлы .txt и .md из выбранного каталога.
+        """
+        if not self.editable():
+            return
+        directory = filedialog.askdirectory()
+        if directory:
+            notes = import_directory(self.manager, directory, progress=self.show_import_progress)
+            self.root.title("Note Application")
+            self.categories = list(self.manager.notes.keys())
+            self.category_listbox.refresh()
+            if self.note_ids is None and self.category_listbox.selected_key is not None:
+                self.note_listbox.refresh()
+            messagebox.showinfo("Info", f"{len(notes)} notes imported successfully!")
             self.autosave()
 
+    def show_import_progress(self, done, total):
+        """
+        Показывает ход импорта в заголовке окна.
+
+        Аргументы:
+        done (int): Сколько файлов прочитано.
+        total (int): Сколько файлов всего.
+        """
+        self.root.title(f"Note Application — importing {done}/{total}")
+        self.root.update_idletasks()
+
     def search_notes(self):
         """
         Выполняет поиск по заметкам.
         """
         query = self.search_entry.get().strip()
         if query:
-            results = search_notes([note for notes in self.manager.notes.values() for note in notes], query)
-            self.note_listbox.delete(0, tk.END)
-            for note in results:
-                self.note_listbox.insert(tk.END, note.title)
-            logging.info(f"Search performed with query: {query}")
+            self.live_search.submit(query)
+            logging.info("Search performed with query: %s", query)
+
+    def on_search_changed(self):
+        """
+        Запускает поиск по мере ввода; пустой запрос возвращает к выбранной категории.
+        """
+        query = self.search_var.get().strip()
+        if query:
+            self.live_search.submit(query)
+        else:
+            self.live_search.cancel()
+            if self.selected_category is not None:
+                self.show_category(self.selected_category)
+            else:
+                self.note_listbox.clear()
+
+    def show_search_results(self, notes, first, done):
+        """
+        Показывает очередную порцию результатов живого поиска.
+
+        Порции, пришедшие после перехода к категории, отбрасываются;
+        заметки, удалённые после поиска, не показываются.
+        """
+        notes = [note for note in notes if self.manager.get_note(note.id) is note]
+        if first:
+            self.show_notes(notes)
+        elif self.note_ids is not None:
+            self.note_ids.extend(note.id for note in notes)
+            self.note_listbox.refresh()
 
     def edit_title(self):
         """
         Редактирует заголовок выбранной заметки.
         """
-        if self.selected_category and self.selected_note_index is not None:
+        note = self.manager.get_note(self.selected_note_id)
+        if note is not None and self.editable(note.category):
             new_title = simpledialog.askstring("Input", "Enter new title:", parent=self.root)
             if new_title:
-                self.manager.notes[self.selected_category][self.selected_note_index].title = new_title
-                self.note_listbox.delete(self.selected_note_index)
-                self.note_listbox.insert(self.selected_note_index, new_title)
-                logging.info(f"Note title updated to: {new_title}")
+                self.manager.update_note_by_id(note.id, new_title, note.content)
+                self.note_listbox.refresh()
+                logging.info("Note title updated to: %s", new_title)
                 self.autosave()
 
     def edit_category(self):
         """
         Редактирует категорию выбранной заметки.
         """
-        if self.selected_category and self.selected_note_index is not None:
+        note = self.manager.get_note(self.selected_note_id)
+        if note is not None and self.editable(note.category):
             new_category = simpledialog.askstring("Input", "Enter new category:", parent=self.root)
-            if new_category:
-                note = self.manager.notes[self.selected_category].pop(self.selected_note_index)
-                note.category = new_category
-                if new_category not in self.manager.notes:
-                    self.manager.notes[new_category] = []
-                self.manager.notes[new_category].append(note)
-                self.note_listbox.delete(self.selected_note_index)
-                if not self.manager.notes[self.selected_category]:
-                    self.categories.remove(self.selected_category)
-                    self.category_listbox.delete(self.selected_category)
-                self.selected_category = new_category
-                self.display_category_notes(None)
-                logging.info(f"Note category updated to: {new_category}")
+            if new_category and self.editable(new_category):
+                old_category = note.category
+                self.manager.move_note_by_id(note.id, new_category)
+                if not self.manager.notes[old_category] and old_category in self.categories:
+                    self.categories.remove(old_category)
+                if new_category not in self.categories:
+                    self.categories.append(new_category)
+                self.category_listbox.selected_key = new_category
+                self.category_listbox.refresh()
+                self.show_category(new_category)
+                logging.info("Note category updated to: %s", new_category)
+                self.autosave()
+
+    def edit_tags(self):
+        """
+        Редактирует теги выбранной заметки (через запятую).
+
+        Заметки с тегами находятся поиском: "#тег", "#a AND NOT #b", "category:Работа #срочно".
+        """
+        note = self.manager.get_note(self.selected_note_id)
+        if note is not None and self.editable(note.category):
+            tags = simpledialog.askstring("Input", "Enter tags separated by commas:",
+                                          initialvalue=", ".join(note.tags), parent=self.root)
+            if tags is not None:
+                self.manager.set_tags(note.id, tags.split(","))
+                logging.info("Note tags updated to: %s", note.tags)
                 self.autosave()
 
     def edit_category_name(self):
         """
         Редактирует название выбранной категории.
         """
-        selected_category_index = self.category_listbox.curselection()
-        if selected_category_index:
-            old_category = self.categories[selected_category_index[0]]
+        old_category = self.category_listbox.selected_key
+        if old_category is not None and self.editable(old_category):
             new_category = simpledialog.askstring("Input", "Enter new category name:", parent=self.root)
             if new_category and new_category not in self.categories:
-                notes = self.manager.notes.pop(old_category)
-                for note in notes:
-                    note.category = new_category
-                self.manager.notes[new_category] = notes
-                self.categories[selected_category_index[0]] = new_category
-                self.category_listbox.delete(selected_category_index[0])
-                self.category_listbox.insert(selected_category_index[0], new_category)
+                self.manager.rename_category(old_category, new_category)
+                self.categories[self.categories.index(old_category)] = new_category
+                self.category_listbox.selected_key = new_category
+                self.category_listbox.refresh()
                 if self.selected_category == old_category:
                     self.selected_category = new_category
+                    if self.note_ids is None:
+                        self.show_category(new_category)
                 messagebox.showinfo("Info", f"Category '{old_category}' renamed to '{new_category}' successfully!")
-                logging.info(f"Category '{old_category}' renamed to '{new_category}'")
+                logging.info("Category '%s' renamed to '%s'", old_category, new_category)
                 self.autosave()
 
     def delete_category(self):
         """
         Удаляет выбранную категорию.
         """
-        selected_category_index = self.category_listbox.curselection()
-        if selected_category_index:
-            category_to_delete = self.categories[selected_category_index[0]]
-            self.categories.pop(selected_category_index[0])
-            self.category_listbox.delete(selected_category_index[0])
-            del self.manager.notes[category_to_delete]
-            self.note_listbox.delete(0, tk.END)
-            self.text_area.delete("1.0", tk.END)
+        category_to_delete = self.category_listbox.selected_key
+        if category_to_delete is not None and self.editable(category_to_delete):
+            self.categories.remove(category_to_delete)
+            self.category_listbox.selected_key = None
+            self.category_listbox.refresh()
+            self.manager.delete_category(category_to_delete)
+            self.note_listbox.clear()
+            self.note_ids = None
+            self.selected_note_id = None
+            self.editor.clear()
             messagebox.showinfo("Info", f"Category '{category_to_delete}' deleted successfully!")
-            logging.info(f"Category '{category_to_delete}' deleted")
+            logging.info("Category '%s' deleted", category_to_delete)
             self.autosave()
 
     def load_notes(self):
         """
-        Загружает заметки из файла при запуске приложения.
+        Запускает загрузку заметок в фоновом потоке; окно показывается сразу.
+
+        Категории появляются в списке по мере загрузки (см. poll_loading()).
+        """
+        self.loading = True
+        self.root.title("Note Application — loading…")
+        self._loader = threading.Thread(target=self._load_in_background, name="loader", daemon=True)
+        self._loader.start()
+        self.root.after(self.LOAD_POLL_MS, self.poll_loading)
+
+    def _load_in_background(self):
+        try:
+            if self.storage is not None:
+                with self.manager.lock:
+                    self.manager.attach_storage(self.storage)
+                    for category, notes in self.manager.notes.items():
+                        self._load_events.put((category, len(notes), {}, True))
+            else:
+                for event in self.file_sync.load_in_batches():
+                    self._load_events.put(event)
+        except Exception as error:
+            self.load_error = error
+            logging.error("Loading notes failed: %s", error)
+        finally:
+            self._load_events.put(None)
+
+    def poll_loading(self):
+        """
+        Показывает порции, загруженные фоновым потоком, и по окончании загрузки разрешает все изменения.
+        """
+        changed, done = set(), False
+        while True:
+            try:
+                event = self._load_events.get_nowait()
+            except queue.Empty:
+                break
+            if event is None:
+                done = True
+                break
+            category, count, renumbered, complete = event
+            self._loaded_notes += count
+            if category not in self.categories:
+                self.categories.append(category)
+            if complete:
+                self.loaded_categories.add(category)
+            self.apply_renumbered(renumbered)
+            changed.add(category)
+        if changed:
+            self.category_listbox.refresh()
+            if self.note_ids is None and self.selected_category in changed:
+                self.note_listbox.refresh()
+            self.update_editor_state()
+            self.root.title(f"Note Application — loading… {self._loaded_notes} notes")
+        if done:
+            self.finish_loading()
+        else:
+            self.root.after(self.LOAD_POLL_MS, self.poll_loading)
+
+    def finish_loading(self):
+        """
+        Завершает загрузку: разрешает изменения, запускает слежение за файлом и сообщает время старта.
+        """
+        self.loading = False
+        self.interactive_time = time.perf_counter() - self.started
+        metrics.observe("startup.interactive", self.interactive_time)
+        self.root.title("Note Application")
+        self.update_editor_state()
+        self.report_startup()
+        if self.load_error is not None:
+            messagebox.showerror("Error", f"Notes could not be loaded: {self.load_error}\nChanges will not be saved.")
+            return
+        if self.file_sync is not None:
+            self.root.after(self.SYNC_POLL_MS, self.poll_file_changes)
+        self.autosave()
+
+    def _on_first_paint(self, event):
+        if self.first_paint_time is None:
+            self.first_paint_time = time.perf_counter() - self.started
+            metrics.observe("startup.first_paint", self.first_paint_time)
+            self.root.unbind("<Expose>", self._paint_binding)
+            self.report_startup()
+
+    def report_startup(self):
+        """
+        Пишет в журнал время до первой отрисовки и до окончания загрузки, когда известны оба.
+        """
+        if self.first_paint_time is not None and self.interactive_time is not None:
+            logging.info("Startup: first paint %.0f ms, interactive %.0f ms, %s notes",
+                         self.first_paint_time * 1000, self.interactive_time * 1000, self._loaded_notes)
+
+    def editable(self, *categories):
+        """
+        Проверяет, можно ли сейчас менять заметки указанных категорий.
+
+        Пока идёт загрузка, меняются только полностью загруженные категории;
+        изменения, затрагивающие все заметки (например, импорт), ждут конца загрузки.
+
+        Аргументы:
+        *categories (str): Затрагиваемые категории.
+
+        Возвращает:
+        bool: True, если изменение можно выполнить; иначе показывается сообщение.
+        """
+        if not self.loading or (categories and all(category in self.loaded_categories for category in categories)):
+            return True
+        messagebox.showinfo("Loading", "Notes are still loading. Please try again in a moment.")
+        return False
+
+    def update_editor_state(self):
+        """
+        Делает редактор доступным только для заметок полностью загруженных категорий.
+        """
+        if self.editor.loading:
+            return
+        note = self.manager.get_note(self.selected_note_id)
+        ready = not self.loading or (note is not None and note.category in self.loaded_categories)
+        self.text_area.configure(state=tk.NORMAL if ready else tk.DISABLED)
+
+    def apply_renumbered(self, renumbered):
+        """
+        Переводит выбранную заметку и показанные результаты на новые идентификаторы заметок.
+
+        Аргументы:
+        renumbered (dict): Старый -> новый идентификатор.
+        """
+        if not renumbered:
+            return
+        self.selected_note_id = renumbered.get(self.selected_note_id, self.selected_note_id)
+        self.note_listbox.selected_key = renumbered.get(self.note_listbox.selected_key, self.note_listbox.selected_key)
+        if self.note_ids is not None:
+            self.note_ids = [renumbered.get(note_id, note_id) for note_id in self.note_ids]
+        self.note_listbox.refresh()
+
+    def poll_file_changes(self):
+        """
+        Периодически проверяет, не изменили ли notes.json извне.
+
+        В главном потоке сравниваются только время изменения и размер файла;
+        хеш и разбор выполняются в фоновом потоке, а изменения вливаются здесь.
+        """
+        try:
+            pending = self._sync_results.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            self._sync_checking = False
+            if pending is not None:
+                self.merge_file_changes(pending)
+        if not self._sync_checking and self.file_sync.changed():
+            self._sync_checking = True
+            threading.Thread(target=self._check_file, name="file-sync", daemon=True).start()
+        self.root.after(50 if self._sync_checking else self.SYNC_POLL_MS, self.poll_file_changes)
+
+    def _check_file(self):
+        try:
+            pending = self.file_sync.check()
+        except (OSError, ValueError) as error:
+            logging.error("Checking %s for external changes failed: %s", self.file_sync.filename, error)
+            pending = None
+        self._sync_results.put(pending)
+
+    def merge_file_changes(self, pending):
+        """
+        Вливает внешние изменения notes.json и обновляет списки и выбранную заметку.
+
+        Аргументы:
+        pending (tuple): Результат NoteFileSync.check().
         """
-        self.manager.load_from_file("notes.json")
-        for category in self.manager.notes.keys():
-            self.category_listbox.insert(tk.END, category)
+        changes = pending[1]
+        if self.editor.dirty and (changes is None or any(
+                fields["id"] == self.selected_note_id for _, fields in changes[0])):
+            # Несохранённая правка новее внешней и поэтому остаётся при слиянии (и при перечитывании файла)
+            self.apply_edits()
+        summary = self.file_sync.apply(pending)
         self.categories = list(self.manager.notes.keys())
-        logging.info("Notes loaded at startup.")
+        self.category_listbox.refresh()
+        if summary.get("reloaded"):
+            self.note_ids = None
+            self.selected_note_id = None
+            self.category_listbox.selected_key = None
+            self.note_listbox.clear()
+            self.editor.clear()
+        else:
+            self.apply_renumbered(summary["renumbered"])
+            selected = self.selected_note_id
+            if self.note_ids is not None:
+                self.note_ids = [note_id for note_id in self.note_ids if self.manager.get_note(note_id) is not None]
+            self.note_listbox.refresh()
+            if selected is not None and self.manager.get_note(selected) is None:
+                self.selected_note_id = None
+                self.editor.clear()
+            elif selected in summary["updated"]:
+                self.editor.load(self.manager.note_content(selected))
+        if self.autosaver.conflict:
+            self.autosave()
 
     def save_notes(self):
         """
-        Сохраняет заметки в файл при закрытии приложения.
-        """
-        self.manager.save_to_file("notes.json")
+        Сохраняет заметки в файл при закрытии приложения, предварительно влив внешние изменения.
+        """
+        if self.loading:
+            self._loader.join()
+            self.loading = False
+        if self.load_error is not None:
+            # Частично загруженные заметки не должны затереть файл
+            logging.error("Notes were not saved: loading failed")
+            return
+        if self.manager.storage is None:
+            for _ in range(self.SAVE_ATTEMPTS):
+                pending = self.file_sync.check()
+                if pending is not None:
+                    self.merge_file_changes(pending)
+                if self.autosaver.flush(force=True):
+                    break
+            else:
+                logging.error("Notes were not saved: %s keeps changing", self.file_sync.filename)
         logging.info("Notes saved at shutdown.")
 
-    def autosave(self):
+    def autosave(self, nbytes=1):
         """
-        Автосохранение заметок.
+        Автосохранение заметок: изменения накапливаются и записываются в фоне.
+
+        Аргументы:
+        nbytes (int, optional): Примерный объём изменения в байтах; 0 — изменений не было
+            (например, отпущена клавиша перемещения курсора).
         """
-        if self.autosave_enabled.get():
-            self.save_notes()
+        # Подключённое хранилище сохраняет каждое изменение само; до конца загрузки файл не пишется
+        if nbytes and self.autosave_enabled.get() and self.manager.storage is None and not self.loading \
+                and self.load_error is None:
+            self.autosaver.notify(nbytes)
 
     def on_closing(self):
         """
         Событие закрытия приложения, сохраняет заметки.
         """
         self.save_notes()
+        self.autosaver.close()
+        self.live_search.close()
+        self.manager.close()
+        logging.info("Autosave stats: %s", self.autosaver.stats())
         self.root.destroy()
@@ -1,12 +1,37 @@
-def search_notes(notes, query):
+from data import NoteManager
+from parallel_search import ParallelSearch, compile_matcher, make_matcher
+
+
+def search_notes(notes, query, regex=False, case_sensitive=False):
     """
     Ищет заметки по содержимому.
 
+    Несколько слов через пробел объединяются условием И. Если вместо
+    списка передан NoteManager, запрос без regex и case_sensitive выполняется
+    по его индексу; остальные запросы просматривают все заметки. Если передан
+    ParallelSearch, просмотр идёт параллельно в его пуле процессов.
+
     Аргументы:
-    notes (list): Список заметок.
+    notes (list | NoteManager | ParallelSearch): Список заметок, менеджер заметок или параллельный поиск.
     query (str): Строка поиска.
+    regex (bool, optional): Искать регулярное выражение.
+    case_sensitive (bool, optional): Учитывать регистр.
 
     Возвращает:
     list: Список заметок, содержащих строку поиска.
+
+    Исключения:
+    re.error: Если регулярное выражение записано с ошибкой.
     """
-    return [note for note in notes if query.lower() in note.content.lower()]
+    if isinstance(notes, ParallelSearch):
+        return notes.find(query, regex, case_sensitive)
+    if isinstance(notes, NoteManager):
+        if not (regex or case_sensitive):
+            return notes.search_notes(query)
+        with notes.lock:
+            notes = [note for category_notes in notes.notes.values() for note in category_notes]
+    spec = make_matcher(query, regex, case_sensitive)
+    if spec is None:
+        return []
+    match = compile_matcher(spec)
+    return [note for note in notes if match(note.content)]
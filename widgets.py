@@ -0,0 +1,150 @@
+import tkinter as tk
+from tkinter import font as tkfont
+
+
+class VirtualListbox(tk.Frame):
+    """
+    Список, который отображает только видимые строки.
+
+    Строки запрашиваются у источника данных страницами при прокрутке, поэтому
+    время заполнения не зависит от общего числа строк. Каждая строка имеет
+    ключ (например, идентификатор заметки), и выделение привязано к ключу, а
+    не к позиции. При выборе строки генерируется событие <<ListboxSelect>>.
+
+    Атрибуты:
+    listbox (tk.Listbox): Внутренний список с видимыми строками.
+    scrollbar (tk.Scrollbar): Полоса прокрутки, отражающая общее число строк.
+    selected_key: Ключ выбранной строки или None.
+    """
+    def __init__(self, master, font=None, bg=None, **kwargs):
+        super().__init__(master, bg=bg)
+        self.listbox = tk.Listbox(self, font=font, exportselection=False, **kwargs)
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side='right', fill='y')
+        self.listbox.pack(side='left', fill='both', expand=True)
+        self.selected_key = None
+        self._count = lambda: 0
+        self._fetch = lambda offset, limit: []
+        self._top = 0
+        self._keys = []
+        self._row_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<Configure>", lambda event: self.refresh())
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        self.listbox.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+        self.listbox.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+        self.listbox.bind("<Up>", lambda event: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda event: self._move_selection(1))
+        self.listbox.bind("<Prior>", lambda event: self._move_selection(-self._visible_rows()))
+        self.listbox.bind("<Next>", lambda event: self._move_selection(self._visible_rows()))
+
+    def set_source(self, count, fetch):
+        """
+        Задаёт источник строк и показывает его начало.
+
+        Аргументы:
+        count (callable): Возвращает общее число строк.
+        fetch (callable): fetch(offset, limit) возвращает список пар (ключ, текст).
+        """
+        self._count = count
+        self._fetch = fetch
+        self._top = 0
+        self.selected_key = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Перечитывает видимые строки из источника (например, после изменения данных).
+        """
+        count = self._count()
+        visible = self._visible_rows()
+        self._top = max(0, min(self._top, count - visible))
+        rows = self._fetch(self._top, visible)
+        self._keys = [key for key, _ in rows]
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(tk.END, *(text for _, text in rows))
+        if self.selected_key in self._keys:
+            self.listbox.selection_set(self._keys.index(self.selected_key))
+        if count:
+            self.scrollbar.set(self._top / count, min(1.0, (self._top + visible) / count))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def select(self, key, position):
+        """
+        Выделяет строку и прокручивает к ней список, не генерируя <<ListboxSelect>>.
+
+        Аргументы:
+        key: Ключ строки.
+        position (int): Позиция строки в источнике.
+        """
+        self.selected_key = key
+        visible = self._visible_rows()
+        if not self._top <= position < self._top + visible:
+            self._top = max(0, position - visible // 2)
+        self.refresh()
+
+    def clear(self):
+        """
+        Очищает список.
+        """
+        self.set_source(lambda: 0, lambda offset, limit: [])
+
+    def yview(self, *args):
+        """
+        Обработчик полосы прокрутки (протокол команд tk.Scrollbar).
+        """
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * self._count())
+            self.refresh()
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+
+    def scroll(self, amount, what="units"):
+        """
+        Прокручивает список.
+
+        Аргументы:
+        amount (int): На сколько строк или страниц прокрутить.
+        what (str, optional): "units" — строки, "pages" — страницы.
+        """
+        step = self._visible_rows() if what == "pages" else 1
+        self._top += amount * step
+        self.refresh()
+        return "break"
+
+    def _visible_rows(self):
+        height = self.listbox.winfo_height()
+        if height <= 1:
+            return int(self.listbox.cget("height")) or 10
+        bbox = self.listbox.bbox(0)
+        if bbox:
+            self._row_height = bbox[3]
+        return max(1, height // self._row_height)
+
+    def _on_select(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected_key = self._keys[selection[0]]
+            self.event_generate("<<ListboxSelect>>")
+
+    def _move_selection(self, delta):
+        position = self._top - 1
+        if self.selected_key in self._keys:
+            position = self._top + self._keys.index(self.selected_key)
+        position = max(0, min(position + delta, self._count() - 1))
+        visible = self._visible_rows()
+        if position < self._top:
+            self._top = position
+        elif position >= self._top + visible:
+            self._top = position - visible + 1
+        self.refresh()
+        row = position - self._top
+        if 0 <= row < len(self._keys):
+            self.listbox.selection_clear(0, tk.END)
+            self.listbox.selection_set(row)
+            self.selected_key = self._keys[row]
+            self.event_generate("<<ListboxSelect>>")
+        return "break"